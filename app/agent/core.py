@@ -3,15 +3,19 @@ import asyncio
 import json
 import uuid
 import logging
-import os
 from typing import Any, Optional
 from dataclasses import dataclass, field
 from datetime import datetime
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import get_settings
 from app.database import async_session
 from app.clients.gemini import get_gemini_client, GeminiClient
+from app.agent.events import emit, stream_tokens
+from app.agent.intent_cache import IntentCache, intent_cache_key
+from app.agent.pipeline import GENERATE_INTENTS, SpeculativePlan, StageStats, TurnPipeline
+from app.agent.prompts import get_prompt_registry
 from app.agent.skills.character import CharacterSkill
 from app.agent.skills.content_brain import ContentBrainSkill
 from app.agent.skills.prompt_optimizer import PromptOptimizerSkill
@@ -35,16 +39,6 @@ from app.schemas.agent import (
 logger = logging.getLogger(__name__)
 
 
-def _load_md(filename: str) -> str:
-    """Load a markdown file from the data/ directory. Returns empty string if not found."""
-    path = os.path.join(os.path.dirname(__file__), "..", "..", "data", filename)
-    try:
-        with open(os.path.abspath(path), "r", encoding="utf-8") as f:
-            return f.read().strip()
-    except FileNotFoundError:
-        return ""
-
-
 # Lean routing-only system prompt — persona and skills are loaded from SOUL.md / SKILLS.md
 AGENT_SYSTEM_PROMPT = """{soul}
 
@@ -74,6 +68,9 @@ Respond ONLY in valid JSON:
    - Custom: freely interpret user message with the reference
 6. User provides a URL + says "use as base image" → intent: add_base_image, put URL in parameters.image_url
 """
+get_prompt_registry().register(
+    "agent_system", AGENT_SYSTEM_PROMPT, files={"soul": "SOUL.md", "skills": "SKILLS.md"}
+)
 
 
 # System prompt for image editing
@@ -140,8 +137,15 @@ class Agent:
     """Main agent class with o1-mini reasoning and skill execution."""
 
     def __init__(self):
+        settings = get_settings()
         self.gemini_client = get_gemini_client()
         self.sessions: dict[str, ConversationSession] = {}
+        self.intent_cache = IntentCache(
+            max_entries=settings.intent_cache_max_entries,
+            ttl_seconds=settings.intent_cache_ttl_seconds,
+        )
+        self.speculative_planning = settings.agent_speculative_planning
+        self.stage_stats = StageStats()
 
         # Initialize skills
         self.character_skill = CharacterSkill()
@@ -180,12 +184,10 @@ class Agent:
         context: dict[str, Any],
     ) -> list[dict[str, Any]]:
         """Build messages for o1-mini reasoning."""
-        system_prompt = AGENT_SYSTEM_PROMPT.format(
-            soul=_load_md("SOUL.md"),
-            skills=_load_md("SKILLS.md"),
-        )
+        # Static prompt first and byte-identical across calls, so providers
+        # can reuse their cached prefix; per-turn context follows it
         messages = [
-            {"role": "user", "content": system_prompt},
+            {"role": "user", "content": get_prompt_registry().get("agent_system")},
         ]
 
         # Add context about current state
@@ -313,9 +315,16 @@ Current State:
         context: dict[str, Any],
     ) -> dict[str, Any]:
         """Use o1-mini to analyze user intent."""
-        messages = self._build_messages_for_reasoning(session, context)
         last_message = session.messages[-1].content if session.messages else ""
+        # The earlier turns sent along with it (see _build_messages_for_reasoning)
+        history = [f"{msg.role}: {msg.content}" for msg in session.messages[-6:-1]]
+        cache_key = intent_cache_key(last_message, context, history)
+        cached = self.intent_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Intent cache hit for %r", last_message[:60])
+            return cached
 
+        messages = self._build_messages_for_reasoning(session, context)
         try:
             # Use Grok fast model for intent parsing — fast response, good Chinese support
             raw = await self.gemini_client.chat_grok(
@@ -345,8 +354,10 @@ Current State:
             ]
             if any(ind in response_msg for ind in refusal_indicators):
                 logger.warning("GPT refused due to content policy, using fallback")
-                return self._detect_intent_simple(last_message)
+                # Cache the fallback too, so a repeat does not hit the refusal again
+                result = self._detect_intent_simple(last_message)
 
+            self.intent_cache.put(cache_key, result)
             return result
         except Exception as e:
             logger.error(f"Intent analysis failed: {e}")
@@ -386,6 +397,38 @@ Current State:
 
         return context
 
+    def _start_speculative_plan(
+        self,
+        session: ConversationSession,
+        message: str,
+        character_id: Optional[str],
+        reference_image_path: Optional[str],
+        context: dict[str, Any],
+        db: AsyncSession,
+    ) -> Optional[SpeculativePlan]:
+        """Start ContentBrain planning early when the keyword detector expects a generation."""
+        if not self.speculative_planning or not character_id or reference_image_path:
+            return None
+        # Follow-ups ("make it darker") get their scene rewritten from the
+        # history, so a plan of the raw message would only be discarded
+        if len(session.messages) > 1 or session.pending_generation or session.pending_edit:
+            return None
+        guess = self._detect_intent_simple(message)
+        if guess["intent"] not in GENERATE_INTENTS:
+            return None
+        style = guess["parameters"].get("style")
+        cloth = guess["parameters"].get("cloth")
+        task = asyncio.create_task(self.content_brain.plan_content(
+            user_request=message,
+            character_name=context.get("character_name", ""),
+            character_description=context.get("character_description", ""),
+            style=style,
+            cloth=cloth,
+            platform="instagram",
+            db=db,
+        ))
+        return SpeculativePlan(task=task, request=message, style=style, cloth=cloth)
+
     async def process_message(
         self,
         message: str,
@@ -396,6 +439,33 @@ Current State:
         db: AsyncSession,
     ) -> AgentChatResponse:
         """Process a user message and return response."""
+        pipeline = TurnPipeline()
+        try:
+            return await self._process_message(
+                message, character_id, session_id, reference_image_path, reference_image_mode, db, pipeline
+            )
+        finally:
+            pipeline.close()
+            self.stage_stats.record(pipeline)
+            speculation = self.stage_stats.speculation
+            logger.info(
+                "Stage timings: %s (speculative plan: %s; used %d / discarded %d so far)",
+                {name: round(seconds, 3) for name, seconds in pipeline.stages.items()},
+                pipeline.speculation_outcome,
+                speculation["used"],
+                speculation["discarded"],
+            )
+
+    async def _process_message(
+        self,
+        message: str,
+        character_id: Optional[str],
+        session_id: Optional[str],
+        reference_image_path: Optional[str],
+        reference_image_mode: Optional[str],
+        db: AsyncSession,
+        pipeline: TurnPipeline,
+    ) -> AgentChatResponse:
         logger.info(f"=== Processing message ===")
         logger.info(f"Message: {message[:100]}...")
         logger.info(f"Character ID: {character_id}")
@@ -405,6 +475,7 @@ Current State:
         session = self._get_or_create_session(session_id, character_id)
         session.add_message("user", message)
         session.state = ConversationState.UNDERSTANDING
+        emit("stage", stage="understanding", session_id=session.id)
 
         # If no explicit reference image but we have fetched Instagram images, use the first one
         if not reference_image_path and session.fetched_instagram_images:
@@ -419,7 +490,8 @@ Current State:
             session.fetched_instagram_images = []
 
         # Build context
-        context = await self._build_context(character_id, db)
+        with pipeline.stage("context"):
+            context = await self._build_context(character_id, db)
         context["reference_image_path"] = reference_image_path  # Include for intent analysis
         context["reference_image_mode"] = reference_image_mode  # Include mode for prompt generation
         # Log context without full image path to avoid long logs
@@ -449,7 +521,13 @@ Current State:
         else:
             # Analyze intent with o1-mini
             session.state = ConversationState.PLANNING
-            intent_result = await self._analyze_intent(session, context)
+            # Plan alongside intent analysis; the task is created before the
+            # token stream is set up so its output is not streamed
+            pipeline.speculation = self._start_speculative_plan(
+                session, message, character_id, reference_image_path, context, db
+            )
+            with pipeline.stage("intent"), stream_tokens("message", json_field="response_message"):
+                intent_result = await self._analyze_intent(session, context)
         logger.info(f"Intent result: {intent_result}")
 
         intent = intent_result.get("intent", "general_chat")
@@ -472,6 +550,8 @@ Current State:
             response_message = response_message or "Sure, let me generate that for you!"
             logger.info("Overriding general_chat → generate_image (character selected + non-empty message)")
 
+        speculative_plan = pipeline.take_speculation(intent, parameters)
+
         # Handle different intents
         if intent == "general_chat":
             # Check if this is a content-policy refusal for a generation request
@@ -546,32 +626,39 @@ Current State:
             brain_prompt = ""
             brain_negative_prompt = "deformed face, blurry, low quality, bad anatomy, extra limbs, watermark, text, overexposed, plastic skin, uncanny valley"
             if not reference_image_path:
-                content_plan = await self.content_brain.plan_content(
-                    user_request=scene_desc or message,
-                    character_name=context.get("character_name", ""),
-                    character_description=context.get("character_description", ""),
-                    style=style,
-                    cloth=cloth,
-                    platform="instagram",
-                    db=db,
-                )
+                emit("stage", stage="planning")
+                with pipeline.stage("planning"):
+                    if speculative_plan is not None:
+                        content_plan = await speculative_plan.task
+                    else:
+                        content_plan = await self.content_brain.plan_content(
+                            user_request=scene_desc or message,
+                            character_name=context.get("character_name", ""),
+                            character_description=context.get("character_description", ""),
+                            style=style,
+                            cloth=cloth,
+                            platform="instagram",
+                            db=db,
+                        )
                 if content_plan.get("success") and content_plan.get("full_prompt"):
                     brain_prompt = content_plan["full_prompt"]
                     brain_negative_prompt = content_plan.get("negative_prompt", brain_negative_prompt)
                     logger.info(f"ContentBrain brief (preview): {brain_prompt[:120]}...")
 
             # Pass reference image to DeepSeek Vision for analysis; use GPT-4o for reprompt
-            optimized_prompt = await self.prompt_optimizer.optimize(
-                prompt=brain_prompt or scene_desc,
-                style=style,
-                cloth=cloth,
-                character_description=context.get("character_description"),
-                character_gender=context.get("character_gender"),
-                reference_image_path=reference_image_path,
-                reference_image_mode=reference_image_mode,
-                reference_description=message if reference_image_path else None,
-                db=db,
-            )
+            emit("stage", stage="optimizing")
+            with pipeline.stage("optimizing"), stream_tokens("prompt"):
+                optimized_prompt = await self.prompt_optimizer.optimize(
+                    prompt=brain_prompt or scene_desc,
+                    style=style,
+                    cloth=cloth,
+                    character_description=context.get("character_description"),
+                    character_gender=context.get("character_gender"),
+                    reference_image_path=reference_image_path,
+                    reference_image_mode=reference_image_mode,
+                    reference_description=message if reference_image_path else None,
+                    db=db,
+                )
 
             # Create pending generation
             # Force content_post when reference image is provided (don't generate base image)
@@ -0,0 +1,156 @@
+"""Progress events of an agent turn, for the streaming chat endpoint."""
+import asyncio
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+from app.clients.gemini import current_token_sink
+
+# Queue of the streaming request this task is serving, if any
+current_event_queue: ContextVar[Optional[asyncio.Queue]] = ContextVar("current_event_queue", default=None)
+
+
+def emit(event: str, **data: Any) -> None:
+    """Publish an event to the current stream; a no-op for non-streaming requests."""
+    queue = current_event_queue.get()
+    if queue is not None:
+        queue.put_nowait({"event": event, **data})
+
+
+def streaming() -> bool:
+    return current_event_queue.get() is not None
+
+
+def format_sse(event: str, data: dict[str, Any]) -> str:
+    """One server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class JsonStringFieldExtractor:
+    """
+    Incrementally decode one string field out of a JSON document being streamed.
+
+    ``feed`` takes raw chunks of the document and returns the newly decoded
+    characters of ``field``'s value (empty until the field starts, and after
+    it ends). Escapes split across chunks are held back until complete.
+    """
+
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self, field: str):
+        self.field = field
+        self._buffer = ""
+        self._pos: Optional[int] = None  # Index of the next undecoded value char
+        self.done = False
+
+    def _find_start(self) -> None:
+        marker = f'"{self.field}"'
+        idx = self._buffer.find(marker)
+        while idx != -1:
+            rest = self._buffer[idx + len(marker):]
+            stripped = rest.lstrip()
+            if not stripped:
+                return
+            if stripped[0] != ":":
+                idx = self._buffer.find(marker, idx + 1)
+                continue
+            value = stripped[1:].lstrip()
+            if not value:
+                return
+            if value[0] != '"':
+                self.done = True  # Not a string; nothing to stream
+                return
+            self._pos = len(self._buffer) - len(value) + 1
+            return
+
+    def feed(self, chunk: str) -> str:
+        if self.done:
+            return ""
+        self._buffer += chunk
+        if self._pos is None:
+            self._find_start()
+            if self._pos is None:
+                return ""
+
+        out = []
+        buf, i = self._buffer, self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self.done = True
+                i += 1
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+            if i + 1 >= len(buf):
+                break  # Escape continues in the next chunk
+            code = buf[i + 1]
+            if code == "u":
+                if i + 6 > len(buf):
+                    break
+                try:
+                    out.append(chr(int(buf[i + 2:i + 6], 16)))
+                except ValueError:
+                    pass
+                i += 6
+            else:
+                out.append(self._ESCAPES.get(code, code))
+                i += 2
+        self._pos = i
+        return "".join(out)
+
+
+class TokenSink:
+    """
+    Receives LLM deltas for one output ``field`` and forwards them as events.
+
+    With ``json_field`` set, the model is producing JSON and only that
+    string field's content is forwarded. ``reset`` is called when a retry
+    starts the answer over, so the client can discard what it has.
+    """
+
+    def __init__(self, field: str, json_field: Optional[str] = None):
+        self.field = field
+        self.json_field = json_field
+        self._extractor = JsonStringFieldExtractor(json_field) if json_field else None
+        self.sent = False
+
+    def reset(self) -> None:
+        if self._extractor is not None:
+            self._extractor = JsonStringFieldExtractor(self.json_field)
+        if self.sent:
+            emit("reset", field=self.field)
+            self.sent = False
+
+    def push(self, delta: str) -> None:
+        text = self._extractor.feed(delta) if self._extractor is not None else delta
+        if text:
+            self.sent = True
+            emit("delta", field=self.field, text=text)
+
+
+@contextmanager
+def stream_tokens(field: str, json_field: Optional[str] = None) -> Iterator[Optional[TokenSink]]:
+    """Stream LLM output of the enclosed calls as ``field`` deltas (only when streaming)."""
+    if not streaming():
+        yield None
+        return
+    sink = TokenSink(field, json_field)
+    token = current_token_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        current_token_sink.reset(token)
+
+
+@contextmanager
+def muted_tokens() -> Iterator[None]:
+    """Keep intermediate LLM calls (e.g. image analysis) out of the enclosing token stream."""
+    token = current_token_sink.set(None)
+    try:
+        yield
+    finally:
+        current_token_sink.reset(token)
@@ -0,0 +1,118 @@
+"""TTL'd, size-bounded cache of intent-analysis results."""
+import copy
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s.!?,;:~。！？，…]+$")
+
+
+def normalize_message(message: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a message."""
+    text = _WHITESPACE_RE.sub(" ", message.strip().lower())
+    return _TRAILING_PUNCT_RE.sub("", text)
+
+
+def base_image_bucket(count: int) -> str:
+    """The routing rules only care whether a character has no, some or all base images."""
+    if count <= 0:
+        return "none"
+    return "full" if count >= 3 else "some"
+
+
+def intent_cache_key(message: str, context: dict[str, Any], history: Sequence[str] = ()) -> str:
+    """
+    Key for an intent result: message, character, base-image bucket,
+    reference mode and a digest of the earlier turns the LLM sees.
+
+    Follow-ups ("another one", "make it darker") are resolved against the
+    history, so they only share entries with the exact same conversation.
+    """
+    if context.get("reference_image_path"):
+        reference_mode = context.get("reference_image_mode") or "custom"
+    else:
+        reference_mode = "none"
+    history_digest = ""
+    if history:
+        history_digest = hashlib.sha256("\x1e".join(history).encode("utf-8")).hexdigest()
+    return "\x1f".join((
+        normalize_message(message),
+        context.get("character_id") or "",
+        base_image_bucket(context.get("base_image_count", 0)),
+        reference_mode,
+        history_digest,
+    ))
+
+
+class IntentCache:
+    """
+    LRU cache of intent JSON with a per-entry TTL.
+
+    Values are deep-copied in and out because callers adjust the returned
+    parameters in place. A TTL or size of 0 disables the cache.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max(max_entries, 0)
+        self.ttl_seconds = max(ttl_seconds, 0)
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Return a copy of a live entry and mark it most recently used."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, key: str, result: dict[str, Any]) -> None:
+        """Store a copy of ``result``, evicting least recently used entries to fit."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(result))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Counters for monitoring hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,115 @@
+"""Stage timing and speculative work for one agent turn."""
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+from app.agent.intent_cache import normalize_message
+
+logger = logging.getLogger(__name__)
+
+GENERATE_INTENTS = ("generate_image", "generate_video")
+
+
+@dataclass
+class SpeculativePlan:
+    """
+    ContentBrain planning started on the local keyword guess, before the
+    intent LLM answers. It is only used if the real intent agrees: a
+    generation of the same scene, with the same style and cloth the plan
+    was made with.
+    """
+
+    task: asyncio.Task
+    request: str
+    style: Optional[str]
+    cloth: Optional[str]
+
+    def matches(self, intent: str, parameters: dict[str, Any]) -> bool:
+        # A rewritten scene (follow-ups, translations) needs its own plan
+        scene = parameters.get("scene_description")
+        return (
+            intent in GENERATE_INTENTS
+            and (not scene or normalize_message(scene) == normalize_message(self.request))
+            and (parameters.get("style") or None) == (self.style or None)
+            and (parameters.get("cloth") or None) == (self.cloth or None)
+        )
+
+    def cancel(self) -> None:
+        if not self.task.done():
+            self.task.cancel()
+        elif not self.task.cancelled():
+            self.task.exception()  # Mark a failure as retrieved; nobody awaits it
+
+
+class TurnPipeline:
+    """Timings and in-flight speculation of one process_message call."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.speculation: Optional[SpeculativePlan] = None
+        self.speculation_outcome = "none"  # none / used / discarded
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def take_speculation(self, intent: str, parameters: dict[str, Any]) -> Optional[SpeculativePlan]:
+        """Hand out the speculative plan if the intent agrees with it, else cancel it."""
+        speculation, self.speculation = self.speculation, None
+        if speculation is None:
+            return None
+        if speculation.matches(intent, parameters):
+            self.speculation_outcome = "used"
+            return speculation
+        speculation.cancel()
+        self.speculation_outcome = "discarded"
+        return None
+
+    def close(self) -> None:
+        """Cancel speculation nobody claimed (early return or error)."""
+        if self.speculation is not None:
+            self.speculation.cancel()
+            self.speculation = None
+            self.speculation_outcome = "discarded"
+        self.stages["total"] = time.perf_counter() - self.started
+
+
+class StageStats:
+    """Aggregate per-stage latency and speculation outcomes, for the admin endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: dict[str, list[float]] = {}  # name -> [count, total, max]
+        self.speculation: dict[str, int] = {"none": 0, "used": 0, "discarded": 0}
+
+    def record(self, pipeline: TurnPipeline) -> None:
+        with self._lock:
+            for name, seconds in pipeline.stages.items():
+                entry = self._stages.setdefault(name, [0, 0.0, 0.0])
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+            self.speculation[pipeline.speculation_outcome] += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "stages": {
+                    name: {
+                        "count": count,
+                        "avg_seconds": round(total / count, 3),
+                        "max_seconds": round(longest, 3),
+                    }
+                    for name, (count, total, longest) in self._stages.items()
+                },
+                "speculation": dict(self.speculation),
+            }
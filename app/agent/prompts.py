@@ -0,0 +1,142 @@
+"""Registry of agent prompt templates: rendered once, re-rendered when their files change."""
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # Optional; fall back to an estimate
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count of ``text`` (cl100k when tiktoken is installed, else ~4 chars/token)."""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _read_md(filename: str) -> tuple[str, Optional[float]]:
+    """Contents and mtime of a data/ file; ("", None) if it does not exist."""
+    path = os.path.join(DATA_DIR, filename)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            mtime = os.fstat(f.fileno()).st_mtime
+            return f.read().strip(), mtime
+    except FileNotFoundError:
+        return "", None
+
+
+def _mtime(filename: str) -> Optional[float]:
+    try:
+        return os.stat(os.path.join(DATA_DIR, filename)).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+@dataclass
+class PromptTemplate:
+    """
+    A prompt rendered from a ``str.format`` template whose placeholders are
+    filled from files in data/ (``files`` maps placeholder -> filename).
+    Templates without files are static and rendered exactly once.
+    """
+
+    name: str
+    template: str
+    files: dict[str, str] = field(default_factory=dict)
+    text: str = ""
+    mtimes: dict[str, Optional[float]] = field(default_factory=dict)
+    tokens: int = 0
+    sha256: str = ""
+    loaded_at: float = 0.0
+    checked_at: float = 0.0
+    reloads: int = 0
+
+    def render(self) -> None:
+        values = {}
+        for placeholder, filename in self.files.items():
+            values[placeholder], self.mtimes[filename] = _read_md(filename)
+        self.text = self.template.format(**values) if self.files else self.template
+        self.tokens = count_tokens(self.text)
+        self.sha256 = hashlib.sha256(self.text.encode("utf-8")).hexdigest()
+        self.loaded_at = time.time()
+        self.reloads += 1
+
+    def stale(self) -> bool:
+        return any(_mtime(filename) != mtime for filename, mtime in self.mtimes.items())
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "files": list(self.files.values()),
+            "chars": len(self.text),
+            "tokens": self.tokens,
+            "sha256": self.sha256[:16],
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+        }
+
+
+class PromptRegistry:
+    """
+    Named prompt templates, each rendered once and served from memory.
+
+    File-backed templates are re-rendered when a source file's mtime
+    changes (checked at most every ``check_interval`` seconds), so edits
+    to SOUL.md / SKILLS.md apply without a restart. Between edits the
+    rendered text is the same string, which keeps it usable as a
+    byte-stable prefix for provider-side prompt caching.
+    """
+
+    def __init__(self, check_interval: float = 2.0):
+        self.check_interval = max(check_interval, 0.0)
+        self._templates: dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, template: str, files: Optional[dict[str, str]] = None) -> None:
+        with self._lock:
+            self._templates[name] = PromptTemplate(name=name, template=template, files=dict(files or {}))
+
+    def get(self, name: str) -> str:
+        """Rendered text of template ``name``, reloading it if its files changed."""
+        prompt = self._templates[name]
+        now = time.monotonic()
+        if prompt.reloads and (not prompt.files or now - prompt.checked_at < self.check_interval):
+            return prompt.text
+        with self._lock:
+            if not prompt.reloads:
+                prompt.render()
+            elif now - prompt.checked_at >= self.check_interval and prompt.stale():
+                prompt.render()
+                logger.info(f"Reloaded prompt {name} ({prompt.tokens} tokens)")
+            prompt.checked_at = now
+        return prompt.text
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Size, token count and version of every template."""
+        for name in list(self._templates):
+            self.get(name)
+        return [prompt.to_dict() for prompt in self._templates.values()]
+
+
+_registry: Optional[PromptRegistry] = None
+
+
+def get_prompt_registry() -> PromptRegistry:
+    """Get or create the prompt registry singleton."""
+    global _registry
+    if _registry is None:
+        _registry = PromptRegistry(check_interval=get_settings().prompt_reload_check_seconds)
+    return _registry
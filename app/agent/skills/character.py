@@ -232,6 +232,9 @@ class CharacterSkill(BaseSkill):
         await db.commit()
         await db.refresh(image)
 
+        from app.services.reference_pack import schedule_reference_pack
+        schedule_reference_pack(image.id)
+
         return {
             "success": True,
             "image_id": image.id,
@@ -259,6 +262,8 @@ class CharacterSkill(BaseSkill):
         if image.type != ImageType.BASE:
             return {"success": False, "error": "Only base images can be removed"}
 
+        from app.services.reference_pack import invalidate_reference_packs
+        await invalidate_reference_packs([image.id], db)
         await db.delete(image)
         await db.commit()
 
@@ -1,9 +1,9 @@
 """Edit prompt optimization skill for image editing."""
-import base64
 from typing import Any, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.agent.prompts import get_prompt_registry
 from app.agent.skills.base import BaseSkill
 from app.clients.gemini import get_gemini_client
 from app.services.storage import get_storage_service
@@ -77,6 +77,9 @@ Based on your analysis, identify:
 Output a brief analysis in English that can help craft the edit prompt."""
 
 
+get_prompt_registry().register("seedream_edit_prompt_guide", SEEDREAM_EDIT_PROMPT_GUIDE)
+
+
 class EditPromptOptimizerSkill(BaseSkill):
     """Skill for optimizing edit prompts using Seedream best practices."""
 
@@ -96,11 +99,9 @@ class EditPromptOptimizerSkill(BaseSkill):
 
         if image_path.startswith("/uploads/"):
             file_id = image_path.replace("/uploads/", "")
-            blob = await self.storage.get_file_blob(file_id, db)
-            if blob:
-                mime_type = blob.content_type or "image/jpeg"
-                base64_data = base64.b64encode(blob.data).decode("utf-8")
-                return f"data:{mime_type};base64,{base64_data}"
+            data_url = await self.storage.get_data_url(file_id, db)
+            if data_url:
+                return data_url
 
         return full_url
 
@@ -206,7 +207,7 @@ class EditPromptOptimizerSkill(BaseSkill):
 
         # Build optimization prompt
         messages = [
-            {"role": "system", "content": SEEDREAM_EDIT_PROMPT_GUIDE},
+            {"role": "system", "content": get_prompt_registry().get("seedream_edit_prompt_guide")},
             {
                 "role": "user",
                 "content": f"""Please optimize this image edit request:
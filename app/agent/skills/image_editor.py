@@ -116,6 +116,7 @@ class ImageEditorSkill(BaseSkill):
                 character_id=character_id,
                 type=ImageType.CONTENT,
                 image_url=saved["url"],
+                **self.storage.image_fields(saved),
                 is_approved=False,
                 metadata_json=json.dumps(metadata),
             )
@@ -10,6 +10,7 @@ from app.agent.skills.base import BaseSkill
 from app.clients.seedream import get_seedream_client
 from app.models.image import Image, ImageType, ImageStatus
 from app.models.character import Character
+from app.services.reference_pack import reference_images_for
 from app.services.storage import get_storage_service
 
 
@@ -66,7 +67,8 @@ class ImageGeneratorSkill(BaseSkill):
             .limit(limit)
         )
         images = result.scalars().all()
-        return [self.storage.get_full_url(img.image_url) for img in images]
+        # Provider-ready JPEGs from the reference packs, computed once on approval
+        return await reference_images_for(images, db)
 
     async def _generate_base_image(
         self,
@@ -155,6 +157,8 @@ class ImageGeneratorSkill(BaseSkill):
                 image = result_query.scalar_one_or_none()
                 if image:
                     image.image_url = saved["url"]
+                    for field, value in self.storage.image_fields(saved).items():
+                        setattr(image, field, value)
                     image.status = ImageStatus.COMPLETED
                     image.metadata_json = json.dumps(metadata)
                     await db.commit()
@@ -165,6 +169,7 @@ class ImageGeneratorSkill(BaseSkill):
                         character_id=character_id,
                         type=ImageType.BASE,
                         image_url=saved["url"],
+                        **self.storage.image_fields(saved),
                         status=ImageStatus.COMPLETED,
                         is_approved=False,
                         metadata_json=json.dumps(metadata),
@@ -178,6 +183,7 @@ class ImageGeneratorSkill(BaseSkill):
                     character_id=character_id,
                     type=ImageType.BASE,
                     image_url=saved["url"],
+                    **self.storage.image_fields(saved),
                     status=ImageStatus.COMPLETED,
                     is_approved=False,
                     metadata_json=json.dumps(metadata),
@@ -335,6 +341,8 @@ class ImageGeneratorSkill(BaseSkill):
                 image = result_query.scalar_one_or_none()
                 if image:
                     image.image_url = saved["url"]
+                    for field, value in self.storage.image_fields(saved).items():
+                        setattr(image, field, value)
                     image.status = ImageStatus.COMPLETED
                     image.metadata_json = json.dumps(metadata)
                     await db.commit()
@@ -345,6 +353,7 @@ class ImageGeneratorSkill(BaseSkill):
                         character_id=character_id,
                         type=ImageType.CONTENT,
                         image_url=saved["url"],
+                        **self.storage.image_fields(saved),
                         status=ImageStatus.COMPLETED,
                         is_approved=False,
                         metadata_json=json.dumps(metadata),
@@ -358,6 +367,7 @@ class ImageGeneratorSkill(BaseSkill):
                     character_id=character_id,
                     type=ImageType.CONTENT,
                     image_url=saved["url"],
+                    **self.storage.image_fields(saved),
                     status=ImageStatus.COMPLETED,
                     is_approved=False,
                     metadata_json=json.dumps(metadata),
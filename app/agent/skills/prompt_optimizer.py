@@ -5,6 +5,8 @@ from typing import Any, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.agent.events import muted_tokens
+from app.agent.prompts import get_prompt_registry
 from app.agent.skills.base import BaseSkill
 from app.clients.gemini import get_gemini_client
 from app.services.storage import get_storage_service
@@ -276,6 +278,10 @@ Output a description in English that can be directly used as an image generation
 Output only the description, no other explanations."""
 
 
+get_prompt_registry().register("seedream_vlog_prompt_guide", SEEDREAM_VLOG_PROMPT_GUIDE)
+get_prompt_registry().register("seedream_prompt_guide", SEEDREAM_PROMPT_GUIDE)
+
+
 class PromptOptimizerSkill(BaseSkill):
     """Skill for optimizing prompts using Seedream best practices."""
 
@@ -313,10 +319,11 @@ class PromptOptimizerSkill(BaseSkill):
 
         try:
             logger.info(f"Analyzing reference image via Grok: {image_url[:100]}...")
-            analysis = await self.gemini_client.analyze_image_grok(
-                image_url=image_url,
-                prompt=prompt,
-            )
+            with muted_tokens():
+                analysis = await self.gemini_client.analyze_image_grok(
+                    image_url=image_url,
+                    prompt=prompt,
+                )
             logger.info(f"Grok reference analysis succeeded: {len(analysis)} chars")
             return analysis.strip()
         except Exception as e:
@@ -530,7 +537,7 @@ IMPORTANT: Output ONLY the optimized prompt. No preamble, no explanations."""
                 logger.info(f"Calling Grok with reference image (combined analyze+generate): {image_url[:80]}...")
                 optimized = await self.gemini_client.generate_prompt_with_reference_image(
                     image_url=image_url,
-                    system_prompt=SEEDREAM_PROMPT_GUIDE,
+                    system_prompt=get_prompt_registry().get("seedream_prompt_guide"),
                     user_prompt=combined_user_prompt,
                     max_tokens=500,
                     temperature=0.7,
@@ -573,7 +580,7 @@ IMPORTANT: Output ONLY the optimized prompt. No preamble, no explanations."""
                 "10. Keep 30–100 words total"
             )
             messages = [
-                {"role": "system", "content": SEEDREAM_VLOG_PROMPT_GUIDE},
+                {"role": "system", "content": get_prompt_registry().get("seedream_vlog_prompt_guide")},
                 {
                     "role": "user",
                     "content": f"""Optimize the following generation request into a high-quality Seedream prompt:
@@ -10,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.agent.skills.base import BaseSkill
 from app.agent.skills.image_generator import ImageGeneratorSkill
 from app.clients.parrot import get_parrot_client
+from app.clients.resilience import is_transient
 from app.clients.gmi_video import get_gmi_video_client
 from app.models.video import Video, VideoType, VideoStatus
 from app.models.image import Image, ImageType
@@ -76,7 +77,12 @@ class VideoGeneratorSkill(BaseSkill):
                 video_url = None
                 for _ in range(60):
                     await asyncio.sleep(10)
-                    status_result = await self.gmi_video.get_request_status(request_id)
+                    try:
+                        status_result = await self.gmi_video.get_request_status(request_id)
+                    except Exception as e:
+                        if not is_transient(e):
+                            raise
+                        continue
                     if status_result["status"] == "finished":
                         video_url = status_result.get("video_url")
                         break
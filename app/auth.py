@@ -10,6 +10,7 @@ from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.clients.limits import set_limit_key
 from app.config import get_settings
 from app.database import get_db
 from app.models.user import User
@@ -106,6 +107,8 @@ async def get_current_user(
             detail="User account is deactivated",
         )
 
+    # Provider calls made for this request (and tasks it spawns) share the user's fair share
+    set_limit_key(user.id)
     return user
 
 
@@ -153,4 +156,5 @@ async def get_optional_user(
     if user is None or not user.is_active:
         return None
 
+    set_limit_key(user.id)
     return user
@@ -1,10 +1,17 @@
 """API clients for external services."""
+from app.clients.http import HTTPClientRegistry, get_http_registry, http_client
+from app.clients.resilience import CircuitOpenError, get_resilience
 from app.clients.gpt import GPTClient, get_gpt_client
 from app.clients.gemini import GeminiClient, get_gemini_client
 from app.clients.seedream import SeedreamClient, get_seedream_client
 from app.clients.parrot import ParrotClient, get_parrot_client
 
 __all__ = [
+    "HTTPClientRegistry",
+    "get_http_registry",
+    "http_client",
+    "CircuitOpenError",
+    "get_resilience",
     "GPTClient",
     "get_gpt_client",
     "GeminiClient",
@@ -1,23 +1,183 @@
 """GMI Cloud client for AI operations (OpenAI-compatible API)."""
+import asyncio
 import base64
 import json
+import logging
+import math
 import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from statistics import NormalDist
+from types import SimpleNamespace
 from typing import Any, Optional, Union
 
-import httpx
 from openai import AsyncOpenAI
 
+from app.clients.resilience import get_resilience
 from app.config import get_settings
 
+logger = logging.getLogger(__name__)
+
+# When set, completions are streamed and each text delta is pushed to this
+# sink (an object with ``push(delta)`` and ``reset()``, see app.agent.events)
+current_token_sink: ContextVar[Optional[Any]] = ContextVar("current_token_sink", default=None)
+
+
+class _LostStream(Exception):
+    """A hedged streaming request that was beaten to the first token."""
+
+
+class _StreamClaim:
+    """Which route of a hedged call owns the token stream."""
+
+    def __init__(self):
+        self.owner: Optional["ModelRoute"] = None
+
+
+class _ThinkFilter:
+    """
+    Drops ``<think>...</think>`` reasoning (e.g. from Kimi) out of streamed
+    deltas. Tags split across chunks are held back until they resolve, and
+    whitespace before the answer proper is skipped.
+    """
+
+    OPEN = "<think>"
+    CLOSE = "</think>"
+
+    def __init__(self):
+        self._pending = ""
+        self._inside = False
+        self._started = False
+
+    @staticmethod
+    def _partial_tag(text: str, tag: str) -> int:
+        """Length of the longest prefix of ``tag`` that ``text`` ends with."""
+        for k in range(min(len(tag) - 1, len(text)), 0, -1):
+            if text.endswith(tag[:k]):
+                return k
+        return 0
+
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+    def feed(self, delta: str) -> str:
+        text, self._pending = self._pending + delta, ""
+        out = []
+        while text:
+            tag = self.CLOSE if self._inside else self.OPEN
+            idx = text.find(tag)
+            if idx == -1:
+                keep = self._partial_tag(text, tag)
+                if not self._inside:
+                    out.append(text[:len(text) - keep])
+                self._pending = text[len(text) - keep:]
+                break
+            if not self._inside:
+                out.append(text[:idx])
+            text = text[idx + len(tag):]
+            self._inside = not self._inside
+        return self._emit("".join(out))
+
+    def flush(self) -> str:
+        text, self._pending = self._pending, ""
+        return "" if self._inside else self._emit(text)
+
+
+def _completion_from_text(text: str):
+    """Minimal stand-in for a ChatCompletion, so callers read ``choices[0].message.content``."""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """A model on one of the two OpenAI-compatible endpoints ("gmi" or "xai")."""
+
+    provider: str
+    model: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+    def latency_key(self, kwargs: dict) -> str:
+        """Latency history of this route for one kind of call (see call_kind)."""
+        return f"{self.key}#{call_kind(kwargs)}"
+
+
+def call_kind(kwargs: dict) -> str:
+    """
+    Latency class of a completion request: modality and output budget.
+
+    A 500-token intent reply and a 4k-token creative or vision answer
+    take very different times on the same model, so each gets its own
+    EWMA (and hedge delay).
+    """
+    vision = any(
+        isinstance(message.get("content"), list)
+        and any(part.get("type") == "image_url" for part in message["content"])
+        for message in kwargs.get("messages", [])
+    )
+    max_tokens = kwargs.get("max_tokens") or 4096
+    size = "short" if max_tokens <= 512 else "medium" if max_tokens <= 2048 else "long"
+    return f"{'vision' if vision else 'text'}/{size}"
+
+
+@dataclass
+class _LatencyStats:
+    mean: float
+    var: float = 0.0
+    samples: int = 1
+
+
+class LatencyTracker:
+    """Exponentially weighted mean and variance of response latency per route."""
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self._stats: dict[str, _LatencyStats] = {}
+
+    def observe(self, key: str, seconds: float) -> None:
+        stats = self._stats.get(key)
+        if stats is None:
+            self._stats[key] = _LatencyStats(mean=seconds)
+            return
+        diff = seconds - stats.mean
+        stats.mean += self.alpha * diff
+        stats.var = (1 - self.alpha) * (stats.var + self.alpha * diff * diff)
+        stats.samples += 1
+
+    def quantile(self, key: str, z: float, min_samples: int = 5) -> Optional[float]:
+        """Latency estimate ``z`` deviations above the mean, once there is enough history."""
+        stats = self._stats.get(key)
+        if stats is None or stats.samples < min_samples:
+            return None
+        return stats.mean + z * math.sqrt(stats.var)
+
+    def snapshot(self) -> dict[str, dict]:
+        return {
+            key: {
+                "mean_seconds": round(stats.mean, 3),
+                "stddev_seconds": round(math.sqrt(stats.var), 3),
+                "samples": stats.samples,
+            }
+            for key, stats in self._stats.items()
+        }
+
 
 class GeminiClient:
     """Client for interacting with GMI Cloud models via OpenAI-compatible API."""
 
     def __init__(self):
         settings = get_settings()
+        # SDK retries are off: app.clients.resilience owns the retry policy
         self.client = AsyncOpenAI(
             api_key=settings.gmi_api_key,
             base_url=settings.gmi_base_url,
+            max_retries=0,
         )
         self.model_name = settings.gmi_model
         self.creative_model_name = settings.gmi_creative_model
@@ -28,10 +188,166 @@ class GeminiClient:
         self.grok_client = AsyncOpenAI(
             api_key=settings.xai_api_key,
             base_url=settings.xai_base_url,
+            max_retries=0,
         )
         self.grok_vision_model = settings.xai_vision_model  # grok-4-0709 (accurate vision)
         self.grok_text_model = settings.xai_text_model      # grok-4-fast-non-reasoning (fast text)
 
+        # Caps concurrent image loads when a request fans out over several images
+        self._image_load_semaphore = asyncio.Semaphore(max(settings.reference_prep_concurrency, 1))
+
+        # Hedging: if a route is slower than its usual tail, race an alternate
+        self.hedge_enabled = settings.llm_hedge_enabled
+        self.hedge_z = NormalDist().inv_cdf(min(max(settings.llm_hedge_percentile, 0.5), 0.999))
+        self.hedge_min_delay = settings.llm_hedge_min_delay
+        self.hedge_max_delay = settings.llm_hedge_max_delay
+        self.llm_deadline = settings.llm_deadline_seconds
+        self.latency = LatencyTracker(settings.llm_latency_ewma_alpha)
+        self.grok_text_route = ModelRoute("xai", self.grok_text_model)
+        self.grok_vision_route = ModelRoute("xai", self.grok_vision_model)
+        self.creative_route = ModelRoute("gmi", self.creative_model_name)
+        self.vision_route = ModelRoute("gmi", self.vision_model_name)
+
+    async def _complete_on(self, route: ModelRoute, claim: Optional[_StreamClaim] = None, **kwargs):
+        """Chat completion on ``route`` under the provider retry/breaker policy."""
+        client = self.grok_client if route.provider == "xai" else self.client
+        kwargs["model"] = route.model
+        sink = current_token_sink.get()
+        started = time.perf_counter()
+        if sink is None:
+            response = await get_resilience(route.provider).call(
+                lambda: client.chat.completions.create(**kwargs),
+                idempotent=True,
+                operation=f"chat {route.model}",
+            )
+        else:
+            response = await get_resilience(route.provider).call(
+                lambda: self._stream_completion(client, route, sink, claim, kwargs),
+                idempotent=True,
+                operation=f"chat {route.model} (stream)",
+            )
+        self.latency.observe(route.latency_key(kwargs), time.perf_counter() - started)
+        return response
+
+    async def _stream_completion(self, client: AsyncOpenAI, route: ModelRoute, sink, claim, kwargs: dict):
+        """Stream a completion into ``sink``; with a claim, only the first route to answer streams."""
+        if claim is None or claim.owner in (None, route):
+            sink.reset()  # A retry starts the answer over
+        stream = await client.chat.completions.create(stream=True, **kwargs)
+        think_filter = _ThinkFilter()
+        parts: list[str] = []
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if claim is not None:
+                    if claim.owner is None:
+                        claim.owner = route
+                        sink.reset()  # Drop a route's output that died mid-stream
+                    elif claim.owner != route:
+                        raise _LostStream(route.key)
+                text = think_filter.feed(delta)
+                if text:
+                    parts.append(text)
+                    sink.push(text)
+            text = think_filter.flush()
+            if text:
+                parts.append(text)
+                sink.push(text)
+        finally:
+            await stream.close()
+        return _completion_from_text("".join(parts))
+
+    async def _complete(self, **kwargs):
+        """GMI chat completion."""
+        return await self._complete_on(ModelRoute("gmi", kwargs.pop("model")), **kwargs)
+
+    async def _complete_grok(self, **kwargs):
+        """xAI chat completion."""
+        return await self._complete_on(ModelRoute("xai", kwargs.pop("model")), **kwargs)
+
+    def hedge_delay(self, latency_key: str) -> float:
+        """How long to wait on a route (for one kind of call) before also asking the alternate."""
+        estimate = self.latency.quantile(latency_key, self.hedge_z)
+        if estimate is None:
+            return self.hedge_max_delay
+        return min(max(estimate, self.hedge_min_delay), self.hedge_max_delay)
+
+    async def _hedged(self, primary: ModelRoute, alternate: Optional[ModelRoute], **kwargs):
+        """
+        Completion from ``primary``, hedged with ``alternate``.
+
+        If the primary has not answered within its hedge delay (its EWMA
+        latency at the configured percentile), or fails outright, the same
+        request goes to the alternate; the first successful answer wins and
+        the other request is cancelled. The whole exchange is bounded by
+        llm_deadline_seconds.
+        """
+        if not self.hedge_enabled or alternate is None or alternate == primary:
+            return await asyncio.wait_for(self._complete_on(primary, **kwargs), self.llm_deadline)
+        return await asyncio.wait_for(self._race(primary, alternate, kwargs), self.llm_deadline)
+
+    async def _race(self, primary: ModelRoute, alternate: ModelRoute, kwargs: dict):
+        started = time.perf_counter()
+        # When streaming, the hedge is on time to first token: whichever route
+        # starts answering first owns the stream and the other one stops
+        claim = _StreamClaim() if current_token_sink.get() is not None else None
+        # Each task maps to its route and the time it was started
+        tasks = {asyncio.create_task(self._complete_on(primary, claim=claim, **kwargs)): (primary, started)}
+        hedged = False
+        errors: list[Exception] = []
+        try:
+            while tasks:
+                streaming = claim is not None and claim.owner is not None
+                timeout = None if hedged or streaming else self.hedge_delay(primary.latency_key(kwargs))
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    route, _ = tasks.pop(task)
+                    if task.exception() is None:
+                        if hedged:
+                            logger.info(
+                                "LLM hedge won by %s after %.2fs",
+                                route.key,
+                                time.perf_counter() - started,
+                            )
+                        return task.result()
+                    errors.append(task.exception())
+                    logger.warning("LLM route %s failed: %s", route.key, task.exception())
+                    if claim is not None and claim.owner == route:
+                        claim.owner = None  # Died mid-stream; the next route to answer takes over
+                if hedged or (tasks and claim is not None and claim.owner is not None):
+                    continue
+                # Primary is slow (or already failed): bring in the alternate
+                hedged = True
+                if tasks:
+                    logger.info(
+                        "LLM %s slower than %.2fs, hedging with %s",
+                        primary.key,
+                        time.perf_counter() - started,
+                        alternate.key,
+                    )
+                tasks[asyncio.create_task(self._complete_on(alternate, claim=claim, **kwargs))] = (
+                    alternate,
+                    time.perf_counter(),
+                )
+            raise next((e for e in errors if not isinstance(e, _LostStream)), errors[0])
+        finally:
+            now = time.perf_counter()
+            for task, (route, task_started) in tasks.items():
+                task.cancel()
+                # A cancelled loser took at least this long; keep its EWMA honest
+                self.latency.observe(route.latency_key(kwargs), now - task_started)
+
+    def latency_stats(self) -> dict[str, dict]:
+        """EWMA latency per model route and call kind, with the current hedge delay."""
+        stats = self.latency.snapshot()
+        for key, entry in stats.items():
+            entry["hedge_delay_seconds"] = round(self.hedge_delay(key), 3)
+        return stats
+
     @staticmethod
     def _strip_thinking(text: str) -> str:
         """Strip Gemini's thinking/reasoning block from response.
@@ -65,7 +381,7 @@ class GeminiClient:
         if response_format:
             kwargs["response_format"] = response_format
 
-        response = await self.client.chat.completions.create(**kwargs)
+        response = await self._complete(**kwargs)
         return self._strip_thinking(response.choices[0].message.content)
 
     async def chat_json(
@@ -128,7 +444,7 @@ class GeminiClient:
 
         Routes through GMI OpenAI-compatible API using gmi_gpt_model setting.
         """
-        response = await self.client.chat.completions.create(
+        response = await self._complete(
             model=self.gpt_model_name,
             messages=messages,
             temperature=temperature,
@@ -142,9 +458,10 @@ class GeminiClient:
         temperature: float = 0.7,
         max_tokens: int = 4096,
     ) -> str:
-        """Use Grok fast model (xAI) for text-only tasks like prompt optimization."""
-        response = await self.grok_client.chat.completions.create(
-            model=self.grok_text_model,
+        """Use Grok fast model (xAI) for text-only tasks like prompt optimization (hedged with DeepSeek)."""
+        response = await self._hedged(
+            self.grok_text_route,
+            self.creative_route,
             messages=messages,
             temperature=temperature,
             max_tokens=max_tokens,
@@ -158,9 +475,8 @@ class GeminiClient:
         max_tokens: int = 4096,
         response_format: Optional[dict] = None,
     ) -> str:
-        """Use DeepSeek model for creative tasks like prompt rewriting."""
+        """Use DeepSeek model for creative tasks like prompt rewriting (hedged with Grok)."""
         kwargs = {
-            "model": self.creative_model_name,
             "messages": messages,
             "temperature": temperature,
             "max_tokens": max_tokens,
@@ -168,7 +484,7 @@ class GeminiClient:
         if response_format:
             kwargs["response_format"] = response_format
 
-        response = await self.client.chat.completions.create(**kwargs)
+        response = await self._hedged(self.creative_route, self.grok_text_route, **kwargs)
         return response.choices[0].message.content
 
     def _detect_mime_type(self, data: bytes, url: str = "", header_mime: str = "") -> str:
@@ -202,14 +518,20 @@ class GeminiClient:
         if image_url.startswith("data:"):
             return image_url
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(image_url)
-            response.raise_for_status()
-            mime_type = self._detect_mime_type(
-                response.content, image_url, response.headers.get("content-type", "")
-            )
-            base64_data = base64.b64encode(response.content).decode("utf-8")
-            return f"data:{mime_type};base64,{base64_data}"
+        from app.services.media import fetch_media
+
+        async with self._image_load_semaphore:
+            started = time.perf_counter()
+            content, content_type = await fetch_media(image_url, timeout=30.0)
+            mime_type = self._detect_mime_type(content, image_url, content_type)
+            base64_data = await asyncio.to_thread(base64.b64encode, content)
+        logger.info(
+            "Loaded vision image in %.0fms (%d bytes): %s",
+            (time.perf_counter() - started) * 1000,
+            len(content),
+            image_url[:120],
+        )
+        return f"data:{mime_type};base64,{base64_data.decode('utf-8')}"
 
     async def analyze_image(
         self,
@@ -233,7 +555,7 @@ class GeminiClient:
             }
         ]
 
-        response = await self.grok_client.chat.completions.create(
+        response = await self._complete_grok(
             model=self.grok_vision_model,
             messages=messages,
             max_tokens=4096,
@@ -266,7 +588,7 @@ class GeminiClient:
             }
         ]
 
-        response = await self.client.chat.completions.create(
+        response = await self._complete(
             model=self.vision_model_name,  # moonshotai/Kimi-K2.5
             messages=messages,
             max_tokens=4096,
@@ -281,7 +603,8 @@ class GeminiClient:
         """Analyze an image using Grok vision (grok-4-latest).
 
         Converts image to base64 data URL first to handle localhost/private URLs.
-        Used for reference image analysis in prompt generation.
+        Used for reference image analysis in prompt generation; hedged with
+        the GMI vision model when Grok is slow.
         """
         data_url = await self._load_image_as_data_url(image_url)
 
@@ -298,8 +621,9 @@ class GeminiClient:
             }
         ]
 
-        response = await self.grok_client.chat.completions.create(
-            model=self.grok_vision_model,
+        response = await self._hedged(
+            self.grok_vision_route,
+            self.vision_route,
             messages=messages,
             max_tokens=2048,
             temperature=0,
@@ -317,7 +641,7 @@ class GeminiClient:
         """Single Grok vision call: analyze reference image AND generate optimized prompt in one shot.
 
         Combines what was previously two sequential calls (analyze_image_grok + chat_grok)
-        into one call, cutting latency roughly in half.
+        into one call, cutting latency roughly in half. Hedged like analyze_image_grok.
         """
         data_url = await self._load_image_as_data_url(image_url)
 
@@ -335,8 +659,9 @@ class GeminiClient:
             },
         ]
 
-        response = await self.grok_client.chat.completions.create(
-            model=self.grok_vision_model,
+        response = await self._hedged(
+            self.grok_vision_route,
+            self.vision_route,
             messages=messages,
             max_tokens=max_tokens,
             temperature=temperature,
@@ -352,8 +677,10 @@ class GeminiClient:
         """Compare multiple images using Grok vision model."""
         content = [{"type": "text", "text": prompt}]
 
-        for url in image_urls:
-            data_url = await self._load_image_as_data_url(url)
+        data_urls = await asyncio.gather(
+            *(self._load_image_as_data_url(url) for url in image_urls)
+        )
+        for data_url in data_urls:
             content.append({
                 "type": "image_url",
                 "image_url": {"url": data_url},
@@ -361,7 +688,7 @@ class GeminiClient:
 
         messages = [{"role": "user", "content": content}]
 
-        response = await self.grok_client.chat.completions.create(
+        response = await self._complete_grok(
             model=self.grok_vision_model,
             messages=messages,
             max_tokens=4096,
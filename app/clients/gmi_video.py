@@ -4,13 +4,12 @@ from typing import Any, Optional
 
 import httpx
 
+from app.clients.http import http_client
+from app.clients.resilience import get_resilience
 from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 
-# GMI Video API base (different from the chat/LLM API at api.gmi-serving.com)
-GMI_VIDEO_BASE = "https://console.gmicloud.ai/api/v1/ie/requestqueue/apikey"
-
 
 class GMIVideoClient:
     """Client for GMI Cloud's Video generation REST API (Wan 2.6)."""
@@ -19,7 +18,8 @@ class GMIVideoClient:
         settings = get_settings()
         self.api_key = settings.gmi_api_key
         self.model = settings.gmi_video_model
-        self.queue_url = f"{GMI_VIDEO_BASE}/requests"
+        # GMI Video API base (different from the chat/LLM API at api.gmi-serving.com)
+        self.queue_url = f"{settings.gmi_video_api_url.strip().rstrip('/')}/requests"
         self.timeout = httpx.Timeout(180.0)
 
     def _headers(self) -> dict[str, str]:
@@ -60,7 +60,7 @@ class GMIVideoClient:
             "payload": inner_payload,
         }
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async with http_client("gmi", timeout=self.timeout) as client:
             logger.info(
                 "GMI Video create -> url=%s model=%s resolution=%s prompt=%s",
                 self.queue_url,
@@ -68,17 +68,24 @@ class GMIVideoClient:
                 resolution,
                 prompt[:100],
             )
-            response = await client.post(
-                self.queue_url,
-                json=payload,
-                headers=self._headers(),
+
+            async def _submit() -> httpx.Response:
+                response = await client.post(
+                    self.queue_url,
+                    json=payload,
+                    headers=self._headers(),
+                )
+                if response.status_code != 200:
+                    body = response.text[:500]
+                    logger.error("GMI Video API error %s: %s", response.status_code, body)
+                    if "inappropriate" in body.lower() or "content" in body.lower():
+                        raise ValueError("Video model does not support NSFW content. Please use V1 or try a different image.")
+                    response.raise_for_status()
+                return response
+
+            response = await get_resilience("gmi_video").call(
+                _submit, idempotent=False, operation="create_image_to_video"
             )
-            if response.status_code != 200:
-                body = response.text[:500]
-                logger.error("GMI Video API error %s: %s", response.status_code, body)
-                if "inappropriate" in body.lower() or "content" in body.lower():
-                    raise ValueError("Video model does not support NSFW content. Please use V1 or try a different image.")
-                response.raise_for_status()
             result = response.json()
 
             request_id = result.get("request_id") or result.get("id")
@@ -98,9 +105,16 @@ class GMIVideoClient:
         """
         url = f"{self.queue_url}/{request_id}"
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url, headers=self._headers())
-            response.raise_for_status()
+        async with http_client("gmi", timeout=self.timeout) as client:
+
+            async def _poll() -> httpx.Response:
+                response = await client.get(url, headers=self._headers())
+                response.raise_for_status()
+                return response
+
+            response = await get_resilience("gmi_video").call(
+                _poll, idempotent=True, operation="get_request_status"
+            )
             result = response.json()
 
         raw_status = (result.get("status") or "").lower()
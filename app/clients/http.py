@@ -0,0 +1,174 @@
+"""Process-wide pooled HTTP clients for outbound traffic."""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+TimeoutTypes = Union[float, httpx.Timeout, None]
+
+_UNSET = object()
+
+
+class PooledClient:
+    """
+    View of a shared ``httpx.AsyncClient`` with per-call defaults.
+
+    Call sites keep their own timeout / redirect policy without creating (and
+    TLS-handshaking) a new client each time; the underlying connection pool
+    stays open for the life of the process.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, timeout=_UNSET, follow_redirects: Optional[bool] = None):
+        self._client = client
+        self._timeout = timeout
+        self._follow_redirects = follow_redirects
+
+    def _defaults(self, kwargs: dict) -> dict:
+        if self._timeout is not _UNSET:
+            kwargs.setdefault("timeout", self._timeout)
+        if self._follow_redirects is not None:
+            kwargs.setdefault("follow_redirects", self._follow_redirects)
+        return kwargs
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        return await self._client.request(method, url, **self._defaults(kwargs))
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def head(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("HEAD", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", url, **kwargs)
+
+    async def patch(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PATCH", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
+
+    def stream(self, method: str, url: str, **kwargs):
+        """Streaming request; use as ``async with client.stream(...) as response``."""
+        return self._client.stream(method, url, **self._defaults(kwargs))
+
+
+class HTTPClientRegistry:
+    """
+    Named, long-lived ``httpx.AsyncClient`` instances.
+
+    Each name (usually one per provider) gets its own connection pool with
+    keep-alive, so a slow provider cannot starve the others of connections.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(
+            settings.http_timeout,
+            connect=settings.http_connect_timeout,
+        )
+        self.http2 = settings.http_http2
+        if self.http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("http_http2 is enabled but the h2 package is missing; using HTTP/1.1")
+                self.http2 = False
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def get(self, name: str = "default") -> httpx.AsyncClient:
+        """Get (or lazily create) the shared client for ``name``."""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+            )
+            self._clients[name] = client
+        return client
+
+    async def warm_up(self, targets: dict[str, list[str]]) -> None:
+        """
+        Open a keep-alive connection to each origin ahead of the first request.
+
+        ``targets`` maps client names to URLs; failures are only logged.
+        """
+        async def _touch(name: str, url: str) -> None:
+            parts = urlsplit(url)
+            origin = f"{parts.scheme}://{parts.netloc}/"
+            try:
+                await self.get(name).head(origin, timeout=5.0)
+            except Exception as e:
+                logger.info("HTTP warm-up of %s (%s) failed: %s", origin, name, e)
+
+        await asyncio.gather(*(
+            _touch(name, url)
+            for name, urls in targets.items()
+            for url in urls
+            if url and url.startswith("http")
+        ))
+
+    async def close(self) -> None:
+        """Close every pooled client."""
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing HTTP client: {e}")
+
+
+_registry: Optional[HTTPClientRegistry] = None
+
+
+def get_http_registry() -> HTTPClientRegistry:
+    """Get HTTP client registry instance."""
+    global _registry
+    if _registry is None:
+        _registry = HTTPClientRegistry()
+    return _registry
+
+
+@asynccontextmanager
+async def http_client(
+    name: str = "default",
+    timeout: TimeoutTypes = _UNSET,
+    follow_redirects: Optional[bool] = None,
+) -> AsyncIterator[PooledClient]:
+    """
+    Drop-in for ``async with httpx.AsyncClient(...) as client`` that reuses
+    the pooled client for ``name`` instead of opening a new one.
+    """
+    yield PooledClient(get_http_registry().get(name), timeout, follow_redirects)
+
+
+async def warm_up_http_clients() -> None:
+    """Pre-connect to the configured provider endpoints."""
+    settings = get_settings()
+    await get_http_registry().warm_up({
+        "seedream": [settings.seedream_server_url],
+        "parrot": [settings.parrot_api_url],
+        "gmi": [settings.gmi_base_url],
+    })
+
+
+async def close_http_clients() -> None:
+    """Close all pooled clients (application shutdown)."""
+    if _registry is not None:
+        await _registry.close()
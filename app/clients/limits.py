@@ -0,0 +1,184 @@
+"""Per-provider concurrency caps and request rates, shared fairly between users."""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Whose work the current task is doing; set by the auth dependencies and
+# inherited by background tasks spawned from the request
+current_limit_key: ContextVar[Optional[str]] = ContextVar("current_limit_key", default=None)
+
+SYSTEM_KEY = "_system"
+
+# Per-provider defaults; provider_limits (JSON) overrides these
+PROVIDER_LIMITS: dict[str, dict[str, float]] = {
+    # Generations hold a connection for up to minutes
+    "seedream": {"max_concurrent": 8, "rate_per_second": 2.0},
+    "parrot": {"max_concurrent": 8, "rate_per_second": 5.0},
+    "gmi_video": {"max_concurrent": 4, "rate_per_second": 2.0},
+    "xai": {"max_concurrent": 16, "rate_per_second": 8.0},
+}
+
+
+def set_limit_key(key: Optional[str]) -> None:
+    """Attribute provider calls made from the current context to ``key`` (a user ID)."""
+    current_limit_key.set(key)
+
+
+class FairLimiter:
+    """
+    Concurrency cap plus token-bucket rate for one provider.
+
+    Callers over the limit wait in a per-user FIFO, and freed slots are
+    handed out round-robin across users, so one user's burst of requests
+    queues behind itself instead of starving everyone else.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, rate_per_second: float, burst: Optional[float] = None):
+        self.name = name
+        self.max_concurrent = max(int(max_concurrent), 1)
+        self.rate = max(rate_per_second, 0.0)
+        self.burst = max(burst if burst is not None else self.rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._in_flight = 0
+        self._queues: "OrderedDict[str, deque[asyncio.Future]]" = OrderedDict()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.waited = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _can_start(self) -> bool:
+        if self._in_flight >= self.max_concurrent:
+            return False
+        if not self.rate:
+            return True
+        self._refill()
+        return self._tokens >= 1
+
+    def _start(self) -> None:
+        self._in_flight += 1
+        if self.rate:
+            self._tokens -= 1
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting callers, one user at a time."""
+        while self._queues and self._can_start():
+            key, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            if waiter.done():
+                continue
+            self._start()
+            waiter.set_result(None)
+
+        if self._queues and self.rate and self._in_flight < self.max_concurrent and self._timer is None:
+            # Blocked on the rate only: wake up when the next token is due
+            delay = max((1 - self._tokens) / self.rate, 0.001)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    async def acquire(self) -> None:
+        if not self._queues and self._can_start():
+            self._start()
+            return
+
+        key = current_limit_key.get() or SYSTEM_KEY
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append(waiter)
+        started = time.monotonic()
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we were cancelled: give the slot back
+                self.release()
+            else:
+                queue = self._queues.get(key)
+                if queue is not None and waiter in queue:
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._queues[key]
+            raise
+        finally:
+            waited = time.monotonic() - started
+            self.waited += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        if waited > 1.0:
+            logger.info("%s request of %s waited %.1fs for a slot", self.name, key, waited)
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "rate_per_second": self.rate,
+            "in_flight": self._in_flight,
+            "queued": self.queued,
+            "queued_users": len(self._queues),
+            "waited": self.waited,
+            "wait_seconds_avg": round(self.wait_seconds_total / self.waited, 3) if self.waited else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 3),
+        }
+
+
+def _configured_limits(name: str) -> dict[str, float]:
+    settings = get_settings()
+    limits = {
+        "max_concurrent": settings.provider_max_concurrent,
+        "rate_per_second": settings.provider_rate_per_second,
+    }
+    limits.update(PROVIDER_LIMITS.get(name, {}))
+    if settings.provider_limits:
+        try:
+            limits.update(json.loads(settings.provider_limits).get(name, {}))
+        except (ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring invalid provider_limits setting: {e}")
+    return limits
+
+
+def build_limiter(name: str) -> FairLimiter:
+    """Limiter for ``name`` from the provider_* settings and PROVIDER_LIMITS."""
+    limits = _configured_limits(name)
+    return FairLimiter(
+        name,
+        max_concurrent=limits["max_concurrent"],
+        rate_per_second=limits["rate_per_second"],
+        burst=limits.get("burst"),
+    )
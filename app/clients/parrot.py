@@ -6,6 +6,8 @@ from pathlib import Path
 
 import httpx
 
+from app.clients.http import PooledClient, http_client
+from app.clients.resilience import get_resilience, is_transient
 from app.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -42,7 +44,31 @@ class ParrotClient:
 
     async def _post_with_auth_fallback(
         self,
-        client: httpx.AsyncClient,
+        client: PooledClient,
+        url: str,
+        *,
+        files: dict,
+        data: dict,
+        log_prefix: str,
+        api_key: Optional[str] = None,
+    ) -> httpx.Response:
+        """
+        POST request with X-API-KEY, retry with Authorization if auth fails.
+
+        Job submission is not idempotent, so transient failures are only
+        resent when Parrot never processed the request.
+        """
+        return await get_resilience("parrot").call(
+            lambda: self._post_once(
+                client, url, files=files, data=data, log_prefix=log_prefix, api_key=api_key
+            ),
+            idempotent=False,
+            operation=log_prefix,
+        )
+
+    async def _post_once(
+        self,
+        client: PooledClient,
         url: str,
         *,
         files: dict,
@@ -50,7 +76,6 @@ class ParrotClient:
         log_prefix: str,
         api_key: Optional[str] = None,
     ) -> httpx.Response:
-        """POST request with X-API-KEY, retry with Authorization if auth fails."""
         key = api_key if api_key is not None else self.api_key
         response = await client.post(
             url,
@@ -85,11 +110,11 @@ class ParrotClient:
             raise exc
 
     async def _download_binary(self, url: str) -> bytes:
-        """Download binary content from URL."""
-        async with httpx.AsyncClient(timeout=httpx.Timeout(30.0)) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.content
+        """Download binary content from URL (our own uploads come from storage)."""
+        from app.services.media import fetch_media
+
+        content, _ = await fetch_media(url, timeout=30.0)
+        return content
 
     def _infer_audio_content_type(self, filename: str) -> str:
         lowered = filename.lower()
@@ -152,7 +177,7 @@ class ParrotClient:
         if resolution:
             data["resolution"] = resolution
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async with http_client("parrot", timeout=self.timeout) as client:
             logger.info(
                 "Parrot create_image_to_video -> url=%s prompt=%s",
                 f"{self.base_url}/image-to-video-v2",
@@ -260,7 +285,7 @@ class ParrotClient:
         logger.info("API Key: %s...%s", self.addition_api_key[:10], self.addition_api_key[-4:])
         logger.info("============================")
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async with http_client("parrot", timeout=self.timeout) as client:
             logger.info(
                 "Pika Addition API -> url=%s prompt=%s",
                 addition_url,
@@ -348,7 +373,7 @@ class ParrotClient:
         logger.info("promptText: %s, resolution: %s", prompt_text, resolution)
         logger.info("============================")
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async with http_client("parrot", timeout=self.timeout) as client:
             logger.info(
                 "create_animate_video -> url=%s prompt=%s",
                 animate_url,
@@ -439,7 +464,7 @@ class ParrotClient:
                 audio_filename = path.name
             files["audio"] = (audio_filename, audio_data, self._infer_audio_content_type(audio_filename))
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async with http_client("parrot", timeout=self.timeout) as client:
             url = self.v2_audio_api_url
             logger.info("Parrot v2-audio -> url=%s prompt=%s", url, prompt_text[:100])
             response = await self._post_with_auth_fallback(
@@ -515,7 +540,7 @@ class ParrotClient:
         }
         data = {"promptText": prompt_text}
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async with http_client("parrot", timeout=self.timeout) as client:
             logger.info(
                 "Parrot create_audio_to_video -> url=%s prompt=%s",
                 f"{self.base_url}/audio-to-video",
@@ -563,12 +588,19 @@ class ParrotClient:
             base_url = self.base_url
             api_key = self.api_key
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(
-                f"{base_url}/videos/{video_id}",
-                headers=self._build_headers(api_key=api_key),
+        async with http_client("parrot", timeout=self.timeout) as client:
+
+            async def _poll() -> httpx.Response:
+                response = await client.get(
+                    f"{base_url}/videos/{video_id}",
+                    headers=self._build_headers(api_key=api_key),
+                )
+                response.raise_for_status()
+                return response
+
+            response = await get_resilience("parrot").call(
+                _poll, idempotent=True, operation="get_video_status"
             )
-            response.raise_for_status()
             result = response.json()
 
             # Normalize response format
@@ -610,7 +642,16 @@ class ParrotClient:
         last_status = None
 
         while elapsed < timeout:
-            result = await self.get_video_status(video_id, use_addition_api=use_addition_api)
+            try:
+                result = await self.get_video_status(video_id, use_addition_api=use_addition_api)
+            except Exception as e:
+                # The job keeps running at Parrot; a blip in polling must not fail it
+                if not is_transient(e):
+                    raise
+                logger.warning("Parrot poll for %s failed transiently: %s", video_id, e)
+                await asyncio.sleep(poll_interval)
+                elapsed += poll_interval
+                continue
             status = result.get("status", "").lower()
 
             # Log full response for debugging
@@ -640,7 +681,7 @@ class ParrotClient:
     async def health_check(self) -> bool:
         """Check if the Parrot server is available."""
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(10.0)) as client:
+            async with http_client("parrot", timeout=httpx.Timeout(10.0)) as client:
                 response = await client.get(
                     f"{self.base_url}/health",
                     headers=self._build_headers(),
@@ -0,0 +1,367 @@
+"""Retry, timeout and circuit-breaker policy shared by provider clients."""
+import asyncio
+import logging
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import httpx
+import openai
+
+from app.clients.limits import build_limiter
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Worth retrying: overloaded provider or a proxy in between hiccupped
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+# The provider turned the request away before doing any work, so even a
+# non-idempotent call (job submission, paid generation) can be resent
+REJECTED_STATUSES = frozenset({425, 429, 503})
+
+_CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Per-provider deviations from the resilience_* defaults
+PROVIDER_OVERRIDES: dict[str, dict[str, Any]] = {
+    # Generations take minutes and are billed; resends only happen for
+    # rejected/unsent requests anyway, one extra attempt is plenty
+    "seedream": {"max_attempts": 2},
+    # Status polls are cheap GETs; ride out short blips during long jobs
+    "parrot": {"max_attempts": 4},
+    "gmi_video": {"max_attempts": 4},
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+    def __init__(self, provider: str, retry_after: float):
+        self.provider = provider
+        self.retry_after = retry_after
+        super().__init__(
+            f"{provider} is temporarily unavailable, retry in {max(retry_after, 1):.0f}s"
+        )
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code
+    return None
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header on the failed response, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def is_provider_failure(exc: BaseException) -> bool:
+    """Whether an error says the provider (or the path to it) is unhealthy."""
+    if isinstance(exc, (httpx.TransportError, openai.APIConnectionError, asyncio.TimeoutError)):
+        return True
+    status = _status_code(exc)
+    return status is not None and (status >= 500 or status == 408)
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether an error is a passing provider/network condition worth retrying later."""
+    if isinstance(exc, CircuitOpenError) or is_provider_failure(exc):
+        return True
+    return _status_code(exc) in RETRYABLE_STATUSES
+
+
+def _safe_to_resend(exc: BaseException) -> bool:
+    """Whether a non-idempotent request can be resent: it was never processed."""
+    if isinstance(exc, _CONNECT_ERRORS):
+        return True
+    if isinstance(exc, openai.APIConnectionError) and isinstance(exc.__cause__, _CONNECT_ERRORS):
+        return True
+    return _status_code(exc) in REJECTED_STATUSES
+
+
+@dataclass
+class RetryPolicy:
+    """Retry and breaker parameters of one provider."""
+
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    timeout: Optional[float] = None  # Per-attempt cap on top of the HTTP client timeout
+    budget_ratio: float = 0.2
+    budget_min_per_second: float = 0.5
+    failure_threshold: int = 5  # Consecutive failures that open the breaker; 0 disables it
+    reset_timeout: float = 30.0
+    half_open_max_calls: int = 1
+
+    @classmethod
+    def for_provider(cls, name: str) -> "RetryPolicy":
+        settings = get_settings()
+        policy = cls(
+            max_attempts=max(settings.resilience_max_attempts, 1),
+            base_delay=settings.resilience_base_delay,
+            max_delay=settings.resilience_max_delay,
+            budget_ratio=settings.resilience_retry_budget_ratio,
+            failure_threshold=settings.resilience_breaker_failure_threshold,
+            reset_timeout=settings.resilience_breaker_reset_seconds,
+        )
+        for key, value in PROVIDER_OVERRIDES.get(name, {}).items():
+            setattr(policy, key, value)
+        return policy
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential delay before retry number ``attempt``."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of recent traffic.
+
+    Each call deposits ``ratio`` tokens and each retry spends one, plus a
+    small floor refilled over time so a quiet provider can still be retried.
+    When a provider is down this caps the extra load at ``ratio`` instead of
+    multiplying every request by ``max_attempts``.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, capacity: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self) -> None:
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+
+@dataclass
+class ProviderMetrics:
+    """Counters and breaker state of one provider, for the admin endpoint."""
+
+    provider: str
+    state: str = "closed"
+    state_since: float = field(default_factory=time.time)
+    attempts: int = 0
+    successes: int = 0
+    failures: int = 0
+    retries: int = 0
+    retries_denied: int = 0
+    short_circuited: int = 0
+    opened: int = 0
+    half_opened: int = 0
+    closed: int = 0
+    consecutive_failures: int = 0
+    last_error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after ``failure_threshold`` consecutive failures; open
+    calls fail fast with CircuitOpenError until ``reset_timeout`` passes;
+    then half-open lets a few probes through and closes on the first
+    success or re-opens on a failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, policy: RetryPolicy, metrics: ProviderMetrics):
+        self.name = name
+        self.policy = policy
+        self.metrics = metrics
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        logger.warning("Circuit breaker %s: %s -> %s", self.name, self.state, state)
+        self.state = state
+        self.metrics.state = state
+        self.metrics.state_since = time.time()
+        if state == self.OPEN:
+            self._opened_at = time.monotonic()
+            self.metrics.opened += 1
+        elif state == self.HALF_OPEN:
+            self.metrics.half_opened += 1
+        else:
+            self.metrics.closed += 1
+
+    def before_call(self) -> bool:
+        """Admit a call or raise CircuitOpenError; returns True for a half-open probe."""
+        if self.policy.failure_threshold <= 0:
+            return False
+        if self.state == self.OPEN:
+            remaining = self.policy.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                self.metrics.short_circuited += 1
+                raise CircuitOpenError(self.name, remaining)
+            self._transition(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._probes >= self.policy.half_open_max_calls:
+                self.metrics.short_circuited += 1
+                raise CircuitOpenError(self.name, 1.0)
+            self._probes += 1
+            return True
+        return False
+
+    def release(self, probe: bool) -> None:
+        """Forget a call that ended without a verdict (cancelled)."""
+        if probe:
+            self._probes -= 1
+
+    def record_success(self, probe: bool) -> None:
+        self.release(probe)
+        self._failures = 0
+        self.metrics.consecutive_failures = 0
+        if self.state == self.HALF_OPEN:
+            self._transition(self.CLOSED)
+
+    def record_failure(self, probe: bool) -> None:
+        self.release(probe)
+        self._failures += 1
+        self.metrics.consecutive_failures = self._failures
+        if self.policy.failure_threshold <= 0:
+            return
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED and self._failures >= self.policy.failure_threshold
+        ):
+            self._transition(self.OPEN)
+
+
+class ProviderResilience:
+    """Limits, retry budget, circuit breaker and metrics wrapped around one provider's calls."""
+
+    def __init__(self, name: str, policy: Optional[RetryPolicy] = None):
+        self.name = name
+        self.policy = policy or RetryPolicy.for_provider(name)
+        self.metrics = ProviderMetrics(provider=name)
+        self.breaker = CircuitBreaker(name, self.policy, self.metrics)
+        self.budget = RetryBudget(self.policy.budget_ratio, self.policy.budget_min_per_second)
+        self.limiter = build_limiter(name)
+
+    def _should_retry(self, exc: Exception, attempt: int, idempotent: bool) -> bool:
+        if attempt >= self.policy.max_attempts or isinstance(exc, CircuitOpenError):
+            return False
+        if not is_transient(exc):
+            return False
+        if not idempotent and not _safe_to_resend(exc):
+            return False
+        if not self.budget.try_spend():
+            self.metrics.retries_denied += 1
+            return False
+        return True
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        *,
+        idempotent: bool,
+        operation: str = "call",
+        timeout: Optional[float] = None,
+    ) -> T:
+        """
+        Run ``fn`` (a fresh request per invocation) under the provider policy.
+
+        Idempotent calls (status polls, LLM completions) are retried on any
+        transient error. Non-idempotent ones (job submission, paid
+        generation) are only resent when the provider provably never
+        processed them: connection failures and 429/503-style rejections.
+        """
+        timeout = timeout if timeout is not None else self.policy.timeout
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            attempt += 1
+            probe = self.breaker.before_call()
+            try:
+                # Every attempt takes a concurrency slot and a rate token;
+                # none is held while backing off
+                async with self.limiter.slot():
+                    self.metrics.attempts += 1
+                    if timeout:
+                        result = await asyncio.wait_for(fn(), timeout)
+                    else:
+                        result = await fn()
+            except asyncio.CancelledError:
+                self.breaker.release(probe)
+                raise
+            except Exception as exc:
+                if is_provider_failure(exc):
+                    self.metrics.failures += 1
+                    self.metrics.last_error = f"{type(exc).__name__}: {str(exc)[:200]}"
+                    self.breaker.record_failure(probe)
+                else:
+                    # The provider answered (e.g. a 4xx), so it is up
+                    self.breaker.record_success(probe)
+                if not self._should_retry(exc, attempt, idempotent):
+                    raise
+                delay = self.policy.backoff(attempt, _retry_after(exc))
+                self.metrics.retries += 1
+                logger.warning(
+                    "%s %s attempt %d/%d failed (%s: %s); retrying in %.2fs",
+                    self.name,
+                    operation,
+                    attempt,
+                    self.policy.max_attempts,
+                    type(exc).__name__,
+                    str(exc)[:200],
+                    delay,
+                )
+                await asyncio.sleep(delay)
+                continue
+            self.metrics.successes += 1
+            self.breaker.record_success(probe)
+            return result
+
+
+_providers: dict[str, ProviderResilience] = {}
+
+
+def get_resilience(name: str) -> ProviderResilience:
+    """Get (or lazily create) the resilience wrapper for a provider."""
+    provider = _providers.get(name)
+    if provider is None:
+        provider = ProviderResilience(name)
+        _providers[name] = provider
+    return provider
+
+
+def resilience_snapshot() -> list[dict]:
+    """Metrics, breaker state and limiter queues of every provider seen so far."""
+    return [
+        {**provider.metrics.to_dict(), "limits": provider.limiter.stats()}
+        for provider in _providers.values()
+    ]
@@ -1,17 +1,39 @@
 """Seedream 4.5 client for image generation."""
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Optional
+import asyncio
 import base64
 import logging
+import time
 from io import BytesIO
 
 import httpx
 from PIL import Image
 
+from app.clients.http import http_client
+from app.clients.resilience import get_resilience
 from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 
 
+def _encode_reference_jpeg(content: bytes) -> bytes:
+    """Decode, flatten transparency onto white and re-encode as JPEG (CPU-bound)."""
+    image = Image.open(BytesIO(content))
+    if image.mode in ("RGBA", "LA", "P"):
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        if image.mode == "P":
+            image = image.convert("RGBA")
+        background.paste(image, mask=image.split()[-1])
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=92, optimize=True)
+    return buffer.getvalue()
+
+
 class SeedreamClient:
     """Client for interacting with Seedream 4.5 image generation API."""
 
@@ -35,6 +57,12 @@ class SeedreamClient:
             self.generate_path = "/images/generations"
         if not self.reference_path:
             self.reference_path = self.generate_path
+        # Reference prep: bounded fan-out, image work kept off the event loop
+        self._reference_semaphore = asyncio.Semaphore(max(settings.reference_prep_concurrency, 1))
+        self._reference_executor = ThreadPoolExecutor(
+            max_workers=max(settings.reference_prep_workers, 1),
+            thread_name_prefix="seedream-refs",
+        )
 
     def _normalize_path(self, path: str) -> str:
         if not path:
@@ -71,26 +99,29 @@ class SeedreamClient:
     async def _to_data_url(self, image_url: str) -> Optional[str]:
         if image_url.startswith("data:image/"):
             return image_url
-        if image_url.startswith("/") and self.public_base_url:
-            image_url = f"{self.public_base_url}{image_url}"
+        from app.services.media import fetch_media
+
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(30.0)) as client:
-                resp = await client.get(image_url)
-                resp.raise_for_status()
-                image = Image.open(BytesIO(resp.content))
-                if image.mode in ("RGBA", "LA", "P"):
-                    background = Image.new("RGB", image.size, (255, 255, 255))
-                    if image.mode == "P":
-                        image = image.convert("RGBA")
-                    background.paste(image, mask=image.split()[-1])
-                    image = background
-                elif image.mode != "RGB":
-                    image = image.convert("RGB")
-
-                buffer = BytesIO()
-                image.save(buffer, format="JPEG", quality=92, optimize=True)
-                b64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
-                return f"data:image/jpeg;base64,{b64}"
+            async with self._reference_semaphore:
+                started = time.perf_counter()
+                content, _ = await fetch_media(image_url, timeout=30.0)
+                fetched = time.perf_counter()
+                loop = asyncio.get_running_loop()
+                jpeg = await loop.run_in_executor(
+                    self._reference_executor, _encode_reference_jpeg, content
+                )
+                b64 = await loop.run_in_executor(self._reference_executor, base64.b64encode, jpeg)
+                finished = time.perf_counter()
+            logger.info(
+                "Seedream reference prepared in %.0fms (fetch %.0fms, encode %.0fms, %d -> %d bytes): %s",
+                (finished - started) * 1000,
+                (fetched - started) * 1000,
+                (finished - fetched) * 1000,
+                len(content),
+                len(jpeg),
+                image_url[:120],
+            )
+            return f"data:image/jpeg;base64,{b64.decode('utf-8')}"
         except Exception as exc:
             logger.warning("Failed to fetch reference image url: %s (%s)", image_url, exc)
             return None
@@ -99,11 +130,16 @@ class SeedreamClient:
         self,
         reference_images: list[str],
     ) -> list[str]:
-        prepared: list[str] = []
-        for url in reference_images:
-            data_url = await self._to_data_url(url)
-            if data_url:
-                prepared.append(data_url)
+        """Convert references to data URLs concurrently, keeping their order."""
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self._to_data_url(url) for url in reference_images))
+        prepared = [data_url for data_url in results if data_url]
+        logger.info(
+            "Seedream prepared %d/%d reference images in %.0fms",
+            len(prepared),
+            len(reference_images),
+            (time.perf_counter() - started) * 1000,
+        )
         return prepared
 
     async def generate(
@@ -196,7 +232,7 @@ class SeedreamClient:
                         "All reference images failed to load; skipping references."
                     )
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async with http_client("seedream", timeout=self.timeout) as client:
             logger.info(
                 "Seedream request settings: watermark=%s response_format=%s",
                 self.watermark,
@@ -221,33 +257,41 @@ class SeedreamClient:
                         logger.info("Seedream payload has %d reference images prepared", len(img_val))
                     else:
                         logger.info("Seedream payload has 1 reference image prepared")
-            response = await client.post(
-                self._build_url(request_path),
-                json=payload,
-                headers=self._build_headers(),
-            )
-            try:
-                response.raise_for_status()
-            except httpx.HTTPStatusError as exc:
-                body = ""
-                try:
-                    body = response.text
-                except Exception:
-                    body = "<unreadable>"
-                logger.error(
-                    "Seedream request failed status=%s body=%s",
-                    response.status_code,
-                    body[:2000],
+
+            async def _send() -> httpx.Response:
+                response = await client.post(
+                    self._build_url(request_path),
+                    json=payload,
+                    headers=self._build_headers(),
                 )
-                debug_payload = {k: v for k, v in payload.items() if k != "image"}
-                if "image" in payload:
-                    img_val = payload["image"]
-                    if isinstance(img_val, list):
-                        debug_payload["image"] = f"[{len(img_val)} images]"
-                    else:
-                        debug_payload["image"] = "[1 image]"
-                logger.error("Seedream request payload: %s", debug_payload)
-                raise exc
+                try:
+                    response.raise_for_status()
+                except httpx.HTTPStatusError as exc:
+                    body = ""
+                    try:
+                        body = response.text
+                    except Exception:
+                        body = "<unreadable>"
+                    logger.error(
+                        "Seedream request failed status=%s body=%s",
+                        response.status_code,
+                        body[:2000],
+                    )
+                    debug_payload = {k: v for k, v in payload.items() if k != "image"}
+                    if "image" in payload:
+                        img_val = payload["image"]
+                        if isinstance(img_val, list):
+                            debug_payload["image"] = f"[{len(img_val)} images]"
+                        else:
+                            debug_payload["image"] = "[1 image]"
+                    logger.error("Seedream request payload: %s", debug_payload)
+                    raise exc
+                return response
+
+            # Generations are billed: only resent if Seedream never processed them
+            response = await get_resilience("seedream").call(
+                _send, idempotent=False, operation="generate"
+            )
             data = response.json()
             if "image_url" not in data:
                 try:
@@ -294,18 +338,25 @@ class SeedreamClient:
         if kwargs.get("seed") is not None:
             payload["seed"] = kwargs["seed"]
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                f"{self.base_url}/generate/controlnet",
-                json=payload,
+        async with http_client("seedream", timeout=self.timeout) as client:
+
+            async def _send() -> httpx.Response:
+                response = await client.post(
+                    f"{self.base_url}/generate/controlnet",
+                    json=payload,
+                )
+                response.raise_for_status()
+                return response
+
+            response = await get_resilience("seedream").call(
+                _send, idempotent=False, operation="generate_with_controlnet"
             )
-            response.raise_for_status()
             return response.json()
 
     async def health_check(self) -> bool:
         """Check if the Seedream server is healthy."""
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(10.0)) as client:
+            async with http_client("seedream", timeout=httpx.Timeout(10.0)) as client:
                 response = await client.get(f"{self.base_url}/health")
                 return response.status_code == 200
         except Exception:
@@ -10,6 +10,7 @@ from typing import Any, Optional
 
 import httpx
 
+from app.clients.http import http_client
 from app.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -110,7 +111,7 @@ class TwitterClient:
         if image_url.startswith("/") and self.public_base_url:
             image_url = f"{self.public_base_url}{image_url}"
 
-        async with httpx.AsyncClient(timeout=httpx.Timeout(30.0)) as client:
+        async with http_client("media", timeout=httpx.Timeout(30.0)) as client:
             resp = await client.get(image_url)
             resp.raise_for_status()
             content_type = resp.headers.get("content-type", "image/jpeg")
@@ -139,7 +140,7 @@ class TwitterClient:
 
         auth_header = self._build_oauth_header("POST", self.UPLOAD_URL, body_params)
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async with http_client("twitter", timeout=self.timeout) as client:
             response = await client.post(
                 self.UPLOAD_URL,
                 data=body_params,
@@ -191,7 +192,7 @@ class TwitterClient:
 
         auth_header = self._build_oauth_header("POST", self.TWEET_URL)
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        async with http_client("twitter", timeout=self.timeout) as client:
             response = await client.post(
                 self.TWEET_URL,
                 json=payload,
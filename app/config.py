@@ -40,6 +40,7 @@ class Settings(BaseSettings):
     gmi_vision_model: str = "moonshotai/Kimi-K2.5"
     gmi_gpt_model: str = "openai/gpt-4o"
     gmi_video_model: str = "wan2.6-i2v"
+    gmi_video_api_url: str = "https://console.gmicloud.ai/api/v1/ie/requestqueue/apikey"
 
     # xAI Grok (vision model for reference image analysis)
     xai_api_key: str = ""
@@ -83,15 +84,67 @@ class Settings(BaseSettings):
     # Storage
     public_base_url: str = "http://localhost:8000"
     upload_dir: str = "public/uploads"
+    storage_stream_chunk_size: int = 256 * 1024  # Bytes per chunk when streaming /uploads
+    storage_chunk_size: int = 1024 * 1024  # Bytes per file_blob_chunks row for large DB blobs
+    storage_dedup_enabled: bool = True  # Store identical content once (SHA-256, ref counted)
+    storage_max_download_bytes: int = 500 * 1024 * 1024  # Cap for save_from_url downloads
+    upload_max_bytes: int = 250 * 1024 * 1024  # Per-request upload cap for regular/anonymous users
+    upload_max_bytes_privileged: int = 2 * 1024 * 1024 * 1024  # Upload cap for admins and developers
+    blob_cache_max_bytes: int = 128 * 1024 * 1024  # In-process LRU budget for hot files; 0 disables
+    blob_cache_max_entry_bytes: int = 8 * 1024 * 1024  # Larger files (videos) bypass the cache
+    image_derivative_widths: str = "320,640,1280"  # Comma-separated widths of resized variants; empty disables
+    image_derivative_format: str = "webp"  # "webp" or "jpeg"
+    image_derivative_quality: int = 80
+    image_derivative_workers: int = 2  # Thread pool size for resizing
+    reference_prep_concurrency: int = 4  # Reference images fetched/encoded at once per provider client
+    reference_prep_workers: int = 4  # Thread pool size for decoding/re-encoding reference images
+    blob_gc_interval_seconds: int = 0  # Orphaned blob sweep period (e.g. 21600); 0 disables the loop
+    blob_gc_delete: bool = False  # Let the background sweep delete; otherwise it only reports (dry run)
+    blob_gc_grace_hours: int = 24  # Only blobs older than this are eligible for collection
+    blob_gc_batch_size: int = 200  # Blobs examined (and deleted) per sweep batch
 
     # Cloud Storage (Google Cloud Storage)
-    # Set storage_backend to "gcs" to use Google Cloud Storage, or "database" for DB storage
-    storage_backend: str = "database"  # "database" or "gcs"
+    # Set storage_backend to "gcs" to use Google Cloud Storage, "database" for DB storage,
+    # or "local" to keep files on disk under upload_dir (single-node deployments)
+    storage_backend: str = "database"  # "database", "gcs" or "local"
     gcs_bucket_name: str = ""
     gcs_project_id: str = ""
+    gcs_max_workers: int = 8  # Thread pool size for blocking GCS client calls
+    gcs_upload_chunk_size: int = 8 * 1024 * 1024  # Resumable upload chunk (multiple of 256 KiB)
+    gcs_download_window_size: int = 4 * 1024 * 1024  # Bytes fetched per ranged GCS read when streaming
     # For local dev, set GOOGLE_APPLICATION_CREDENTIALS env var to service account JSON path
     # For Railway/Cloud Run, credentials are auto-detected
 
+    # Outbound HTTP (shared pooled clients, see app/clients/http.py)
+    http_max_connections: int = 100  # Per named client
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0  # Seconds an idle connection is kept open
+    http_timeout: float = 60.0  # Default read/write/pool timeout when a call sets none
+    http_connect_timeout: float = 10.0
+    http_http2: bool = False  # Requires the h2 package
+    http_warm_up: bool = True  # Pre-connect to provider endpoints at startup
+
+    # Provider resilience and limits (see app/clients/resilience.py and app/clients/limits.py)
+    resilience_max_attempts: int = 3  # Including the first try; 1 disables retries
+    resilience_base_delay: float = 0.5  # Seconds; doubled per attempt with full jitter
+    resilience_max_delay: float = 8.0
+    resilience_retry_budget_ratio: float = 0.2  # Retries allowed per call, averaged over recent traffic
+    resilience_breaker_failure_threshold: int = 5  # Consecutive failures that open a breaker; 0 disables
+    resilience_breaker_reset_seconds: float = 30.0  # Time a breaker stays open before probing
+    provider_max_concurrent: int = 16  # Requests in flight per provider (see PROVIDER_LIMITS for defaults)
+    provider_rate_per_second: float = 0.0  # Token-bucket request rate per provider; 0 means unlimited
+    provider_limits: str = ""  # JSON overrides, e.g. {"seedream": {"max_concurrent": 4, "rate_per_second": 1}}
+    llm_hedge_enabled: bool = True  # Race an alternate model when an LLM call runs past its usual tail
+    llm_hedge_percentile: float = 0.95  # Latency percentile (from the EWMA) after which to hedge
+    llm_hedge_min_delay: float = 1.0  # Seconds; never hedge sooner than this
+    llm_hedge_max_delay: float = 10.0  # Seconds; also used until a model has latency history
+    llm_latency_ewma_alpha: float = 0.2  # Weight of the newest latency sample
+    llm_deadline_seconds: float = 90.0  # Overall cap on a (hedged) LLM call
+    intent_cache_max_entries: int = 2000  # Cached intent-analysis results; 0 disables
+    intent_cache_ttl_seconds: int = 600
+    prompt_reload_check_seconds: float = 2.0  # How often prompt files are checked for edits
+    agent_speculative_planning: bool = True  # Start ContentBrain during intent analysis on a keyword guess
+
     # CORS
     cors_origins: str = "*"
 
@@ -24,9 +24,10 @@ class Base(DeclarativeBase):
 
 
 # Ensure all models are imported so metadata is complete
-from app.models.file_blob import FileBlob  # noqa: F401
+from app.models.file_blob import FileBlob, FileBlobChunk, FileDerivative  # noqa: F401
 from app.models.user import User, TokenTransaction  # noqa: F401
 from app.models.setting import AppSetting  # noqa: F401
+from app.models.reference_pack import ReferencePack  # noqa: F401
 from app.models.user_character_access import UserCharacterAccess  # noqa: F401
 
 
@@ -104,6 +105,20 @@ def _run_migrations(conn):
                 except Exception as e:
                     logger.warning(f"Could not add error_message column: {e}")
 
+            # Add intrinsic dimension / placeholder columns if missing
+            for col_name, col_type in [
+                ("width", "INTEGER"),
+                ("height", "INTEGER"),
+                ("file_size", "INTEGER"),
+                ("blurhash", "VARCHAR(64)"),
+            ]:
+                if col_name not in existing_columns:
+                    try:
+                        conn.execute(text(f"ALTER TABLE images ADD COLUMN {col_name} {col_type}"))
+                        logger.info(f"Added {col_name} column to images table")
+                    except Exception as e:
+                        logger.warning(f"Could not add {col_name} column: {e}")
+
             # Make image_url nullable (needed for generating state)
             if dialect == "postgresql":
                 try:
@@ -173,6 +188,44 @@ def _run_migrations(conn):
                     except Exception as e:
                         logger.warning(f"Could not normalize {table_name}.{col_name}: {e}")
 
+        # Add chunk_size column to file_blobs table if missing (chunked storage)
+        if "file_blobs" in inspector.get_table_names():
+            existing_columns = {col["name"] for col in inspector.get_columns("file_blobs")}
+            if "chunk_size" not in existing_columns:
+                try:
+                    conn.execute(text("ALTER TABLE file_blobs ADD COLUMN chunk_size INTEGER"))
+                    logger.info("Added chunk_size column to file_blobs table")
+                except Exception as e:
+                    logger.warning(f"Could not add chunk_size column: {e}")
+
+            # Add sha256/ref_count columns if missing (content deduplication)
+            if "sha256" not in existing_columns:
+                try:
+                    conn.execute(text("ALTER TABLE file_blobs ADD COLUMN sha256 VARCHAR(64)"))
+                    logger.info("Added sha256 column to file_blobs table")
+                    try:
+                        conn.execute(text("CREATE INDEX ix_file_blobs_sha256 ON file_blobs(sha256)"))
+                        logger.info("Created index ix_file_blobs_sha256 on file_blobs table")
+                    except Exception as e:
+                        logger.warning(f"Could not create index ix_file_blobs_sha256: {e}")
+                except Exception as e:
+                    logger.warning(f"Could not add sha256 column: {e}")
+
+            if "ref_count" not in existing_columns:
+                try:
+                    conn.execute(text("ALTER TABLE file_blobs ADD COLUMN ref_count INTEGER NOT NULL DEFAULT 1"))
+                    logger.info("Added ref_count column to file_blobs table")
+                except Exception as e:
+                    logger.warning(f"Could not add ref_count column: {e}")
+
+            if "last_referenced_at" not in existing_columns:
+                timestamp_type = "TIMESTAMP" if dialect == "postgresql" else "DATETIME"
+                try:
+                    conn.execute(text(f"ALTER TABLE file_blobs ADD COLUMN last_referenced_at {timestamp_type}"))
+                    logger.info("Added last_referenced_at column to file_blobs table")
+                except Exception as e:
+                    logger.warning(f"Could not add last_referenced_at column: {e}")
+
         # Add user_id column to characters table if missing
         if "characters" in inspector.get_table_names():
             existing_columns = {col["name"] for col in inspector.get_columns("characters")}
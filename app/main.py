@@ -1,17 +1,17 @@
 """FastAPI application entry point."""
+import asyncio
+import contextlib
 import logging
 from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 load_dotenv(".env")
 
-from fastapi import FastAPI, Depends, HTTPException, Response
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
-from app.database import init_db, get_db
-from app.services.storage import get_storage_service
+from app.database import init_db
 
 # Configure logging
 settings = get_settings()
@@ -70,9 +70,30 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("Database initialized")
     await create_default_admin()
+
+    # Held here so they are not garbage-collected mid-run, and stopped on shutdown
+    background_tasks: list[asyncio.Task] = []
+    if settings.http_warm_up:
+        from app.clients.http import warm_up_http_clients
+        background_tasks.append(asyncio.create_task(warm_up_http_clients()))
+
+    if settings.blob_gc_interval_seconds > 0:
+        from app.services.blob_gc import run_blob_gc_loop
+        background_tasks.append(asyncio.create_task(run_blob_gc_loop(settings.blob_gc_interval_seconds)))
     yield
     # Shutdown
     logger.info("Shutting down application...")
+    for task in background_tasks:
+        task.cancel()
+    for task in background_tasks:
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    from app.services.storage import get_storage_service
+    from app.services.derivatives import get_derivative_service
+    from app.clients.http import close_http_clients
+    get_storage_service().close()
+    get_derivative_service().close()
+    await close_http_clients()
 
 
 app = FastAPI(
@@ -93,10 +114,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Uploads are served from database via /uploads/{file_id}
-
 # Import and include routers
-from app.routers import characters, images, videos, agent, animate, samples, twitter, auth, share
+from app.routers import characters, images, videos, agent, animate, samples, twitter, auth, share, uploads
 
 app.include_router(auth.router, prefix="/api/v1", tags=["auth"])
 app.include_router(characters.router, prefix="/api/v1", tags=["characters"])
@@ -107,6 +126,8 @@ app.include_router(animate.router, prefix="/api/v1", tags=["animate"])
 app.include_router(samples.router, prefix="/api/v1", tags=["samples"])
 app.include_router(twitter.router, prefix="/api/v1", tags=["twitter"])
 app.include_router(share.router, prefix="/api/v1", tags=["share"])
+# Uploads are streamed from the storage backend via /uploads/{file_id}
+app.include_router(uploads.router, tags=["uploads"])
 
 
 @app.get("/")
@@ -120,15 +141,3 @@ async def health():
     """Health check endpoint."""
     return {"status": "healthy"}
 
-
-@app.get("/uploads/{file_id}")
-async def get_upload(
-    file_id: str,
-    db: AsyncSession = Depends(get_db),
-):
-    """Serve uploaded files stored in the database."""
-    storage = get_storage_service()
-    blob = await storage.get_file_blob(file_id, db)
-    if not blob:
-        raise HTTPException(status_code=404, detail="File not found")
-    return Response(content=blob.data, media_type=blob.content_type)
@@ -4,6 +4,7 @@ from app.models.character import Character
 from app.models.image import Image
 from app.models.video import Video
 from app.models.sample_post import SamplePost
-from app.models.file_blob import FileBlob
+from app.models.file_blob import FileBlob, FileBlobChunk, FileDerivative
+from app.models.reference_pack import ReferencePack
 
-__all__ = ["User", "TokenTransaction", "Character", "Image", "Video", "SamplePost", "FileBlob"]
+__all__ = ["User", "TokenTransaction", "Character", "Image", "Video", "SamplePost", "FileBlob", "FileBlobChunk", "FileDerivative", "ReferencePack"]
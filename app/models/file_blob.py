@@ -1,8 +1,9 @@
 """File blob model for binary storage."""
 import uuid
 from datetime import datetime
+from typing import Optional
 
-from sqlalchemy import String, DateTime, Integer, LargeBinary
+from sqlalchemy import String, DateTime, Integer, LargeBinary, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -21,13 +22,62 @@ class FileBlob(Base):
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
     content_type: Mapped[str] = mapped_column(String(255), nullable=False)
     size: Mapped[int] = mapped_column(Integer, nullable=False)
-    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    # Inline payload for small and legacy blobs; empty when stored as chunks.
+    # Deferred so metadata queries never pull the binary column.
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False, deferred=True)
+    # Size of each FileBlobChunk part; None means the payload lives in `data`
+    chunk_size: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # Content digest for deduplication; NULL for blobs saved before hashing
+    sha256: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
+    ref_count: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=datetime.utcnow,
         nullable=False,
     )
+    # Last time an upload deduplicated onto this blob; GC's grace period
+    # counts from here (or created_at) so fresh references are never swept
+    last_referenced_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
     def __repr__(self) -> str:
         return f"<FileBlob(id={self.id}, filename={self.filename})>"
 
+
+
+class FileBlobChunk(Base):
+    """Fixed-size part of a large file blob."""
+
+    __tablename__ = "file_blob_chunks"
+
+    blob_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("file_blobs.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<FileBlobChunk(blob_id={self.blob_id}, seq={self.seq})>"
+
+
+class FileDerivative(Base):
+    """Resized variant of a stored image, itself saved as a regular file."""
+
+    __tablename__ = "file_derivatives"
+
+    # Storage file ids (blob ids, local paths or GCS object paths)
+    source_id: Mapped[str] = mapped_column(String(512), primary_key=True)
+    width: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # Equal to source_id when the original is already no wider than `width`
+    derivative_id: Mapped[str] = mapped_column(String(512), nullable=False)
+    content_type: Mapped[str] = mapped_column(String(255), nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<FileDerivative(source_id={self.source_id}, width={self.width})>"
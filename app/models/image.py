@@ -3,7 +3,7 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import String, Text, DateTime, Boolean, Float, ForeignKey
+from sqlalchemy import String, Text, DateTime, Boolean, Float, Integer, ForeignKey
 from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
@@ -115,6 +115,11 @@ class Image(Base):
     )
     task_id: Mapped[Optional[str]] = mapped_column(String(36), nullable=True)
     image_url: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # Nullable for generating state
+    # Intrinsic size and placeholder of the stored file, for layout before load
+    width: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    height: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    file_size: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    blurhash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     pose: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     expression: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     metadata_json: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
@@ -0,0 +1,34 @@
+"""Reference pack model: provider-ready artifacts of an approved base image."""
+from datetime import datetime
+
+from sqlalchemy import String, Text, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class ReferencePack(Base):
+    """Preprocessed copies of a base image, computed once on approval."""
+
+    __tablename__ = "reference_packs"
+
+    image_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("images.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    # image_url the pack was built from; a different URL means the pack is stale
+    source_url: Mapped[str] = mapped_column(Text, nullable=False)
+    source_sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    # RGB JPEG q92 as sent to Seedream as a reference image
+    provider_url: Mapped[str] = mapped_column(Text, nullable=False)
+    # Top 45% (face/head) crop used by the edit flow
+    face_url: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        nullable=False,
+    )
+
+    def __repr__(self) -> str:
+        return f"<ReferencePack(image_id={self.image_id})>"
@@ -1,4 +1,4 @@
 """API routers."""
-from app.routers import auth, characters, images, videos, agent, animate, samples, twitter
+from app.routers import auth, characters, images, videos, agent, animate, samples, twitter, uploads
 
-__all__ = ["auth", "characters", "images", "videos", "agent", "animate", "samples", "twitter"]
+__all__ = ["auth", "characters", "images", "videos", "agent", "animate", "samples", "twitter", "uploads"]
@@ -7,10 +7,10 @@ import logging
 import uuid
 from typing import Optional
 
-import httpx
 from PIL import Image as PILImage
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -27,8 +27,11 @@ from app.schemas.agent import (
     GenerationTaskStatus,
 )
 from app.agent.core import Agent, get_agent
+from app.agent.events import current_event_queue, format_sse
 from app.agent.skills.edit_prompt_optimizer import EditPromptOptimizerSkill
 from app.clients.seedream import get_seedream_client
+from app.services.media import fetch_media
+from app.services.reference_pack import get_reference_data_urls
 from app.services.storage import get_storage_service
 from app.models.image import Image, ImageType, ImageStatus
 from app.models.character import Character
@@ -86,6 +89,88 @@ async def agent_chat(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/agent/chat/stream")
+async def agent_chat_stream(
+    request: AgentChatRequest,
+    http_request: Request,
+    agent: Agent = Depends(get_agent),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Same as /agent/chat, but streamed as server-sent events.
+
+    Events: ``stage`` (understanding / planning / optimizing), ``delta``
+    (``field`` is "message" or "prompt", ``text`` the new characters),
+    ``reset`` (drop what was received for ``field``: a retry restarted it,
+    or the final text differs from what was streamed), then one final
+    ``result`` carrying the AgentChatResponse, or ``error``.
+    """
+    logger.info(f"=== /agent/chat/stream request === session: {request.session_id}, character: {request.character_id}")
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run_agent() -> None:
+        # Own session: the request-scoped one may be closed before the
+        # streamed body finishes
+        current_event_queue.set(queue)
+        try:
+            async with async_session() as db:
+                response = await agent.process_message(
+                    message=request.message,
+                    character_id=request.character_id,
+                    session_id=request.session_id,
+                    reference_image_path=request.reference_image_path,
+                    reference_image_mode=request.reference_image_mode.value if request.reference_image_mode else None,
+                    db=db,
+                )
+            logger.info(f"Stream response state: {response.state}, session: {response.session_id}")
+            queue.put_nowait({"event": "result", **response.model_dump(mode="json")})
+        except Exception as e:
+            logger.exception(f"Error in agent_chat_stream: {e}")
+            queue.put_nowait({"event": "error", "detail": str(e)})
+
+    async def event_stream():
+        # Send something right away so proxies and the client see the stream open
+        yield format_sse("stage", {"stage": "received"})
+        task = asyncio.create_task(run_agent())
+        streamed: dict[str, str] = {}  # Text the client currently holds per field
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    if await http_request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                name = event.pop("event")
+                if name == "delta":
+                    streamed[event["field"]] = streamed.get(event["field"], "") + event["text"]
+                elif name == "reset":
+                    streamed.pop(event["field"], None)
+                elif name == "result":
+                    # Overrides (refusal fallback, general_chat -> generation)
+                    # replace streamed text; tell the client to drop it
+                    final = {
+                        "message": event.get("message") or "",
+                        "prompt": (event.get("pending_generation") or {}).get("optimized_prompt") or "",
+                    }
+                    for field, text in streamed.items():
+                        if text.strip() != final.get(field, "").strip():
+                            yield format_sse("reset", {"field": field})
+                yield format_sse(name, event)
+                if name in ("result", "error"):
+                    return
+        finally:
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/agent/confirm", response_model=AgentChatResponse)
 async def agent_confirm(
     request: AgentConfirmRequest,
@@ -256,10 +341,8 @@ def _parse_aspect_ratio(aspect_ratio: str) -> tuple[int, int]:
 async def _crop_to_face_data_url(image_url: str) -> Optional[str]:
     """Download image and crop to top 45% (face/head area), return as base64 data URL."""
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.get(image_url)
-            resp.raise_for_status()
-        img = PILImage.open(io.BytesIO(resp.content))
+        content, _ = await fetch_media(image_url, timeout=30)
+        img = PILImage.open(io.BytesIO(content))
         w, h = img.size
         crop_h = int(h * 0.45)
         cropped = img.crop((0, 0, w, crop_h))
@@ -318,13 +401,14 @@ async def _direct_edit_background(
                 .limit(1)
             )
             base_images = base_result.scalars().all()
-            base_image_urls = [storage.get_full_url(img.image_url) for img in base_images]
+            face_crops = await get_reference_data_urls(base_images, "face", db)
 
             # Source image for pose/composition; base image face-cropped and appended for identity only
             source_full_url = storage.get_full_url(source_image_path)
             cropped_base_refs = []
-            for url in base_image_urls:
-                cropped = await _crop_to_face_data_url(url)
+            for img, face_crop in zip(base_images, face_crops):
+                url = storage.get_full_url(img.image_url)
+                cropped = face_crop or await _crop_to_face_data_url(url)
                 if cropped:
                     cropped_base_refs.append(cropped)
                 else:
@@ -367,6 +451,8 @@ async def _direct_edit_background(
             image = res.scalar_one_or_none()
             if image:
                 image.image_url = saved["url"]
+                for field, value in storage.image_fields(saved).items():
+                    setattr(image, field, value)
                 image.status = ImageStatus.COMPLETED
                 image.metadata_json = json.dumps(metadata)
                 await db.commit()
@@ -7,15 +7,18 @@ import subprocess
 import tempfile
 from typing import Optional
 
-import httpx
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.clients.http import http_client
 from app.database import get_db, async_session
 from app.clients.parrot import get_parrot_client
+from app.clients.resilience import is_transient
 from app.clients.seedream import get_seedream_client
+from app.services.media import fetch_media_to_file
+from app.services.reference_pack import reference_images_for
 from app.services.storage import get_storage_service, StorageService
 from app.models.video import Video, VideoType as DBVideoType, VideoStatus as DBVideoStatus
 from app.models.image import Image, ImageType, ImageStatus
@@ -70,18 +73,16 @@ async def _extract_video_first_frame(
     Returns:
         Storage URL of the extracted frame
     """
-    # Get full URL for the video
-    full_video_url = storage.get_full_url(video_url)
+    # Local backend: ffmpeg reads the stored file in place
+    local_video_path = None
+    if video_url.startswith("/uploads/"):
+        local_video_path = storage.local_path(video_url[len("/uploads/"):])
 
-    # Download video to temp file
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        resp = await client.get(full_video_url)
-        resp.raise_for_status()
-        video_bytes = resp.content
-
-    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp_video:
-        tmp_video.write(video_bytes)
-        tmp_video_path = tmp_video.name
+    if local_video_path is not None:
+        tmp_video_path = None
+    else:
+        # Copy the video to a temp file (from storage for our own uploads)
+        tmp_video_path = await fetch_media_to_file(video_url, suffix=".mp4", timeout=60.0)
 
     with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp_frame:
         tmp_frame_path = tmp_frame.name
@@ -91,7 +92,7 @@ async def _extract_video_first_frame(
         subprocess.run(
             [
                 "ffmpeg", "-y",
-                "-i", tmp_video_path,
+                "-i", str(local_video_path or tmp_video_path),
                 "-vframes", "1",
                 "-f", "image2",
                 tmp_frame_path,
@@ -114,7 +115,7 @@ async def _extract_video_first_frame(
         await db.commit()
         return saved["url"]
     finally:
-        if os.path.exists(tmp_video_path):
+        if tmp_video_path and os.path.exists(tmp_video_path):
             os.unlink(tmp_video_path)
         if os.path.exists(tmp_frame_path):
             os.unlink(tmp_frame_path)
@@ -339,7 +340,6 @@ async def import_image_from_url(
     """Download the first image from a public URL via og:image scraping (no auth needed)."""
     import uuid
     import re
-    import httpx
 
     HEADERS = {
         "User-Agent": "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
@@ -350,7 +350,7 @@ async def import_image_from_url(
 
     # Step 1: scrape og:image from the page (works for public Instagram/TikTok without login)
     try:
-        async with httpx.AsyncClient(timeout=15, follow_redirects=True) as client:
+        async with http_client("media", timeout=15, follow_redirects=True) as client:
             page_resp = await client.get(request.url, headers=HEADERS)
         html = page_resp.text
         # Try both attribute orderings of <meta property="og:image" content="...">
@@ -372,7 +372,7 @@ async def import_image_from_url(
         )
 
     try:
-        async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
+        async with http_client("media", timeout=30, follow_redirects=True) as client:
             resp = await client.get(image_url, headers={"User-Agent": "Mozilla/5.0"})
             resp.raise_for_status()
             image_data = resp.content
@@ -405,7 +405,6 @@ async def analyze_image_for_animation(
     Analyze an image and suggest video generation prompts.
     Uses GPT-4o Vision to understand the image content.
     """
-    import base64
     try:
         from app.clients.gemini import get_gemini_client
         gemini = get_gemini_client()
@@ -418,13 +417,9 @@ async def analyze_image_for_animation(
     # (GPT cannot access localhost URLs)
     if request.image_url.startswith("/uploads/"):
         file_id = request.image_url.replace("/uploads/", "")
-        blob = await storage.get_file_blob(file_id, db)
-        if not blob:
+        image_url = await storage.get_data_url(file_id, db)
+        if not image_url:
             raise HTTPException(status_code=404, detail="Image file not found")
-
-        mime_type = blob.content_type or "image/jpeg"
-        base64_data = base64.b64encode(blob.data).decode("utf-8")
-        image_url = f"data:{mime_type};base64,{base64_data}"
     else:
         # External URL - use as is
         image_url = storage.get_full_url(request.image_url)
@@ -606,7 +601,7 @@ async def generate_animation(
                     .limit(3)
                 )
                 base_images = base_images_result.scalars().all()
-                base_image_urls = [storage.get_full_url(img.image_url) for img in base_images]
+                base_image_urls = await reference_images_for(base_images, db)
                 logger.info("Found %d approved base images for character", len(base_image_urls))
 
                 # 3. Generate pose-matched image using Seedream
@@ -664,6 +659,7 @@ async def generate_animation(
                     character_id=request.character_id,
                     type=ImageType.CONTENT,
                     image_url=saved["url"],
+                    **storage.image_fields(saved),
                     status=ImageStatus.COMPLETED,
                     is_approved=False,
                     metadata_json=json.dumps({
@@ -856,12 +852,21 @@ async def _poll_video_completion(
                 except Exception:
                     pass
 
-                poll_result = await parrot.get_video_status(
-                    parrot_job_id,
-                    use_addition_api=use_addition_api,
-                    use_v2_audio_api=use_v2_audio_api,
-                    use_animate_api=use_animate_api,
-                )
+                try:
+                    poll_result = await parrot.get_video_status(
+                        parrot_job_id,
+                        use_addition_api=use_addition_api,
+                        use_v2_audio_api=use_v2_audio_api,
+                        use_animate_api=use_animate_api,
+                    )
+                except Exception as e:
+                    # The job keeps running at Parrot; only give up on real errors
+                    if not is_transient(e):
+                        raise
+                    logger.warning("Video %s poll failed transiently: %s", video_id, e)
+                    await asyncio.sleep(poll_interval)
+                    elapsed += poll_interval
+                    continue
                 status = poll_result.get("status", "").lower()
                 progress = poll_result.get("raw", {}).get("progress") or 0
 
@@ -911,8 +916,7 @@ async def _poll_video_completion(
         # Use a new database session for the background task
         async with async_session() as db:
             # Download video
-            import httpx
-            async with httpx.AsyncClient(timeout=60.0) as client:
+            async with http_client("media", timeout=60.0) as client:
                 response = await client.get(video_url)
                 response.raise_for_status()
                 video_bytes = response.content
@@ -1137,7 +1141,7 @@ async def ref_video_to_video(
             .limit(3)
         )
         base_images = base_images_result.scalars().all()
-        base_image_urls = [storage.get_full_url(img.image_url) for img in base_images]
+        base_image_urls = await reference_images_for(base_images, db)
         logger.info("Found %d approved base images for character", len(base_image_urls))
 
         # ── 6. Generate pose-matched image with Seedream ───────────────────────
@@ -1189,6 +1193,7 @@ async def ref_video_to_video(
             character_id=character_id,
             type=ImageType.CONTENT,
             image_url=saved_pose["url"],
+            **storage.image_fields(saved_pose),
             status=ImageStatus.COMPLETED,
             is_approved=False,
             metadata_json=json.dumps({
@@ -556,6 +556,74 @@ async def _save_presets(db: AsyncSession, presets: list[dict]) -> None:
     await db.commit()
 
 
+@router.get("/admin/storage/stats")
+async def get_storage_stats(
+    admin_user: User = Depends(get_current_admin_user),
+):
+    """Get storage backend and blob cache counters (admin only)."""
+    from app.services.storage import get_storage_service
+    storage = get_storage_service()
+    return {
+        "backend": storage.storage_backend,
+        "cache": storage.cache_stats(),
+    }
+
+
+@router.post("/admin/storage/gc")
+async def run_storage_gc(
+    dry_run: bool = True,
+    grace_hours: Optional[int] = None,
+    admin_user: User = Depends(get_current_admin_user),
+):
+    """Collect orphaned file blobs now and report reclaimed bytes (admin only)."""
+    from app.services.blob_gc import collect_orphaned_blobs
+    report = await collect_orphaned_blobs(dry_run=dry_run, grace_hours=grace_hours)
+    logger.info("Admin %s ran storage GC (dry_run=%s)", admin_user.username, dry_run)
+    return report.to_dict()
+
+
+@router.get("/admin/providers/health")
+async def provider_health(
+    admin_user: User = Depends(get_current_admin_user),
+):
+    """Circuit breaker state, retry/limit metrics and LLM latency per provider (admin only)."""
+    from app.clients.gemini import get_gemini_client
+    from app.clients.resilience import resilience_snapshot
+    return {
+        "providers": resilience_snapshot(),
+        "llm_latency": get_gemini_client().latency_stats(),
+    }
+
+
+@router.get("/admin/agent/intent-cache")
+async def intent_cache_stats(
+    admin_user: User = Depends(get_current_admin_user),
+):
+    """Hit rate and size of the agent's intent-analysis cache (admin only)."""
+    from app.agent.core import get_agent
+    return get_agent().intent_cache.stats()
+
+
+@router.get("/admin/agent/stage-timings")
+async def agent_stage_timings(
+    admin_user: User = Depends(get_current_admin_user),
+):
+    """Per-stage latency of agent turns and speculative planning outcomes (admin only)."""
+    from app.agent.core import get_agent
+    return get_agent().stage_stats.stats()
+
+
+@router.get("/admin/agent/prompts")
+async def prompt_registry_stats(
+    admin_user: User = Depends(get_current_admin_user),
+):
+    """Size, token count and version hash of each agent prompt template (admin only)."""
+    from app.agent.core import get_agent
+    from app.agent.prompts import get_prompt_registry
+    get_agent()  # Templates are registered when the agent modules load
+    return get_prompt_registry().stats()
+
+
 @router.get("/lipsync-presets")
 async def list_lipsync_presets(db: AsyncSession = Depends(get_db)):
     """Public endpoint: list lipsync preset images for the playground."""
@@ -22,7 +22,8 @@ from app.schemas.character import (
     CharacterResponse,
     CharacterStatus,
 )
-from app.services.storage import get_storage_service, StorageService
+from app.services.reference_pack import schedule_reference_pack
+from app.services.storage import get_storage_service, StorageService, FileTooLargeError
 from app.auth import get_current_user, get_current_admin_user
 from app.services.tokens import deduct_tokens, refund_tokens
 from app.utils.access import get_character_if_accessible
@@ -315,6 +316,7 @@ async def _generate_single_base_image(
                 if image:
                     image.is_approved = True
                     await db.commit()
+                    schedule_reference_pack(image_id)
                 logger.info(f"Base image {image_id} generated and auto-approved")
             else:
                 logger.error(f"Base image {image_id} generation failed: {result.get('error')}")
@@ -437,6 +439,11 @@ async def upload_file(
     current_user: User = Depends(get_current_user),
 ):
     """Upload a file (requires authentication)."""
-    result = await storage.save_upload(file, db)
+    try:
+        result = await storage.save_upload(
+            file, db, max_size=storage.upload_limit_for(current_user)
+        )
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     await db.commit()
     return result
@@ -19,6 +19,8 @@ from app.agent.skills.image_generator import ImageGeneratorSkill
 from app.agent.skills.prompt_optimizer import PromptOptimizerSkill
 from app.auth import get_current_user
 from app.utils.access import get_character_if_accessible
+from app.services.reference_pack import invalidate_reference_packs, schedule_reference_pack
+from app.services.storage import get_storage_service, GRID_THUMBNAIL_WIDTH
 from app.services.tokens import deduct_tokens, refund_tokens
 
 logger = logging.getLogger(__name__)
@@ -52,6 +54,11 @@ def _image_to_response(image: Image) -> ImageResponse:
         type=ImageType(image.type.value),
         status=status,
         image_url=image.image_url,
+        thumbnail_url=get_storage_service().variant_url(image.image_url, GRID_THUMBNAIL_WIDTH),
+        width=image.width,
+        height=image.height,
+        file_size=image.file_size,
+        blurhash=image.blurhash,
         task_id=getattr(image, 'task_id', None),
         pose=image.pose,
         expression=image.expression,
@@ -172,6 +179,9 @@ async def approve_image(
     await db.commit()
     await db.refresh(image)
 
+    if image.type == DBImageType.BASE:
+        schedule_reference_pack(image.id)
+
     return _image_to_response(image)
 
 
@@ -192,6 +202,7 @@ async def set_as_base(
         image.is_approved = True
         await db.commit()
         await db.refresh(image)
+        schedule_reference_pack(image.id)
         return _image_to_response(image)
 
     # Get current approved base images ordered by creation date
@@ -207,6 +218,7 @@ async def set_as_base(
     # If at the limit, delete the oldest (last in desc order)
     if len(approved_bases) >= 3:
         oldest = approved_bases[-1]
+        await invalidate_reference_packs([oldest.id], db)
         await db.delete(oldest)
 
     # Set current image as base and approve
@@ -214,6 +226,7 @@ async def set_as_base(
     image.is_approved = True
     await db.commit()
     await db.refresh(image)
+    schedule_reference_pack(image.id)
 
     return _image_to_response(image)
 
@@ -230,6 +243,7 @@ async def delete_image(
     if not image or not await get_character_if_accessible(image.character_id, current_user, db):
         raise HTTPException(status_code=404, detail="Image not found")
 
+    await invalidate_reference_packs([image.id], db)
     await db.delete(image)
     await db.commit()
 
@@ -17,7 +17,9 @@ from app.schemas.sample_post import (
     SamplePostResponse,
     MediaType,
 )
-from app.services.storage import get_storage_service
+from app.auth import get_optional_user
+from app.models.user import User
+from app.services.storage import get_storage_service, FileTooLargeError, GRID_THUMBNAIL_WIDTH
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -245,10 +247,13 @@ async def upload_sample(
     creator_name: str = Form(default="uploaded"),
     tags: str = Form(default=""),  # comma-separated tags
     db: AsyncSession = Depends(get_db),
+    current_user: Optional[User] = Depends(get_optional_user),
 ):
     """Upload a file (image or video) directly as a sample."""
-    # Validate file type
-    content_type = file.content_type or ""
+    storage = get_storage_service()
+
+    # Validate file type from its leading bytes, not the client's claim
+    content_type = await storage.sniff_upload(file)
     if not content_type.startswith("image/") and not content_type.startswith("video/"):
         raise HTTPException(status_code=400, detail="File must be an image or video")
 
@@ -256,10 +261,17 @@ async def upload_sample(
     media_type = DBMediaType.VIDEO if is_video else DBMediaType.IMAGE
 
     # Save file using storage service
-    storage = get_storage_service()
-    saved = await storage.save_upload(file, db)
+    try:
+        saved = await storage.save_upload(
+            file,
+            db,
+            max_size=storage.upload_limit_for(current_user),
+            content_type=content_type,
+        )
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     media_url = saved["url"]
-    thumbnail_url = saved["url"]
+    thumbnail_url = media_url if is_video else storage.variant_url(media_url, GRID_THUMBNAIL_WIDTH)
 
     # Parse tags
     tag_list = [t.strip() for t in tags.split(",") if t.strip()]
@@ -327,7 +339,7 @@ async def _import_from_instagram(
         raise HTTPException(status_code=500, detail="Failed to download media")
 
     media_url = saved["url"]
-    thumbnail_url = media_url
+    thumbnail_url = media_url if is_video else storage.variant_url(media_url, GRID_THUMBNAIL_WIDTH)
 
     if is_video and post.url:
         try:
@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import get_current_user
 from app.config import get_settings
+from app.clients.http import http_client
 from app.database import get_db
 from app.models.user import User
 
@@ -86,7 +87,7 @@ async def share_by_email(
     }
 
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
+        async with http_client("brevo", timeout=15) as client:
             resp = await client.post(
                 "https://api.brevo.com/v3/smtp/email",
                 json=payload,
@@ -128,25 +128,29 @@ async def post_to_twitter(
             if not image.image_url:
                 raise HTTPException(status_code=400, detail="Image URL not available")
 
-            # Get the file blob from storage
-            file_id = image.image_url.split("/")[-1]
-            blob = await storage.get_file_blob(file_id, db)
+            # Get the file from storage (local backend files are uploaded in place)
+            file_id = storage.file_id_from_url(image.image_url) or image.image_url.split("/")[-1]
+            local_path = storage.local_path(file_id)
+            tmp_path = None
+            if local_path is None:
+                stored = await storage.read_file(file_id, db)
 
-            if not blob:
-                raise HTTPException(status_code=404, detail="Image file not found")
+                if not stored:
+                    raise HTTPException(status_code=404, detail="Image file not found")
 
-            # Save to temp file for upload
-            with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-                tmp.write(blob.data)
-                tmp_path = tmp.name
+                # Save to temp file for upload
+                with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
+                    tmp.write(stored[0])
+                    tmp_path = tmp.name
 
             try:
                 # Upload media to Twitter
-                media = api.media_upload(filename=tmp_path)
+                media = api.media_upload(filename=str(local_path or tmp_path))
                 media_id = media.media_id
                 logger.info(f"Media uploaded, ID: {media_id}")
             finally:
-                os.unlink(tmp_path)
+                if tmp_path:
+                    os.unlink(tmp_path)
 
         elif request.video_id:
             # Get video from database
@@ -161,25 +165,29 @@ async def post_to_twitter(
             if not video.video_url:
                 raise HTTPException(status_code=400, detail="Video URL not available")
 
-            file_id = video.video_url.split("/")[-1]
-            blob = await storage.get_file_blob(file_id, db)
+            file_id = storage.file_id_from_url(video.video_url) or video.video_url.split("/")[-1]
+            local_path = storage.local_path(file_id)
+            tmp_path = None
+            if local_path is None:
+                stored = await storage.read_file(file_id, db)
 
-            if not blob:
-                raise HTTPException(status_code=404, detail="Video file not found")
+                if not stored:
+                    raise HTTPException(status_code=404, detail="Video file not found")
 
-            with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
-                tmp.write(blob.data)
-                tmp_path = tmp.name
+                with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
+                    tmp.write(stored[0])
+                    tmp_path = tmp.name
 
             try:
                 media = api.media_upload(
-                    filename=tmp_path,
+                    filename=str(local_path or tmp_path),
                     media_category="tweet_video"
                 )
                 media_id = media.media_id
                 logger.info(f"Video uploaded, ID: {media_id}")
             finally:
-                os.unlink(tmp_path)
+                if tmp_path:
+                    os.unlink(tmp_path)
 
         # Create tweet with media
         tweet_text = request.caption if request.caption else ""
@@ -0,0 +1,185 @@
+"""Uploads router serving stored files with HTTP Range and caching support."""
+import hashlib
+import logging
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.services.derivatives import RESIZABLE_TYPES, get_derivative_service
+from app.services.storage import StoredFile, get_storage_service
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Upload ids are immutable: new content always gets a new id
+_IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# ?w= answered with the original while variants are still being generated
+_PENDING_VARIANT_CACHE_CONTROL = "public, max-age=60"
+
+
+def _parse_range(range_header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Parse a single-range ``Range`` header into an inclusive (start, end) pair.
+
+    Returns None when the header is absent or not something we honour (e.g.
+    multiple ranges), in which case the full body is served. Raises a 416
+    HTTPException for ranges that cannot be satisfied.
+    """
+    if not range_header:
+        return None
+    match = _RANGE_RE.match(range_header.strip())
+    if not match:
+        return None
+
+    start_str, end_str = match.groups()
+    if not start_str and not end_str:
+        return None
+
+    if not start_str:
+        # Suffix range: last N bytes
+        suffix = int(end_str)
+        if suffix == 0 or size == 0:
+            raise HTTPException(
+                status_code=416,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{size}"},
+            )
+        return max(size - suffix, 0), size - 1
+
+    start = int(start_str)
+    end = int(end_str) if end_str else size - 1
+    if start >= size or end < start:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, min(end, size - 1)
+
+
+def _etag(info: StoredFile) -> str:
+    """Strong ETag from the content digest, falling back to the immutable id."""
+    tag = info.sha256 or hashlib.sha256(info.id.encode("utf-8")).hexdigest()[:32]
+    return f'"{tag}"'
+
+
+def _last_modified(info: StoredFile) -> Optional[datetime]:
+    """created_at as an aware UTC datetime truncated to HTTP-date precision."""
+    if info.created_at is None:
+        return None
+    created = info.created_at
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    return created.replace(microsecond=0)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match / If-Range list against our ETag."""
+    if header.strip() == "*":
+        return True
+    candidates = [c.strip() for c in header.split(",")]
+    return any(c.removeprefix("W/") == etag for c in candidates)
+
+
+def _is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate conditional GET headers; If-None-Match takes precedence."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+    return False
+
+
+@router.api_route("/uploads/{file_id:path}", methods=["GET", "HEAD"])
+async def get_upload(
+    file_id: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, le=8192, description="Serve the closest resized variant"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Stream an uploaded file, honouring single-range requests.
+
+    Responses carry a strong ETag, Last-Modified and an immutable
+    Cache-Control; conditional requests are answered with 304 from metadata
+    alone, without reading the payload. With ``?w=`` images are served from
+    the smallest generated variant at least that wide.
+    """
+    storage = get_storage_service()
+    info = await storage.get_file_info(file_id, db)
+    if not info:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    cache_control = _IMMUTABLE_CACHE_CONTROL
+    if w is not None and info.content_type.split(";")[0] in RESIZABLE_TYPES:
+        variant_id = await get_derivative_service().resolve(file_id, w, db)
+        if variant_id is None:
+            cache_control = _PENDING_VARIANT_CACHE_CONTROL
+        elif variant_id != file_id:
+            variant_info = await storage.get_file_info(variant_id, db)
+            if variant_info is not None:
+                file_id, info = variant_id, variant_info
+
+    etag = _etag(info)
+    last_modified = _last_modified(info)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": cache_control,
+        "ETag": etag,
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if _is_not_modified(request, etag, last_modified):
+        headers.pop("Accept-Ranges")
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and not _etag_matches(if_range, etag):
+        # Validator changed (or is a date we don't track): send the full body
+        range_header = None
+    byte_range = _parse_range(range_header, info.size)
+
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(info.size)
+        return Response(status_code=200, media_type=info.content_type, headers=headers)
+
+    if byte_range is None:
+        local_path = storage.local_path(file_id)
+        if local_path is not None:
+            # Local backend: let the server use sendfile where available
+            return FileResponse(local_path, media_type=info.content_type, headers=headers)
+        headers["Content-Length"] = str(info.size)
+        return StreamingResponse(
+            storage.iter_file(file_id, start=0, end=info.size - 1, info=info),
+            media_type=info.content_type,
+            headers=headers,
+        )
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        storage.iter_file(file_id, start=start, end=end),
+        status_code=206,
+        media_type=info.content_type,
+        headers=headers,
+    )
@@ -77,6 +77,11 @@ class ImageResponse(BaseModel):
     type: ImageType
     status: ImageStatus = ImageStatus.COMPLETED
     image_url: Optional[str] = None  # Nullable for generating state
+    thumbnail_url: Optional[str] = None  # Resized variant for grid tiles
+    width: Optional[int] = None
+    height: Optional[int] = None
+    file_size: Optional[int] = None
+    blurhash: Optional[str] = None  # Placeholder shown until the image loads
     task_id: Optional[str] = None
     pose: Optional[str] = None
     expression: Optional[str] = None
@@ -1,4 +1,5 @@
 """Business logic services."""
-from app.services.storage import StorageService, get_storage_service
+from app.services.storage import FileTooLargeError, StorageService, StoredFile, get_storage_service
+from app.services.blob_cache import BlobCache
 
-__all__ = ["StorageService", "get_storage_service"]
+__all__ = ["FileTooLargeError", "StorageService", "StoredFile", "get_storage_service", "BlobCache"]
@@ -0,0 +1,96 @@
+"""Byte-budgeted in-process LRU cache for stored file payloads."""
+import threading
+from collections import OrderedDict
+from typing import Any, Generic, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class BlobCache(Generic[V]):
+    """
+    LRU cache bounded by total payload bytes rather than entry count.
+
+    Entries larger than ``max_entry_bytes`` are never cached, so one video
+    cannot flush every hot image. A budget of 0 disables the cache.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max(max_bytes, 0)
+        self.max_entry_bytes = min(max(max_entry_bytes, 0), self.max_bytes)
+        self._entries: OrderedDict[str, tuple[V, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def accepts(self, size: int) -> bool:
+        """Whether an entry of this many bytes is small enough to cache."""
+        return self.enabled and size <= self.max_entry_bytes
+
+    def get(self, key: str) -> Optional[V]:
+        """Return the cached value and mark it most recently used."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key: str) -> Optional[V]:
+        """Return the cached value without touching recency or counters."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def put(self, key: str, value: V, size: int) -> None:
+        """Insert a value, evicting least recently used entries to fit."""
+        if not self.accepts(size):
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        """Drop a single entry if present."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.current_bytes -= entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Counters for monitoring hit rate and memory use."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "max_entry_bytes": self.max_entry_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,251 @@
+"""Garbage collection of orphaned database file blobs (incremental mark-and-sweep)."""
+import asyncio
+import logging
+import re
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import async_session
+from app.services.storage import get_storage_service
+
+logger = logging.getLogger(__name__)
+
+# Blob ids are uuid4 strings; they appear in relative and absolute upload URLs
+_UPLOAD_ID_RE = re.compile(
+    r"/uploads/([0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})"
+)
+
+# One collection at a time per process (background loop vs admin trigger)
+_gc_lock = asyncio.Lock()
+
+
+@dataclass
+class GCReport:
+    """Outcome of one garbage collection run."""
+    dry_run: bool
+    referenced: int = 0
+    scanned: int = 0
+    orphaned: int = 0
+    deleted: int = 0
+    reclaimed_bytes: int = 0
+    batches: int = 0
+    duration_seconds: float = 0.0
+    skipped: Optional[str] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def _reference_sources() -> list[tuple[tuple, Optional[Any]]]:
+    """
+    Columns that may hold upload URLs, with the timestamp used for re-marking.
+
+    A timestamp of None means the table is always rescanned in full.
+    """
+    from app.models.image import Image
+    from app.models.video import Video
+    from app.models.sample_post import SamplePost
+    from app.models.character import Character
+    from app.models.setting import AppSetting
+
+    return [
+        ((Image.image_url, Image.metadata_json), Image.created_at),
+        ((Video.video_url, Video.thumbnail_url, Video.metadata_json), Video.created_at),
+        ((SamplePost.media_url, SamplePost.thumbnail_url, SamplePost.metadata_json), SamplePost.updated_at),
+        ((Character.profile_json,), Character.updated_at),
+        # Lipsync presets and other settings store full upload URLs in JSON values
+        ((AppSetting.value,), None),
+    ]
+
+
+async def _mark(
+    db: AsyncSession,
+    marked: set[str],
+    since: Optional[datetime],
+    batch_size: int,
+    pattern: re.Pattern = _UPLOAD_ID_RE,
+) -> None:
+    """Add every blob id referenced from the source columns to ``marked``."""
+    for columns, stamp in _reference_sources():
+        query = select(*columns)
+        if since is not None and stamp is not None:
+            query = query.where(stamp >= since)
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        async for row in result:
+            for value in row:
+                if value:
+                    marked.update(m.lower() for m in pattern.findall(value))
+
+    # Resized variants live as long as the image they were made from
+    from app.models.file_blob import FileDerivative
+
+    result = await db.stream(
+        select(FileDerivative.source_id, FileDerivative.derivative_id)
+        .execution_options(yield_per=batch_size)
+    )
+    async for source_id, derivative_id in result:
+        if source_id.lower() in marked:
+            marked.add(derivative_id.lower())
+
+    # Reference packs of current base images (stale packs are collectable)
+    from app.models.image import Image, ImageType
+    from app.models.reference_pack import ReferencePack
+
+    result = await db.stream(
+        select(ReferencePack.provider_url, ReferencePack.face_url)
+        .join(Image, Image.id == ReferencePack.image_id)
+        .where(Image.type == ImageType.BASE)
+        .where(ReferencePack.source_url == Image.image_url)
+        .execution_options(yield_per=batch_size)
+    )
+    async for row in result:
+        for value in row:
+            if value:
+                marked.update(m.lower() for m in pattern.findall(value))
+
+
+async def referenced_file_ids(pattern: re.Pattern, batch_size: int = 1000) -> set[str]:
+    """
+    Lower-cased file ids (captured by ``pattern`` from stored URLs) that are
+    still referenced anywhere the collector looks. Lets other tools, such as
+    the storage migration, refuse to delete files that are still in use.
+    """
+    marked: set[str] = set()
+    async with async_session() as db:
+        await _mark(db, marked, None, batch_size, pattern)
+    return marked
+
+
+async def _collect(
+    db: AsyncSession,
+    report: GCReport,
+    grace: timedelta,
+    batch_size: int,
+) -> None:
+    from app.models.file_blob import FileBlob, FileDerivative
+
+    storage = get_storage_service()
+
+    marked: set[str] = set()
+    last_mark = datetime.utcnow()
+    await _mark(db, marked, None, batch_size)
+
+    # Only blobs that existed before the grace window can be collected, so
+    # uploads whose owning row has not been written yet are left alone
+    cutoff = datetime.utcnow() - grace
+    last_id = ""
+    while True:
+        result = await db.execute(
+            select(FileBlob.id, FileBlob.size)
+            .where(
+                func.coalesce(FileBlob.last_referenced_at, FileBlob.created_at) < cutoff,
+                FileBlob.id > last_id,
+            )
+            .order_by(FileBlob.id)
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        report.scanned += len(rows)
+        report.batches += 1
+
+        orphans = [row for row in rows if row.id.lower() not in marked]
+        if orphans:
+            # Incremental re-mark: rows written since the last pass (plus the
+            # grace window, for rows whose URL is filled in after creation)
+            # may reference blobs from this batch
+            mark_started = datetime.utcnow()
+            await _mark(db, marked, last_mark - grace, batch_size)
+            last_mark = mark_started
+            orphans = [row for row in orphans if row.id.lower() not in marked]
+
+        if orphans and not report.dry_run:
+            # Blobs reused by an upload since they were scanned survive here
+            deleted = set(await storage.delete_orphaned_blobs([row.id for row in orphans], db, cutoff))
+            if deleted:
+                await db.execute(
+                    delete(FileDerivative).where(FileDerivative.source_id.in_(deleted))
+                )
+            await db.commit()
+            orphans = [row for row in orphans if row.id in deleted]
+            report.deleted += len(orphans)
+        report.orphaned += len(orphans)
+        report.reclaimed_bytes += sum(row.size for row in orphans)
+
+        # Let request handlers run between batches
+        await asyncio.sleep(0)
+
+    report.referenced = len(marked)
+
+
+async def collect_orphaned_blobs(
+    dry_run: bool = False,
+    grace_hours: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> GCReport:
+    """
+    Delete file_blobs rows that nothing references any more.
+
+    Mark: collect blob ids from upload URLs in images, videos, sample posts,
+    character profiles and app settings, plus variants of marked images and
+    reference packs of base images. Sweep: walk blobs older than the
+    grace period in id order, deleting unreferenced ones batch by batch and
+    committing after each batch. Only the database backend is collected.
+    """
+    settings = get_settings()
+    report = GCReport(dry_run=dry_run)
+    storage = get_storage_service()
+    if storage.storage_backend in ("gcs", "local"):
+        report.skipped = f"storage backend is {storage.storage_backend}"
+        return report
+
+    grace = timedelta(hours=settings.blob_gc_grace_hours if grace_hours is None else grace_hours)
+    batch_size = max(batch_size or settings.blob_gc_batch_size, 1)
+
+    if _gc_lock.locked():
+        report.skipped = "collection already running"
+        return report
+
+    async with _gc_lock:
+        started = time.monotonic()
+        async with async_session() as db:
+            await _collect(db, report, grace, batch_size)
+        report.duration_seconds = round(time.monotonic() - started, 3)
+
+    logger.info(
+        "Blob GC%s: scanned %d, orphaned %d, deleted %d, reclaimed %d bytes in %.1fs",
+        " (dry run)" if dry_run else "",
+        report.scanned,
+        report.orphaned,
+        report.deleted,
+        report.reclaimed_bytes,
+        report.duration_seconds,
+    )
+    return report
+
+
+async def run_blob_gc_loop(interval_seconds: int) -> None:
+    """
+    Background task: collect orphaned blobs every ``interval_seconds``.
+
+    Sweeps are dry runs (logged, nothing deleted) unless blob_gc_delete is set.
+    """
+    dry_run = not get_settings().blob_gc_delete
+    if dry_run:
+        logger.info("Blob GC loop running in dry-run mode; set BLOB_GC_DELETE=true to delete")
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await collect_orphaned_blobs(dry_run=dry_run)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Blob GC failed: {e}")
@@ -0,0 +1,283 @@
+"""
+Resized image variants (thumbnails) generated after save and served by width,
+plus blurhashes of images too large to hash while saving.
+"""
+import asyncio
+import functools
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from PIL import Image, ImageOps
+from sqlalchemy import event, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import async_session
+from app.services.storage import get_storage_service, probe_image
+
+logger = logging.getLogger(__name__)
+
+# Formats Pillow can decode here without plugins; GIFs keep their animation
+RESIZABLE_TYPES = {"image/jpeg", "image/png", "image/webp"}
+
+_PENDING_KEY = "pending_derivatives"
+
+
+def _render_variants(
+    content: bytes,
+    widths: list[int],
+    fmt: str,
+    quality: int,
+) -> list[tuple[int, Optional[bytes]]]:
+    """
+    Resize an image to each width (runs on the worker pool).
+
+    Widths the original does not exceed map to None: the original is served.
+    """
+    results: list[tuple[int, Optional[bytes]]] = []
+    with Image.open(io.BytesIO(content)) as img:
+        if img.format == "JPEG" and widths:
+            # Let libjpeg decode at a reduced scale when shrinking a lot
+            img.draft("RGB", (max(widths), max(widths)))
+        img = ImageOps.exif_transpose(img)
+        if fmt == "jpeg":
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+
+        for width in widths:
+            if width >= img.width:
+                results.append((width, None))
+                continue
+            height = max(round(img.height * width / img.width), 1)
+            resized = img.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+            buffer = io.BytesIO()
+            if fmt == "jpeg":
+                resized.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+            else:
+                resized.save(buffer, format="WEBP", quality=quality, method=4)
+            results.append((width, buffer.getvalue()))
+    return results
+
+
+class DerivativeService:
+    """Generates and looks up resized variants of stored images."""
+
+    def __init__(self):
+        settings = get_settings()
+        self.widths = sorted({
+            int(w) for w in settings.image_derivative_widths.split(",") if w.strip()
+        })
+        self.format = "jpeg" if settings.image_derivative_format.lower() in ("jpg", "jpeg") else "webp"
+        self.content_type = f"image/{self.format}"
+        self.quality = settings.image_derivative_quality
+        # Only database blobs are resized on read (get_upload) and swept by blob_gc
+        self.backend_supported = settings.storage_backend == "database"
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(settings.image_derivative_workers, 1),
+            thread_name_prefix="derivatives",
+        )
+        self._inflight: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.widths) and self.backend_supported
+
+    def close(self) -> None:
+        """Release the resize pool."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def schedule(self, file_id: str, blurhash_url: Optional[str] = None) -> None:
+        """
+        Generate variants for a stored file in the background. With
+        ``blurhash_url``, then also fill in the blurhash of the images
+        stored under that URL.
+        """
+        if not (self.enabled or blurhash_url) or file_id in self._inflight:
+            return
+        self._inflight.add(file_id)
+        task = asyncio.get_running_loop().create_task(self._process(file_id, blurhash_url))
+        self._tasks.add(task)
+
+        def _done(t: asyncio.Task) -> None:
+            self._tasks.discard(t)
+            self._inflight.discard(file_id)
+
+        task.add_done_callback(_done)
+
+    def schedule_after_commit(self, file_id: str, db: AsyncSession, blurhash_url: Optional[str] = None) -> None:
+        """
+        Like schedule(), once ``db`` commits.
+
+        Database-backed files (and the image rows pointing at them) are not
+        visible to other sessions until the saving request commits, so work
+        is deferred until then.
+        """
+        if not (self.enabled or blurhash_url):
+            return
+        pending = db.info.setdefault(_PENDING_KEY, [])
+        if not db.info.get("derivatives_listening"):
+            event.listen(db.sync_session, "after_commit", self._on_commit)
+            event.listen(db.sync_session, "after_rollback", self._on_rollback)
+            db.info["derivatives_listening"] = True
+        pending.append((file_id, blurhash_url))
+
+    def _on_commit(self, session) -> None:
+        for file_id, blurhash_url in session.info.pop(_PENDING_KEY, []):
+            self.schedule(file_id, blurhash_url)
+
+    def _on_rollback(self, session) -> None:
+        session.info.pop(_PENDING_KEY, None)
+
+    async def _process(self, file_id: str, blurhash_url: Optional[str]) -> None:
+        if self.enabled:
+            await self.generate(file_id)
+        if blurhash_url:
+            await self.fill_blurhash(file_id, blurhash_url)
+
+    async def fill_blurhash(self, file_id: str, url: str) -> None:
+        """
+        Set the blurhash of images stored under ``url`` that have none.
+
+        The hash is taken from the smallest variant when there is one; the
+        original is only read when there is no variant or the dimensions
+        could not be read from its head while saving.
+        """
+        from app.models.file_blob import FileDerivative
+        from app.models.image import Image
+
+        storage = get_storage_service()
+        urls = {url, storage.get_full_url(url)}
+        try:
+            async with async_session() as db:
+                result = await db.execute(
+                    select(Image.width).where(Image.image_url.in_(urls), Image.blurhash.is_(None))
+                )
+                widths = result.scalars().all()
+                if not widths:
+                    return
+
+                source_id = file_id
+                if self.backend_supported and all(w is not None for w in widths):
+                    result = await db.execute(
+                        select(FileDerivative.derivative_id)
+                        .where(FileDerivative.source_id == file_id)
+                        .order_by(FileDerivative.width)
+                        .limit(1)
+                    )
+                    source_id = result.scalar_one_or_none() or file_id
+                stored = await storage.read_file(source_id, db)
+                if stored is None:
+                    return
+
+                loop = asyncio.get_running_loop()
+                probe = await loop.run_in_executor(self._executor, probe_image, stored[0])
+                await db.execute(
+                    update(Image)
+                    .where(Image.image_url.in_(urls), Image.blurhash.is_(None))
+                    .values(blurhash=probe["blurhash"])
+                )
+                if source_id == file_id:
+                    await db.execute(
+                        update(Image)
+                        .where(Image.image_url.in_(urls), Image.width.is_(None))
+                        .values(width=probe["width"], height=probe["height"])
+                    )
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Failed to compute blurhash for {file_id}: {e}")
+
+    async def generate(self, file_id: str) -> None:
+        """Create any missing variants of ``file_id``."""
+        from app.models.file_blob import FileDerivative
+
+        storage = get_storage_service()
+        try:
+            async with async_session() as db:
+                result = await db.execute(
+                    select(FileDerivative.width).where(FileDerivative.source_id == file_id)
+                )
+                done = set(result.scalars().all())
+                widths = [w for w in self.widths if w not in done]
+                if not widths:
+                    return
+
+                info = await storage.get_file_info(file_id, db)
+                if info is None or info.content_type.split(";")[0] not in RESIZABLE_TYPES:
+                    return
+                stored = await storage.read_file(file_id, db)
+                if stored is None:
+                    return
+
+                loop = asyncio.get_running_loop()
+                variants = await loop.run_in_executor(
+                    self._executor,
+                    functools.partial(_render_variants, stored[0], widths, self.format, self.quality),
+                )
+
+                for width, data in variants:
+                    if data is None:
+                        db.add(FileDerivative(
+                            source_id=file_id,
+                            width=width,
+                            derivative_id=file_id,
+                            content_type=info.content_type,
+                            size=info.size,
+                        ))
+                        continue
+                    saved = await storage.save_bytes(
+                        data, f"w{width}.{self.format}", self.content_type, db, derived=True
+                    )
+                    db.add(FileDerivative(
+                        source_id=file_id,
+                        width=width,
+                        derivative_id=saved["id"],
+                        content_type=self.content_type,
+                        size=len(data),
+                    ))
+                await db.commit()
+                logger.info("Generated %d variants for %s", len(variants), file_id)
+        except IntegrityError:
+            # Another worker generated them first
+            logger.info("Variants for %s already exist", file_id)
+        except Exception as e:
+            logger.warning(f"Failed to generate variants for {file_id}: {e}")
+
+    async def resolve(self, file_id: str, width: int, db: AsyncSession) -> Optional[str]:
+        """
+        File id to serve for a request of ``width`` pixels.
+
+        Picks the smallest variant at least that wide, or the original when
+        the request is wider than every variant. Returns None (and schedules
+        generation) while no variants exist yet.
+        """
+        from app.models.file_blob import FileDerivative
+
+        result = await db.execute(
+            select(FileDerivative.width, FileDerivative.derivative_id)
+            .where(FileDerivative.source_id == file_id)
+            .order_by(FileDerivative.width)
+        )
+        rows = result.all()
+        if not rows:
+            self.schedule(file_id)
+            return None
+        for row in rows:
+            if row.width >= width:
+                return row.derivative_id
+        return file_id
+
+
+_derivative_service: Optional[DerivativeService] = None
+
+
+def get_derivative_service() -> DerivativeService:
+    """Get derivative service instance."""
+    global _derivative_service
+    if _derivative_service is None:
+        _derivative_service = DerivativeService()
+    return _derivative_service
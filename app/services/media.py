@@ -0,0 +1,83 @@
+"""Media resolver: read our own upload URLs from storage, fetch the rest over HTTP."""
+import asyncio
+import logging
+import os
+import tempfile
+from typing import AsyncIterator, BinaryIO, Optional
+
+from app.clients.http import http_client
+from app.services.storage import get_storage_service
+
+logger = logging.getLogger(__name__)
+
+
+def own_file_id(url: str) -> Optional[str]:
+    """Storage file ID when ``url`` (relative or absolute) is one of our uploads."""
+    if not url or url.startswith("data:"):
+        return None
+    return get_storage_service().file_id_from_url(url)
+
+
+async def fetch_media(url: str, timeout: float = 30.0) -> tuple[bytes, str]:
+    """
+    Get the bytes and content type behind a media URL.
+
+    Our own /uploads URLs are read straight from the storage backend (and
+    its blob cache) instead of looping back through the public ingress.
+    Anything else is downloaded; HTTP errors propagate as ``httpx`` errors.
+    """
+    storage = get_storage_service()
+    file_id = own_file_id(url)
+    if file_id is not None:
+        stored = await storage.read_file(file_id, None)
+        if stored is not None:
+            return stored
+        logger.info("Upload %s not in local storage, fetching over HTTP", file_id)
+
+    async with http_client("media", timeout=timeout, follow_redirects=True) as client:
+        response = await client.get(storage.get_full_url(url))
+        response.raise_for_status()
+        return response.content, response.headers.get("content-type", "application/octet-stream")
+
+
+# Chunks are batched into writes of this size, each made off the event loop
+_WRITE_BATCH_SIZE = 1024 * 1024
+
+
+async def _write_chunks(chunks: AsyncIterator[bytes], f: BinaryIO) -> None:
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= _WRITE_BATCH_SIZE:
+            await asyncio.to_thread(f.write, bytes(buffer))
+            buffer.clear()
+    if buffer:
+        await asyncio.to_thread(f.write, bytes(buffer))
+
+
+async def fetch_media_to_file(url: str, suffix: str = "", timeout: float = 60.0) -> str:
+    """
+    Stream a media URL into a temp file and return its path (caller deletes).
+
+    Used for tools like ffmpeg that need a real file; large videos are
+    copied chunk by chunk rather than held in memory.
+    """
+    storage = get_storage_service()
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            file_id = own_file_id(url)
+            info = await storage.get_file_info(file_id, None) if file_id else None
+            if info is not None:
+                if info.size:
+                    await _write_chunks(storage.iter_file(file_id, 0, info.size - 1, info=info), f)
+                return path
+
+            async with http_client("media", timeout=timeout, follow_redirects=True) as client:
+                async with client.stream("GET", storage.get_full_url(url)) as response:
+                    response.raise_for_status()
+                    await _write_chunks(response.aiter_bytes(storage.stream_chunk_size), f)
+        return path
+    except BaseException:
+        os.unlink(path)
+        raise
@@ -0,0 +1,188 @@
+"""Reference packs: base images preprocessed once for providers and edits."""
+import asyncio
+import base64
+import hashlib
+import io
+import logging
+from typing import Optional
+
+from PIL import Image as PILImage
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session
+from app.services.blob_cache import BlobCache
+from app.services.media import fetch_media
+from app.services.storage import get_storage_service
+
+logger = logging.getLogger(__name__)
+
+PACK_KINDS = ("provider", "face")
+
+# Ready-made data URLs; a handful of characters' base images is a few MB
+_data_url_cache: BlobCache[str] = BlobCache(max_bytes=64 * 1024 * 1024, max_entry_bytes=8 * 1024 * 1024)
+
+_pending: set[asyncio.Task] = set()
+# Images whose pack is being built, so concurrent requests schedule it once
+_building: set[str] = set()
+
+
+def _encode_jpeg(image: PILImage.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _render_pack(content: bytes) -> dict[str, bytes]:
+    """Produce the pack images from the original bytes (runs in a worker thread)."""
+    with PILImage.open(io.BytesIO(content)) as image:
+        # Same flattening as SeedreamClient._to_data_url: transparency onto white
+        if image.mode in ("RGBA", "LA", "P"):
+            background = PILImage.new("RGB", image.size, (255, 255, 255))
+            if image.mode == "P":
+                image = image.convert("RGBA")
+            background.paste(image, mask=image.split()[-1])
+            rgb = background
+        else:
+            rgb = image.convert("RGB")
+
+    # Same crop as the edit flow: top 45% (face/head area)
+    face = rgb.crop((0, 0, rgb.width, int(rgb.height * 0.45)))
+
+    return {
+        "provider": _encode_jpeg(rgb, 92),
+        "face": _encode_jpeg(face, 90),
+    }
+
+
+async def build_reference_pack(image_id: str, db: AsyncSession):
+    """
+    Compute and persist the reference pack for an image.
+
+    Returns the ReferencePack, or None if the image has no usable file.
+    The caller commits.
+    """
+    from app.models.image import Image
+    from app.models.reference_pack import ReferencePack
+
+    result = await db.execute(select(Image).where(Image.id == image_id))
+    image = result.scalar_one_or_none()
+    if image is None or not image.image_url:
+        return None
+
+    storage = get_storage_service()
+    content, _ = await fetch_media(image.image_url)
+    rendered = await asyncio.to_thread(_render_pack, content)
+
+    urls = {}
+    for kind, data in rendered.items():
+        saved = await storage.save_bytes(data, f"ref_{kind}.jpg", "image/jpeg", db, derived=True)
+        urls[kind] = saved["url"]
+
+    await db.execute(delete(ReferencePack).where(ReferencePack.image_id == image_id))
+    pack = ReferencePack(
+        image_id=image_id,
+        source_url=image.image_url,
+        source_sha256=hashlib.sha256(content).hexdigest(),
+        provider_url=urls["provider"],
+        face_url=urls["face"],
+    )
+    db.add(pack)
+    await db.flush()
+    logger.info("Built reference pack for image %s", image_id)
+    return pack
+
+
+async def _build_in_own_session(image_id: str, kind: str = "provider") -> Optional[str]:
+    """Build and commit a pack independently of the caller's session; returns its ``kind`` URL."""
+    try:
+        async with async_session() as db:
+            pack = await build_reference_pack(image_id, db)
+            url = getattr(pack, f"{kind}_url") if pack is not None else None
+            await db.commit()
+            return url
+    except Exception as e:
+        logger.warning(f"Failed to build reference pack for {image_id}: {e}")
+        return None
+
+
+def schedule_reference_pack(image_id: str) -> None:
+    """Build a pack in the background (call after the approval is committed)."""
+    if image_id in _building:
+        return
+    _building.add(image_id)
+
+    def _done(task: asyncio.Task) -> None:
+        _pending.discard(task)
+        _building.discard(image_id)
+
+    task = asyncio.create_task(_build_in_own_session(image_id))
+    _pending.add(task)
+    task.add_done_callback(_done)
+
+
+async def invalidate_reference_packs(image_ids: list[str], db: AsyncSession) -> None:
+    """Drop packs of images that stopped being base images (files go to blob GC)."""
+    from app.models.reference_pack import ReferencePack
+
+    if image_ids:
+        await db.execute(delete(ReferencePack).where(ReferencePack.image_id.in_(image_ids)))
+
+
+async def _pack_data_url(url: str) -> Optional[str]:
+    """Data URL of a stored pack JPEG, memoised in-process."""
+    cached = _data_url_cache.get(url)
+    if cached is not None:
+        return cached
+    storage = get_storage_service()
+    file_id = storage.file_id_from_url(url)
+    stored = await storage.read_file(file_id, None) if file_id else None
+    if stored is None:
+        return None
+    data_url = f"data:image/jpeg;base64,{base64.b64encode(stored[0]).decode('utf-8')}"
+    _data_url_cache.put(url, data_url, len(data_url))
+    return data_url
+
+
+async def get_reference_data_urls(images: list, kind: str, db: AsyncSession) -> list[Optional[str]]:
+    """
+    Pack data URLs of ``kind`` for the given Image rows, in the same order.
+
+    An entry is None when the pack is missing or stale (image_url changed),
+    so callers fall back to the original image; the pack is rebuilt in the
+    background for the next request.
+    """
+    from app.models.reference_pack import ReferencePack
+
+    if kind not in PACK_KINDS:
+        raise ValueError(f"Unknown reference pack kind: {kind}")
+    if not images:
+        return []
+
+    result = await db.execute(
+        select(ReferencePack).where(ReferencePack.image_id.in_([img.id for img in images]))
+    )
+    packs = {pack.image_id: pack for pack in result.scalars().all()}
+
+    data_urls: list[Optional[str]] = []
+    for image in images:
+        pack = packs.get(image.id)
+        if pack is None or pack.source_url != image.image_url:
+            schedule_reference_pack(image.id)
+            data_urls.append(None)
+        else:
+            data_urls.append(await _pack_data_url(getattr(pack, f"{kind}_url")))
+    return data_urls
+
+
+async def reference_images_for(images: list, db: AsyncSession) -> list[str]:
+    """
+    Seedream reference inputs for base images: provider-ready pack data URLs,
+    falling back to the image's own URL when no pack is available.
+    """
+    storage = get_storage_service()
+    packed = await get_reference_data_urls(images, "provider", db)
+    return [
+        data_url or storage.get_full_url(image.image_url)
+        for image, data_url in zip(images, packed)
+    ]
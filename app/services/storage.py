@@ -1,39 +1,176 @@
-"""File storage service with support for Database and Google Cloud Storage."""
+"""File storage service with support for Database, Google Cloud Storage and local disk."""
+import asyncio
+import base64
+import fcntl
+import functools
+import hashlib
+import io
+import mimetypes
+import mmap
+import os
+import tempfile
 import uuid
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Any, AsyncIterator, Awaitable, BinaryIO, Callable, Iterator, Optional
 from datetime import datetime
 
 from fastapi import UploadFile
-from sqlalchemy import select
+from sqlalchemy import select, delete, update, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
+from app.services.blob_cache import BlobCache
 
 logger = logging.getLogger(__name__)
 
 
+class FileTooLargeError(Exception):
+    """Raised when streamed content exceeds the allowed size."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"File exceeds maximum size of {max_size} bytes")
+
+
+# Leading magic bytes for the media types we accept; checked in order
+_MAGIC_SIGNATURES: tuple[tuple[bytes, int, str], ...] = (
+    (b"\xff\xd8\xff", 0, "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", 0, "image/png"),
+    (b"GIF87a", 0, "image/gif"),
+    (b"GIF89a", 0, "image/gif"),
+    (b"\x1a\x45\xdf\xa3", 0, "video/webm"),
+    (b"%PDF-", 0, "application/pdf"),
+)
+
+# ISO base media ("ftyp") major brands we can name; other brands (3GPP,
+# JPEG 2000, CMAF, ...) are left to the declared type
+_FTYP_BRANDS: dict[bytes, str] = {
+    **dict.fromkeys(
+        (b"isom", b"iso2", b"iso3", b"iso4", b"iso5", b"iso6", b"mp41", b"mp42", b"avc1", b"mmp4", b"M4V ", b"dash"),
+        "video/mp4",
+    ),
+    b"qt  ": "video/quicktime",
+    **dict.fromkeys((b"M4A ", b"M4B "), "audio/mp4"),
+    **dict.fromkeys((b"avif", b"avis"), "image/avif"),
+    **dict.fromkeys((b"heic", b"heix", b"heim", b"heis", b"mif1", b"msf1"), "image/heic"),
+}
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Detect a media type from the first bytes of a file, or None if unknown."""
+    for signature, offset, content_type in _MAGIC_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"mif1", b"msf1") and (b"avif" in head[16:64] or b"avis" in head[16:64]):
+            return "image/avif"  # Generic HEIF major brand; AVIF shows in the compatible brands
+        return _FTYP_BRANDS.get(brand)
+    return None
+
+
+# Width of the resized variant requested by gallery grid tiles
+GRID_THUMBNAIL_WIDTH = 320
+
+# Image types whose dimensions and blurhash are recorded on save
+_PROBE_TYPES = frozenset({"image/jpeg", "image/png", "image/webp", "image/gif"})
+# Bytes kept while saving to read dimensions from; images that fit entirely
+# are also blurhashed on the spot, larger ones after the save (see derivatives)
+_PROBE_HEAD_BYTES = 512 * 1024
+
+
+def probe_image(content: bytes, blurhash: bool = True) -> dict:
+    """
+    Pixel dimensions (and blurhash) of an image (runs in a worker thread).
+
+    With ``blurhash=False`` only the header is parsed, so ``content`` may be
+    just the leading bytes of the file.
+    """
+    from PIL import Image, ImageOps
+    from app.utils.blurhash import encode as encode_blurhash
+
+    with Image.open(io.BytesIO(content)) as img:
+        width, height = img.size
+        if img.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+            # EXIF rotation by 90/270 degrees swaps the displayed dimensions
+            width, height = height, width
+        if not blurhash:
+            return {"width": width, "height": height}
+        # The blurhash only needs a tiny copy; lets JPEGs decode at reduced scale
+        img.draft("RGB", (64, 64))
+        img = ImageOps.exif_transpose(img)
+        return {"width": width, "height": height, "blurhash": encode_blurhash(img)}
+
+
+@dataclass
+class StoredFile:
+    """Metadata for a stored file (never carries the payload)."""
+
+    id: str
+    content_type: str
+    size: int
+    created_at: Optional[datetime] = None
+    sha256: Optional[str] = None
+
+
 class StorageService:
     """Service for handling file uploads and storage."""
 
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None):
+        """``backend`` overrides settings.storage_backend (used by migration tools)."""
         settings = get_settings()
         self.public_base_url = settings.public_base_url.strip().rstrip("/")
-        self.storage_backend = settings.storage_backend.lower()
+        self.storage_backend = (backend or settings.storage_backend).lower()
         self.gcs_bucket_name = settings.gcs_bucket_name
         self.gcs_project_id = settings.gcs_project_id
+        self.stream_chunk_size = max(settings.storage_stream_chunk_size, 4096)
+        self.chunk_size = max(settings.storage_chunk_size, 64 * 1024)
+        self.dedup_enabled = settings.storage_dedup_enabled
+        self.max_download_bytes = settings.storage_max_download_bytes
+        self.upload_max_bytes = settings.upload_max_bytes
+        self.upload_max_bytes_privileged = settings.upload_max_bytes_privileged
+        self.local_root = Path(settings.upload_dir).resolve()
+        self.blob_cache: BlobCache[tuple[bytes, StoredFile]] = BlobCache(
+            max_bytes=settings.blob_cache_max_bytes,
+            max_entry_bytes=settings.blob_cache_max_entry_bytes,
+        )
+        # Resumable upload chunks must be a multiple of 256 KiB
+        self.gcs_upload_chunk_size = max(settings.gcs_upload_chunk_size // (256 * 1024), 1) * 256 * 1024
+        self.gcs_download_window_size = max(settings.gcs_download_window_size, self.stream_chunk_size)
         self._gcs_client = None
         self._gcs_bucket = None
+        # google-cloud-storage is synchronous; every call runs on this bounded pool
+        self._gcs_executor = ThreadPoolExecutor(
+            max_workers=max(settings.gcs_max_workers, 1),
+            thread_name_prefix="gcs",
+        )
 
     def _get_gcs_bucket(self):
-        """Get GCS bucket (lazy initialization)."""
+        """Get GCS bucket (lazy initialization, call from the GCS pool)."""
         if self._gcs_bucket is None:
             from google.cloud import storage as gcs_storage
             self._gcs_client = gcs_storage.Client(project=self.gcs_project_id or None)
             self._gcs_bucket = self._gcs_client.bucket(self.gcs_bucket_name)
         return self._gcs_bucket
 
+    async def _run_gcs(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking google-cloud-storage call on the GCS thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._gcs_executor,
+            functools.partial(fn, *args, **kwargs),
+        )
+
+    def close(self) -> None:
+        """Release the GCS thread pool."""
+        self._gcs_executor.shutdown(wait=False, cancel_futures=True)
+
     def _generate_filename(self, original_name: str) -> str:
         """Generate a unique filename."""
         ext = Path(original_name).suffix.lower()
@@ -46,101 +183,748 @@ class StorageService:
         date_folder = datetime.utcnow().strftime("%Y/%m/%d")
         return f"uploads/{date_folder}/{filename}"
 
-    async def _save_to_gcs(self, content: bytes, filename: str, content_type: str) -> dict:
-        """Save file to Google Cloud Storage."""
+    def _generate_gcs_digest_path(self, digest: str, filename: str) -> str:
+        """Generate content-addressed GCS object path."""
+        ext = Path(filename).suffix.lower()
+        return f"uploads/sha256/{digest[:2]}/{digest}{ext}"
+
+    async def _content_digest(self, content: bytes) -> Optional[str]:
+        """SHA-256 hex digest of content, or None when dedup is disabled."""
+        if not self.dedup_enabled:
+            return None
+        if len(content) > self.chunk_size:
+            # hashlib releases the GIL, keep large files off the event loop
+            return await asyncio.to_thread(lambda: hashlib.sha256(content).hexdigest())
+        return hashlib.sha256(content).hexdigest()
+
+    def _adjust_gcs_refcount(self, blob, delta: int) -> int:
+        """Adjust the refcount metadata of a GCS object, retrying on races (blocking)."""
+        from google.api_core.exceptions import PreconditionFailed
+
+        for _ in range(5):
+            blob.reload()
+            metadata = dict(blob.metadata or {})
+            count = int(metadata.get("refcount", "1")) + delta
+            metadata["refcount"] = str(count)
+            blob.metadata = metadata
+            try:
+                blob.patch(if_metageneration_match=blob.metageneration)
+                return count
+            except PreconditionFailed:
+                continue
+        raise RuntimeError(f"Could not update refcount for {blob.name}")
+
+    def _upload_gcs_sync(
+        self,
+        source: BinaryIO,
+        size: int,
+        gcs_path: str,
+        content_type: str,
+        digest: Optional[str],
+    ) -> tuple[Any, bool]:
+        """
+        Upload a stream to GCS in one pool hop. Returns (blob, deduplicated).
+
+        Objects above one upload chunk go through a chunked resumable upload
+        read straight from ``source``; the public ACL is applied in the same
+        request instead of a separate make_public() round trip.
+        """
+        from google.api_core.exceptions import PreconditionFailed
+
         bucket = self._get_gcs_bucket()
-        gcs_path = self._generate_gcs_path(filename)
-        blob = bucket.blob(gcs_path)
-        blob.upload_from_string(content, content_type=content_type)
+        if digest:
+            existing = bucket.get_blob(gcs_path)
+            if existing is not None:
+                self._adjust_gcs_refcount(existing, 1)
+                return existing, True
 
-        # Make the blob publicly readable
-        blob.make_public()
+        chunk_size = self.gcs_upload_chunk_size if size > self.gcs_upload_chunk_size else None
+        blob = bucket.blob(gcs_path, chunk_size=chunk_size)
+        if digest:
+            blob.metadata = {"sha256": digest, "refcount": "1"}
+        try:
+            blob.upload_from_file(
+                source,
+                size=size,
+                content_type=content_type,
+                predefined_acl="publicRead",
+                if_generation_match=0 if digest else None,
+            )
+        except PreconditionFailed:
+            # Lost a race with an identical upload; share its object
+            self._adjust_gcs_refcount(blob, 1)
+            return blob, True
+        return blob, False
 
+    def _gcs_result(
+        self,
+        blob,
+        filename: str,
+        content_type: str,
+        size: int,
+        digest: Optional[str],
+        deduplicated: bool,
+    ) -> dict:
+        """Build the save result for a GCS object."""
+        if deduplicated:
+            logger.info("Deduplicated GCS upload %s -> %s", filename, blob.name)
         return {
-            "id": gcs_path,
+            "id": blob.name,
             "filename": filename,
             "content_type": content_type,
-            "size": len(content),
+            "size": size,
             "url": blob.public_url,
             "full_url": blob.public_url,
-            "gcs_path": gcs_path,
+            "gcs_path": blob.name,
+            "sha256": digest,
+            "deduplicated": deduplicated,
             "created_at": datetime.utcnow().isoformat(),
         }
 
-    async def _save_to_database(self, content: bytes, filename: str, content_type: str, db: AsyncSession) -> dict:
-        """Save file to database."""
+    async def _save_to_gcs(self, content: bytes, filename: str, content_type: str) -> dict:
+        """
+        Save file to Google Cloud Storage.
+
+        With dedup enabled the object name is derived from the content digest,
+        so identical bytes map to one object whose metadata holds a refcount.
+        All blocking client calls run on the GCS thread pool.
+        """
+        digest = await self._content_digest(content)
+        if digest:
+            gcs_path = self._generate_gcs_digest_path(digest, filename)
+        else:
+            gcs_path = self._generate_gcs_path(filename)
+
+        blob, deduplicated = await self._run_gcs(
+            self._upload_gcs_sync,
+            io.BytesIO(content),
+            len(content),
+            gcs_path,
+            content_type,
+            digest,
+        )
+        return self._gcs_result(blob, filename, content_type, len(content), digest, deduplicated)
+
+    def _local_relative_path(self, filename: str, content_type: str, digest: Optional[str]) -> str:
+        """Generate a sharded relative path (ab/cd/<name><ext>) for a new local file."""
+        ext = Path(filename).suffix.lower() or mimetypes.guess_extension(content_type) or ""
+        name = digest or uuid.uuid4().hex
+        return f"{name[:2]}/{name[2:4]}/{name}{ext}"
+
+    def local_path(self, file_id: str) -> Optional[Path]:
+        """
+        Resolve a file ID to its on-disk path (local backend only).
+
+        Lets internal consumers such as ffmpeg read the file in place instead
+        of copying it through memory. Returns None for other backends, missing
+        files, and IDs that would escape the upload directory.
+        """
+        if self.storage_backend != "local":
+            return None
+        path = (self.local_root / file_id.lstrip("/")).resolve()
+        if self.local_root not in path.parents or not path.is_file():
+            return None
+        if path.name.endswith(".refs") or path.name.startswith(".tmp-"):
+            return None
+        return path
+
+    @contextmanager
+    def open_mapped(self, file_id: str) -> Iterator[Optional[memoryview]]:
+        """Memory-map a local file read-only; yields None if it is not on disk."""
+        path = self.local_path(file_id)
+        if path is None or path.stat().st_size == 0:
+            yield None
+            return
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                yield view
+            finally:
+                view.release()
+
+    @staticmethod
+    def _adjust_local_refcount(path: Path, delta: int) -> int:
+        """Adjust the sidecar refcount of a local file under an exclusive lock."""
+        refs_path = path.with_name(path.name + ".refs")
+        with open(refs_path, "a+") as refs:
+            fcntl.flock(refs, fcntl.LOCK_EX)
+            refs.seek(0)
+            raw = refs.read().strip()
+            count = (int(raw) if raw else 1) + delta
+            refs.seek(0)
+            refs.truncate()
+            refs.write(str(count))
+        return count
+
+    def _local_temp_file(self) -> tuple[int, str]:
+        """Create a temp file on the upload filesystem so it can be renamed into place."""
+        tmp_dir = self.local_root / ".tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        return tempfile.mkstemp(dir=tmp_dir, prefix=".tmp-")
+
+    def _commit_local_file(self, tmp_path: str, relative_path: str, digest: Optional[str]) -> bool:
+        """
+        Move a fully written temp file into place. Returns True if deduplicated.
+
+        When a digest-named file already exists the temp copy is dropped and
+        the existing file's refcount is bumped instead.
+        """
+        path = self.local_root / relative_path
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                # link() never overwrites, so concurrent identical uploads
+                # cannot both claim to have created the file
+                os.link(tmp_path, path)
+                return False
+            except FileExistsError:
+                if not digest:
+                    raise
+                self._adjust_local_refcount(path, 1)
+                return True
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _write_local_file(self, content: bytes, relative_path: str, digest: Optional[str]) -> bool:
+        """Write content atomically. Returns True if deduplicated."""
+        fd, tmp_path = self._local_temp_file()
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        return self._commit_local_file(tmp_path, relative_path, digest)
+
+    def _local_result(
+        self,
+        relative_path: str,
+        filename: str,
+        content_type: str,
+        size: int,
+        digest: Optional[str],
+        deduplicated: bool,
+    ) -> dict:
+        """Build the save result for a local file."""
+        if deduplicated:
+            logger.info("Deduplicated local upload %s -> %s", filename, relative_path)
+        return {
+            "id": relative_path,
+            "filename": filename,
+            "content_type": content_type,
+            "size": size,
+            "url": f"/uploads/{relative_path}",
+            "full_url": f"{self.public_base_url}/uploads/{relative_path}",
+            "sha256": digest,
+            "deduplicated": deduplicated,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+
+    async def _save_to_local(self, content: bytes, filename: str, content_type: str) -> dict:
+        """
+        Save file to the local filesystem under upload_dir.
+
+        Files are sharded two levels deep by name. With dedup enabled the name
+        is the content digest and a ``.refs`` sidecar holds the refcount.
+        """
+        digest = await self._content_digest(content)
+        relative_path = self._local_relative_path(filename, content_type, digest)
+        path = self.local_root / relative_path
+
+        if digest and path.exists():
+            await asyncio.to_thread(self._adjust_local_refcount, path, 1)
+            deduplicated = True
+        else:
+            deduplicated = await asyncio.to_thread(
+                self._write_local_file, content, relative_path, digest
+            )
+        return self._local_result(relative_path, filename, content_type, len(content), digest, deduplicated)
+
+    def _database_result(
+        self,
+        blob_id: str,
+        filename: str,
+        content_type: str,
+        size: int,
+        digest: Optional[str],
+        deduplicated: bool = False,
+    ) -> dict:
+        """Build the save result for a database blob."""
+        return {
+            "id": blob_id,
+            "filename": filename,
+            "content_type": content_type,
+            "size": size,
+            "url": f"/uploads/{blob_id}",
+            "full_url": f"{self.public_base_url}/uploads/{blob_id}",
+            "sha256": digest,
+            "deduplicated": deduplicated,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+
+    async def _find_blob_by_digest(self, digest: str, db: AsyncSession):
+        """Find an existing database blob with the given digest (metadata only)."""
         from app.models.file_blob import FileBlob
 
+        result = await db.execute(
+            select(FileBlob.id, FileBlob.filename, FileBlob.content_type, FileBlob.size)
+            .where(FileBlob.sha256 == digest)
+            .limit(1)
+        )
+        return result.one_or_none()
+
+    async def _save_to_database(self, content: bytes, filename: str, content_type: str, db: AsyncSession) -> dict:
+        """
+        Save file to database.
+
+        Identical content is stored once: a matching digest bumps the existing
+        row's ref_count and returns its id. Payloads larger than one chunk are
+        written as FileBlobChunk rows, one INSERT per chunk, so no single
+        statement carries the whole file.
+        """
+        from app.models.file_blob import FileBlob, FileBlobChunk
+
         size = len(content)
+        digest = await self._content_digest(content)
+        if digest:
+            existing = await self._find_blob_by_digest(digest, db)
+            if existing is not None:
+                await db.execute(
+                    update(FileBlob)
+                    .where(FileBlob.id == existing.id)
+                    .values(ref_count=FileBlob.ref_count + 1, last_referenced_at=datetime.utcnow())
+                )
+                logger.info("Deduplicated upload %s -> blob %s", filename, existing.id)
+                return self._database_result(
+                    existing.id,
+                    existing.filename,
+                    existing.content_type,
+                    existing.size,
+                    digest,
+                    deduplicated=True,
+                )
+
+        chunked = size > self.chunk_size
         blob = FileBlob(
             filename=filename,
             content_type=content_type,
             size=size,
-            data=content,
+            data=b"" if chunked else content,
+            chunk_size=self.chunk_size if chunked else None,
+            sha256=digest,
         )
         db.add(blob)
         await db.flush()
+
+        if chunked:
+            view = memoryview(content)
+            for seq, offset in enumerate(range(0, size, self.chunk_size)):
+                db.add(FileBlobChunk(
+                    blob_id=blob.id,
+                    seq=seq,
+                    data=bytes(view[offset:offset + self.chunk_size]),
+                ))
+                await db.flush()
+
+        return self._database_result(blob.id, filename, content_type, size, digest)
+
+    async def _spool_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        write: Callable[[bytes], Awaitable[Any]],
+        hasher,
+        max_size: Optional[int],
+    ) -> int:
+        """
+        Copy a chunk stream into ``write``, hashing it unless ``hasher`` is None. Returns the size.
+
+        Chunks are coalesced to ``chunk_size`` so the (thread-offloaded)
+        writes stay few and large.
+        """
+        size = 0
+        buffer = bytearray()
+        async for chunk in chunks:
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                raise FileTooLargeError(max_size)
+            if hasher is not None:
+                hasher.update(chunk)
+            buffer += chunk
+            if len(buffer) >= self.chunk_size:
+                await write(bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await write(bytes(buffer))
+        return size
+
+    async def _discard_database_blob(self, blob, db: AsyncSession) -> None:
+        """Remove a partially written database blob and its chunks."""
+        from app.models.file_blob import FileBlobChunk
+
+        try:
+            await db.execute(
+                delete(FileBlobChunk).where(FileBlobChunk.blob_id == blob.id)
+            )
+            await db.delete(blob)
+            await db.flush()
+        except Exception as e:
+            logger.warning("Could not discard partial blob %s: %s", blob.id, e)
+
+    async def _save_stream_to_database(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        content_type: str,
+        db: AsyncSession,
+        max_size: Optional[int],
+    ) -> dict:
+        """
+        Save a chunk stream to the database as it arrives.
+
+        At most one storage chunk is buffered; full chunks are inserted as
+        FileBlobChunk rows immediately. Streams that fit in one chunk end up
+        inline, and duplicates found once the digest is known are discarded
+        in favour of the existing blob.
+        """
+        from app.models.file_blob import FileBlob, FileBlobChunk
+
+        hasher = hashlib.sha256()
+        blob = FileBlob(
+            filename=filename,
+            content_type=content_type,
+            size=0,
+            data=b"",
+            chunk_size=self.chunk_size,
+        )
+        db.add(blob)
+        await db.flush()
+
+        buffer = bytearray()
+        size = 0
+        seq = 0
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise FileTooLargeError(max_size)
+                hasher.update(chunk)
+                buffer += chunk
+                while len(buffer) >= self.chunk_size:
+                    db.add(FileBlobChunk(
+                        blob_id=blob.id,
+                        seq=seq,
+                        data=bytes(buffer[:self.chunk_size]),
+                    ))
+                    del buffer[:self.chunk_size]
+                    seq += 1
+                    await db.flush()
+        except BaseException:
+            await self._discard_database_blob(blob, db)
+            raise
+
+        digest = hasher.hexdigest() if self.dedup_enabled else None
+        if digest:
+            existing = await self._find_blob_by_digest(digest, db)
+            if existing is not None:
+                await self._discard_database_blob(blob, db)
+                await db.execute(
+                    update(FileBlob)
+                    .where(FileBlob.id == existing.id)
+                    .values(ref_count=FileBlob.ref_count + 1, last_referenced_at=datetime.utcnow())
+                )
+                logger.info("Deduplicated upload %s -> blob %s", filename, existing.id)
+                return self._database_result(
+                    existing.id,
+                    existing.filename,
+                    existing.content_type,
+                    existing.size,
+                    digest,
+                    deduplicated=True,
+                )
+
+        if seq == 0:
+            # Everything fit in one chunk: keep it inline like save_bytes does
+            blob.data = bytes(buffer)
+            blob.chunk_size = None
+        elif buffer:
+            db.add(FileBlobChunk(blob_id=blob.id, seq=seq, data=bytes(buffer)))
+        blob.size = size
+        blob.sha256 = digest
+        await db.flush()
+        return self._database_result(blob.id, filename, content_type, size, digest)
+
+    async def _save_stream_to_gcs(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        content_type: str,
+        max_size: Optional[int],
+    ) -> dict:
+        """
+        Save a chunk stream to GCS.
+
+        With dedup enabled the stream is spooled (in memory up to one chunk,
+        then on disk) while hashing, because the content-addressed object
+        name needs the digest; the spool then feeds a resumable upload.
+        Without dedup the stream goes straight into the upload.
+        """
+        if not self.dedup_enabled:
+            gcs_path = self._generate_gcs_path(filename)
+            blob, size = await self._stream_to_gcs(chunks, gcs_path, content_type, max_size)
+            return self._gcs_result(blob, filename, content_type, size, None, False)
+
+        hasher = hashlib.sha256()
+        with tempfile.SpooledTemporaryFile(max_size=self.chunk_size) as spool:
+            size = await self._spool_stream(
+                chunks, functools.partial(asyncio.to_thread, spool.write), hasher, max_size
+            )
+            digest = hasher.hexdigest()
+            gcs_path = self._generate_gcs_digest_path(digest, filename)
+            spool.seek(0)
+            blob, deduplicated = await self._run_gcs(
+                self._upload_gcs_sync, spool, size, gcs_path, content_type, digest
+            )
+        return self._gcs_result(blob, filename, content_type, size, digest, deduplicated)
+
+    async def _stream_to_gcs(
+        self,
+        chunks: AsyncIterator[bytes],
+        gcs_path: str,
+        content_type: str,
+        max_size: Optional[int],
+    ) -> tuple[Any, int]:
+        """
+        Write a chunk stream into a GCS object through a blob writer. Returns (blob, size).
+
+        Small objects are sent in one request on close, larger ones as a
+        resumable upload. On failure the upload is never finalized, so no
+        partial object appears.
+        """
+        def open_writer():
+            blob = self._get_gcs_bucket().blob(gcs_path, chunk_size=self.gcs_upload_chunk_size)
+            writer = blob.open(
+                "wb",
+                ignore_flush=True,
+                content_type=content_type,
+                predefined_acl="publicRead",
+            )
+            return blob, writer
+
+        blob, writer = await self._run_gcs(open_writer)
+        size = await self._spool_stream(
+            chunks, functools.partial(self._run_gcs, writer.write), None, max_size
+        )
+        await self._run_gcs(writer.close)
+        return blob, size
+
+    @staticmethod
+    def _sync_file(f: BinaryIO) -> None:
+        f.flush()
+        os.fsync(f.fileno())
+
+    async def _save_stream_to_local(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        content_type: str,
+        max_size: Optional[int],
+    ) -> dict:
+        """Save a chunk stream to a temp file, then rename it into the shard tree."""
+        hasher = hashlib.sha256()
+        fd, tmp_path = self._local_temp_file()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                size = await self._spool_stream(
+                    chunks, functools.partial(asyncio.to_thread, f.write), hasher, max_size
+                )
+                await asyncio.to_thread(self._sync_file, f)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        digest = hasher.hexdigest() if self.dedup_enabled else None
+        relative_path = self._local_relative_path(filename, content_type, digest)
+        deduplicated = await asyncio.to_thread(
+            self._commit_local_file, tmp_path, relative_path, digest
+        )
+        return self._local_result(relative_path, filename, content_type, size, digest, deduplicated)
+
+    async def save_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        content_type: str,
+        db: AsyncSession,
+        max_size: Optional[int] = None,
+    ) -> dict:
+        """
+        Save content from an async chunk iterator without buffering it whole.
+
+        Size and SHA-256 are computed on the fly. Raises FileTooLargeError as
+        soon as more than ``max_size`` bytes arrive; nothing partial is kept.
+
+        Returns:
+            Dictionary with file info including URL
+        """
+        if self.storage_backend == "gcs":
+            return await self._save_stream_to_gcs(chunks, filename, content_type, max_size)
+        if self.storage_backend == "local":
+            return await self._save_stream_to_local(chunks, filename, content_type, max_size)
+        return await self._save_stream_to_database(chunks, filename, content_type, db, max_size)
+
+    async def _save_content(self, content: bytes, filename: str, content_type: str, db: AsyncSession) -> dict:
+        """Save content to the configured backend."""
+        if self.storage_backend == "gcs":
+            return await self._save_to_gcs(content, filename, content_type)
+        if self.storage_backend == "local":
+            return await self._save_to_local(content, filename, content_type)
+        return await self._save_to_database(content, filename, content_type, db)
+
+    def upload_limit_for(self, user: Optional[Any]) -> int:
+        """Maximum upload size in bytes for a user (None for anonymous uploads)."""
+        if user is not None and (user.is_admin or user.role in ("admin", "developer")):
+            return self.upload_max_bytes_privileged
+        return self.upload_max_bytes
+
+    async def sniff_upload(self, file: UploadFile) -> str:
+        """
+        Content type of an upload, detected from its first bytes.
+
+        Falls back to the client-declared type when the signature (or an
+        ISO media brand) is unknown.
+        The file position is restored so the upload can still be saved.
+        """
+        head = await file.read(64)
+        await file.seek(0)
+        return sniff_content_type(head) or file.content_type or "application/octet-stream"
+
+    async def _iter_upload(self, file: UploadFile) -> AsyncIterator[bytes]:
+        """Read a spooled upload in stream_chunk_size pieces."""
+        while True:
+            chunk = await file.read(self.stream_chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    async def _tee_image(
+        self,
+        chunks: AsyncIterator[bytes],
+        content_type: str,
+        sink: bytearray,
+    ) -> AsyncIterator[bytes]:
+        """Pass chunks through, keeping the first _PROBE_HEAD_BYTES of an image for probing."""
+        keep = content_type.split(";")[0] in _PROBE_TYPES
+        async for chunk in chunks:
+            if keep and len(sink) < _PROBE_HEAD_BYTES:
+                sink += chunk[:_PROBE_HEAD_BYTES - len(sink)]
+            yield chunk
+
+    async def _add_image_info(self, result: dict, content_type: str, content: bytes) -> dict:
+        """
+        Add width, height and blurhash of a saved image to its result.
+
+        ``content`` may be just the head of the file; the blurhash is then
+        left to _schedule_derivatives.
+        """
+        if not content or content_type.split(";")[0] not in _PROBE_TYPES:
+            return result
+        complete = len(content) >= result.get("size", 0)
+        try:
+            result.update(await asyncio.to_thread(probe_image, content, complete))
+        except Exception as e:
+            if complete:
+                logger.warning("Could not probe image %s: %s", result.get("id"), e)
+        return result
+
+    def image_fields(self, saved: dict) -> dict:
+        """Image model columns describing a saved file (dimensions, size, blurhash)."""
         return {
-            "id": blob.id,
-            "filename": filename,
-            "content_type": content_type,
-            "size": size,
-            "url": f"/uploads/{blob.id}",
-            "full_url": f"{self.public_base_url}/uploads/{blob.id}",
-            "created_at": datetime.utcnow().isoformat(),
+            "width": saved.get("width"),
+            "height": saved.get("height"),
+            "file_size": saved.get("size"),
+            "blurhash": saved.get("blurhash"),
         }
 
-    async def save_upload(self, file: UploadFile, db: AsyncSession) -> dict:
+    async def save_upload(
+        self,
+        file: UploadFile,
+        db: AsyncSession,
+        max_size: Optional[int] = None,
+        content_type: Optional[str] = None,
+    ) -> dict:
         """
-        Save an uploaded file.
+        Save an uploaded file by streaming it into the storage backend.
+
+        The content type is sniffed from the first bytes unless given.
+        Raises FileTooLargeError without reading the body when the upload
+        is known to exceed ``max_size``, or as soon as it does mid-stream.
 
         Returns:
             Dictionary with file info including URL
         """
-        content = await file.read()
+        if max_size is not None and file.size is not None and file.size > max_size:
+            raise FileTooLargeError(max_size)
+
+        if content_type is None:
+            content_type = await self.sniff_upload(file)
         filename = self._generate_filename(file.filename or "file")
-        content_type = file.content_type or "application/octet-stream"
 
-        if self.storage_backend == "gcs":
-            result = await self._save_to_gcs(content, filename, content_type)
-            result["original_name"] = file.filename
-            return result
-        else:
-            result = await self._save_to_database(content, filename, content_type, db)
-            result["original_name"] = file.filename
-            return result
+        image_content = bytearray()
+        result = await self.save_stream(
+            self._tee_image(self._iter_upload(file), content_type, image_content),
+            filename,
+            content_type,
+            db,
+            max_size=max_size,
+        )
+        await self._add_image_info(result, content_type, bytes(image_content))
+        result["original_name"] = file.filename
+        self._schedule_derivatives(result, content_type, db)
+        return result
 
     async def save_from_url(self, url: str, db: AsyncSession, prefix: str = "downloaded") -> dict:
         """
         Download and save a file (image or video).
 
+        The response body is streamed into the storage backend chunk by chunk
+        and rejected once it exceeds storage_max_download_bytes.
+
         Returns:
             Dictionary with file info including local URL
         """
-        import httpx
-
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-
-            # Determine extension from content type
-            content_type = response.headers.get("content-type", "application/octet-stream")
-            ext_map = {
-                "image/jpeg": ".jpg",
-                "image/png": ".png",
-                "image/webp": ".webp",
-                "image/gif": ".gif",
-                "video/mp4": ".mp4",
-                "video/webm": ".webm",
-                "video/quicktime": ".mov",
-            }
-            ext = ext_map.get(content_type.split(";")[0], ".bin")
-            filename = self._generate_filename(f"{prefix}{ext}")
-
-            if self.storage_backend == "gcs":
-                return await self._save_to_gcs(response.content, filename, content_type)
-            else:
-                return await self._save_to_database(response.content, filename, content_type, db)
+        from app.clients.http import http_client
+
+        async with http_client("media", timeout=60.0) as client:
+            async with client.stream("GET", url) as response:
+                response.raise_for_status()
+
+                declared_size = response.headers.get("content-length")
+                if declared_size and declared_size.isdigit() and int(declared_size) > self.max_download_bytes:
+                    raise FileTooLargeError(self.max_download_bytes)
+
+                # Determine extension from content type
+                content_type = response.headers.get("content-type", "application/octet-stream")
+                ext_map = {
+                    "image/jpeg": ".jpg",
+                    "image/png": ".png",
+                    "image/webp": ".webp",
+                    "image/gif": ".gif",
+                    "video/mp4": ".mp4",
+                    "video/webm": ".webm",
+                    "video/quicktime": ".mov",
+                }
+                ext = ext_map.get(content_type.split(";")[0], ".bin")
+                filename = self._generate_filename(f"{prefix}{ext}")
+
+                image_content = bytearray()
+                result = await self.save_stream(
+                    self._tee_image(
+                        response.aiter_bytes(self.stream_chunk_size), content_type, image_content
+                    ),
+                    filename,
+                    content_type,
+                    db,
+                    max_size=self.max_download_bytes,
+                )
+        await self._add_image_info(result, content_type, bytes(image_content))
+        self._schedule_derivatives(result, content_type, db)
+        return result
 
     async def save_bytes(
         self,
@@ -148,64 +932,492 @@ class StorageService:
         filename: str,
         content_type: str,
         db: AsyncSession,
+        derived: bool = False,
     ) -> dict:
         """
         Save raw bytes.
 
+        ``derived`` files (resized variants, reference packs) are stored
+        as-is: they are not probed and get no variants of their own.
+
         Returns:
             Dictionary with file info including URL
         """
         generated_filename = self._generate_filename(filename)
 
-        if self.storage_backend == "gcs":
-            result = await self._save_to_gcs(content, generated_filename, content_type)
-            result["original_name"] = filename
+        result = await self._save_content(content, generated_filename, content_type, db)
+        if derived:
             return result
+        await self._add_image_info(result, content_type, content)
+        result["original_name"] = filename
+        self._schedule_derivatives(result, content_type, db)
+        return result
+
+    def _schedule_derivatives(self, result: dict, content_type: str, db: Optional[AsyncSession]) -> None:
+        """
+        Queue resized variants for a newly saved image (database storage
+        only), and its blurhash if it was too large to compute while saving.
+        """
+        from app.services.derivatives import RESIZABLE_TYPES, get_derivative_service
+
+        kind = content_type.split(";")[0]
+        blurhash_url = result["url"] if kind in _PROBE_TYPES and not result.get("blurhash") else None
+        if blurhash_url is None and (result.get("deduplicated") or kind not in RESIZABLE_TYPES):
+            return
+        derivatives = get_derivative_service()
+        if db is None:
+            derivatives.schedule(result["id"], blurhash_url)
         else:
-            result = await self._save_to_database(content, generated_filename, content_type, db)
-            result["original_name"] = filename
-            return result
+            derivatives.schedule_after_commit(result["id"], db, blurhash_url)
+
+    async def get_file_blob(self, file_id: str, db: AsyncSession, with_data: bool = False):
+        """
+        Fetch a file blob row by ID (database storage only).
+
+        The ``data`` column is deferred and only loaded with ``with_data=True``.
+        Chunked blobs carry an empty ``data`` either way; use read_file or
+        iter_file to get the payload.
+        """
+        from sqlalchemy.orm import undefer
+        from app.models.file_blob import FileBlob
+
+        query = select(FileBlob).where(FileBlob.id == file_id)
+        if with_data:
+            query = query.options(undefer(FileBlob.data))
+        result = await db.execute(query)
+        return result.scalar_one_or_none()
+
+    def _gcs_object_path(self, file_id: str) -> str:
+        """Map an /uploads/{file_id} path onto its GCS object name."""
+        file_id = file_id.lstrip("/")
+        if file_id.startswith("uploads/"):
+            return file_id
+        return f"uploads/{file_id}"
+
+    async def get_file_info(self, file_id: str, db: Optional[AsyncSession]) -> Optional[StoredFile]:
+        """
+        Look up size and content type of a stored file without reading it.
+
+        Pass ``db=None`` to use a short-lived session of its own.
+        """
+        cached = self.blob_cache.peek(file_id)
+        if cached is not None:
+            return cached[1]
+
+        if self.storage_backend == "gcs":
+            try:
+                blob = await self._run_gcs(
+                    lambda: self._get_gcs_bucket().get_blob(self._gcs_object_path(file_id))
+                )
+            except Exception as e:
+                logger.error(f"Failed to stat GCS object: {e}")
+                return None
+            if blob is None:
+                return None
+            return StoredFile(
+                id=blob.name,
+                content_type=blob.content_type or "application/octet-stream",
+                size=blob.size or 0,
+                created_at=blob.time_created,
+                sha256=(blob.metadata or {}).get("sha256"),
+            )
+
+        if self.storage_backend == "local":
+            path = self.local_path(file_id)
+            if path is None:
+                return None
+            stat = path.stat()
+            # Dedup names local files by digest; otherwise there is no stored hash
+            stem = path.name.split(".", 1)[0]
+            return StoredFile(
+                id=file_id,
+                content_type=mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+                size=stat.st_size,
+                created_at=datetime.utcfromtimestamp(stat.st_mtime),
+                sha256=stem if len(stem) == 64 else None,
+            )
 
-    async def get_file_blob(self, file_id: str, db: AsyncSession):
-        """Fetch a file blob by ID (database storage only)."""
         from app.models.file_blob import FileBlob
 
+        if db is None:
+            from app.database import async_session
+
+            async with async_session() as own_db:
+                return await self.get_file_info(file_id, own_db)
+
         result = await db.execute(
-            select(FileBlob).where(FileBlob.id == file_id)
+            select(
+                FileBlob.id,
+                FileBlob.content_type,
+                FileBlob.size,
+                FileBlob.created_at,
+                FileBlob.sha256,
+            ).where(FileBlob.id == file_id)
         )
-        return result.scalar_one_or_none()
+        row = result.one_or_none()
+        if row is None:
+            return None
+        return StoredFile(
+            id=row.id,
+            content_type=row.content_type,
+            size=row.size,
+            created_at=row.created_at,
+            sha256=row.sha256,
+        )
+
+    async def iter_file(
+        self,
+        file_id: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        info: Optional[StoredFile] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream a byte range of a stored file in bounded chunks.
+
+        ``end`` is inclusive, matching HTTP Range semantics. Cached files are
+        served from memory; full reads of small files populate the cache.
+        Pass ``info`` when the caller already looked it up.
+        """
+        cached = self.blob_cache.get(file_id)
+        if cached is not None:
+            content, _ = cached
+            if end is None:
+                end = len(content) - 1
+            view = memoryview(content)
+            for offset in range(start, end + 1, self.stream_chunk_size):
+                yield bytes(view[offset:min(offset + self.stream_chunk_size, end + 1)])
+            return
+
+        if start == 0 and self.blob_cache.enabled:
+            if info is None:
+                info = await self.get_file_info(file_id, None)
+            if info is not None and (
+                not self.blob_cache.accepts(info.size)
+                or (end is not None and end != info.size - 1)
+            ):
+                info = None
+        else:
+            info = None
+
+        parts: list[bytes] = []
+        async for chunk in self._iter_backend_file(file_id, start, end):
+            if info is not None:
+                parts.append(chunk)
+            yield chunk
+
+        if info is not None:
+            content = b"".join(parts)
+            if len(content) == info.size:
+                self.blob_cache.put(file_id, (content, info), info.size)
+
+    async def _iter_backend_file(
+        self,
+        file_id: str,
+        start: int,
+        end: Optional[int],
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream a byte range straight from the configured backend.
+
+        The database path opens its own session so the stream can outlive the
+        request's session.
+        """
+        if self.storage_backend == "gcs":
+            # One ranged request per window, handed out in stream-sized chunks
+            chunk_size = self.stream_chunk_size
+            blob = await self._run_gcs(
+                lambda: self._get_gcs_bucket().blob(self._gcs_object_path(file_id))
+            )
+            if end is None:
+                await self._run_gcs(blob.reload)
+                end = (blob.size or 0) - 1
+            position = start
+            while position <= end:
+                window_end = min(position + self.gcs_download_window_size - 1, end)
+                window = await self._run_gcs(
+                    blob.download_as_bytes, start=position, end=window_end
+                )
+                if not window:
+                    break
+                view = memoryview(window)
+                for offset in range(0, len(window), chunk_size):
+                    yield bytes(view[offset:offset + chunk_size])
+                position += len(window)
+            return
+
+        if self.storage_backend == "local":
+            path = self.local_path(file_id)
+            if path is None:
+                return
+            chunk_size = self.stream_chunk_size
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                if end is None:
+                    end = os.fstat(fd).st_size - 1
+                position = start
+                while position <= end:
+                    length = min(chunk_size, end - position + 1)
+                    chunk = await asyncio.to_thread(os.pread, fd, length, position)
+                    if not chunk:
+                        break
+                    yield chunk
+                    position += len(chunk)
+            finally:
+                os.close(fd)
+            return
+
+        from app.database import async_session
+
+        async with async_session() as db:
+            async for chunk in self._iter_database_file(file_id, start, end, db):
+                yield chunk
+
+    async def _iter_database_file(
+        self,
+        file_id: str,
+        start: int,
+        end: Optional[int],
+        db: AsyncSession,
+    ) -> AsyncIterator[bytes]:
+        """Yield a byte range of a database blob, chunked or inline."""
+        from app.models.file_blob import FileBlob, FileBlobChunk
+
+        result = await db.execute(
+            select(FileBlob.size, FileBlob.chunk_size).where(FileBlob.id == file_id)
+        )
+        row = result.one_or_none()
+        if row is None:
+            return
+        if end is None:
+            end = row.size - 1
+
+        if row.chunk_size:
+            # Chunked layout: fetch only the parts overlapping [start, end]
+            part_size = row.chunk_size
+            for seq in range(start // part_size, end // part_size + 1):
+                result = await db.execute(
+                    select(FileBlobChunk.data)
+                    .where(FileBlobChunk.blob_id == file_id)
+                    .where(FileBlobChunk.seq == seq)
+                )
+                part = result.scalar_one_or_none()
+                if part is None:
+                    logger.error("Missing chunk %d of blob %s", seq, file_id)
+                    return
+                part_start = seq * part_size
+                lo = max(start - part_start, 0)
+                hi = min(end - part_start + 1, len(part))
+                yield bytes(part[lo:hi])
+            return
+
+        # Inline/legacy layout: SQL substr is 1-indexed and works on bytea and BLOB
+        chunk_size = self.stream_chunk_size
+        position = start
+        while position <= end:
+            length = min(chunk_size, end - position + 1)
+            result = await db.execute(
+                select(func.substr(FileBlob.data, position + 1, length))
+                .where(FileBlob.id == file_id)
+            )
+            chunk = result.scalar_one_or_none()
+            if not chunk:
+                break
+            yield bytes(chunk)
+            position += len(chunk)
+
+    async def read_file(self, file_id: str, db: AsyncSession) -> Optional[tuple[bytes, str]]:
+        """
+        Read a whole stored file. Returns (content, content_type) or None.
+
+        Small files are served from / added to the in-process blob cache.
+        Pass ``db=None`` to use short-lived sessions of its own.
+        """
+        cached = self.blob_cache.get(file_id)
+        if cached is not None:
+            content, info = cached
+            return (content, info.content_type)
+
+        info = await self.get_file_info(file_id, db)
+        if info is None:
+            return None
+
+        if self.storage_backend == "gcs":
+            stored = await self.get_file_from_gcs(self._gcs_object_path(file_id))
+            if stored is None:
+                return None
+            content = stored[0]
+        elif self.storage_backend == "local":
+            content = await asyncio.to_thread(self.local_path(file_id).read_bytes)
+        else:
+            if db is not None:
+                chunks = self._iter_database_file(file_id, 0, None, db)
+            else:
+                chunks = self._iter_backend_file(file_id, 0, None)
+            parts = [chunk async for chunk in chunks]
+            content = b"".join(parts)
+
+        self.blob_cache.put(file_id, (content, info), len(content))
+        return (content, info.content_type)
+
+    def cache_stats(self) -> dict:
+        """Hit/miss/eviction counters of the in-process blob cache."""
+        return self.blob_cache.stats()
+
+    def _download_gcs_sync(self, gcs_path: str) -> Optional[tuple[bytes, str]]:
+        """Download an object in a single request (no exists() pre-check)."""
+        from google.api_core.exceptions import NotFound
+
+        blob = self._get_gcs_bucket().blob(gcs_path)
+        try:
+            content = blob.download_as_bytes()
+        except NotFound:
+            return None
+        # The download response headers populate content_type
+        return (content, blob.content_type or "application/octet-stream")
 
     async def get_file_from_gcs(self, gcs_path: str) -> Optional[tuple[bytes, str]]:
         """Fetch file content from GCS. Returns (content, content_type) or None."""
         try:
-            bucket = self._get_gcs_bucket()
-            blob = bucket.blob(gcs_path)
-            if not blob.exists():
-                return None
-            content = blob.download_as_bytes()
-            return (content, blob.content_type or "application/octet-stream")
+            return await self._run_gcs(self._download_gcs_sync, gcs_path)
         except Exception as e:
             logger.error(f"Failed to fetch from GCS: {e}")
             return None
 
+    async def get_data_url(self, file_id: str, db: AsyncSession) -> Optional[str]:
+        """
+        Encode a stored file as a base64 data URL for vision/LLM providers.
+
+        Local files are base64-encoded straight from a memory map, without an
+        intermediate bytes copy.
+        """
+        info = await self.get_file_info(file_id, db)
+        if info is None:
+            return None
+        mime_type = info.content_type or "application/octet-stream"
+
+        with self.open_mapped(file_id) as view:
+            if view is not None:
+                b64 = await asyncio.to_thread(base64.b64encode, view)
+                return f"data:{mime_type};base64,{b64.decode('utf-8')}"
+
+        stored = await self.read_file(file_id, db)
+        if stored is None:
+            return None
+        b64 = base64.b64encode(stored[0]).decode("utf-8")
+        return f"data:{mime_type};base64,{b64}"
+
+    def _delete_gcs_sync(self, gcs_path: str) -> bool:
+        """Drop one reference to a GCS object, deleting it with the last one."""
+        blob = self._get_gcs_bucket().get_blob(gcs_path)
+        if blob is None:
+            return False
+        if (blob.metadata or {}).get("refcount"):
+            if self._adjust_gcs_refcount(blob, -1) > 0:
+                return True
+        blob.delete()
+        return True
+
     async def delete_file(self, file_id: str, db: AsyncSession) -> bool:
-        """Delete a file from storage."""
+        """
+        Delete a file from storage.
+
+        Deduplicated files are only removed once their last reference is gone.
+        """
+        self.blob_cache.invalidate(file_id)
         if self.storage_backend == "gcs":
             try:
-                bucket = self._get_gcs_bucket()
-                blob = bucket.blob(file_id)
-                blob.delete()
-                return True
+                return await self._run_gcs(self._delete_gcs_sync, file_id)
             except Exception as e:
                 logger.error(f"Failed to delete from GCS: {e}")
                 return False
-        else:
-            blob = await self.get_file_blob(file_id, db)
-            if not blob:
+        elif self.storage_backend == "local":
+            path = self.local_path(file_id)
+            if path is None:
                 return False
-            await db.delete(blob)
-            await db.flush()
+            refs_path = path.with_name(path.name + ".refs")
+            if refs_path.exists():
+                if await asyncio.to_thread(self._adjust_local_refcount, path, -1) > 0:
+                    return True
+                refs_path.unlink(missing_ok=True)
+            path.unlink(missing_ok=True)
             return True
+        else:
+            return await self.delete_files([file_id], db) > 0
+
+    async def delete_orphaned_blobs(
+        self,
+        file_ids: list[str],
+        db: AsyncSession,
+        unused_before: datetime,
+    ) -> list[str]:
+        """
+        Delete database blobs nothing references, whatever their ref_count.
+
+        Blobs created or deduplicated onto since ``unused_before`` are kept:
+        the check is part of the DELETE itself, so an upload that has just
+        reused a blob marked as orphaned (its row not committed yet) wins.
+        Returns the IDs actually deleted.
+        """
+        from sqlalchemy import func
+        from app.models.file_blob import FileBlob, FileBlobChunk
+
+        if not file_ids:
+            return []
+        result = await db.execute(
+            delete(FileBlob)
+            .where(
+                FileBlob.id.in_(file_ids),
+                func.coalesce(FileBlob.last_referenced_at, FileBlob.created_at) < unused_before,
+            )
+            .returning(FileBlob.id)
+        )
+        deleted = list(result.scalars())
+        if deleted:
+            await db.execute(delete(FileBlobChunk).where(FileBlobChunk.blob_id.in_(deleted)))
+        for file_id in deleted:
+            self.blob_cache.invalidate(file_id)
+        await db.flush()
+        return deleted
+
+    async def delete_files(self, file_ids: list[str], db: AsyncSession, force: bool = False) -> int:
+        """
+        Drop one reference from each database blob, by ID, in bulk.
+
+        Works purely with id/ref_count columns and DELETE statements, so no
+        payload is ever loaded. With ``force`` the blobs are removed whatever
+        their ref_count (used for orphans nothing points to any more).
+        Returns how many of the IDs existed.
+        """
+        from app.models.file_blob import FileBlob, FileBlobChunk
+
+        if not file_ids:
+            return 0
+        for file_id in file_ids:
+            self.blob_cache.invalidate(file_id)
+
+        result = await db.execute(
+            select(FileBlob.id, FileBlob.ref_count).where(FileBlob.id.in_(file_ids))
+        )
+        rows = result.all()
+        shared = [row.id for row in rows if row.ref_count > 1 and not force]
+        last_ref = [row.id for row in rows if row.ref_count <= 1 or force]
+
+        if shared:
+            await db.execute(
+                update(FileBlob)
+                .where(FileBlob.id.in_(shared))
+                .values(ref_count=FileBlob.ref_count - 1)
+            )
+        if last_ref:
+            await db.execute(
+                delete(FileBlobChunk).where(FileBlobChunk.blob_id.in_(last_ref))
+            )
+            await db.execute(
+                delete(FileBlob).where(FileBlob.id.in_(last_ref))
+            )
+        await db.flush()
+        return len(rows)
 
     def get_full_url(self, relative_url: str) -> str:
         """Get full URL from relative path."""
@@ -213,6 +1425,27 @@ class StorageService:
             return relative_url
         return f"{self.public_base_url}{relative_url}"
 
+    def variant_url(self, url: str, width: int) -> str:
+        """URL of a resized variant of one of our database uploads (other URLs unchanged)."""
+        if self.storage_backend != "database" or not url or self.is_gcs_url(url) or not self.file_id_from_url(url):
+            return url
+        return f"{url.split('?', 1)[0]}?w={width}"
+
+    def file_id_from_url(self, url: str) -> Optional[str]:
+        """Extract the storage file ID from one of our own upload URLs."""
+        if not url:
+            return None
+        path = url.split("?", 1)[0]
+        if self.public_base_url and path.startswith(self.public_base_url):
+            path = path[len(self.public_base_url):]
+        if path.startswith("/uploads/"):
+            return path[len("/uploads/"):]
+        if self.gcs_bucket_name and self.is_gcs_url(path):
+            marker = f"/{self.gcs_bucket_name}/"
+            if marker in path:
+                return path.split(marker, 1)[1]
+        return None
+
     def is_gcs_url(self, url: str) -> bool:
         """Check if URL is a GCS URL."""
         return "storage.googleapis.com" in url or "storage.cloud.google.com" in url
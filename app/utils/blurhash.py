@@ -0,0 +1,71 @@
+"""BlurHash encoder (https://blurha.sh) vectorized with NumPy."""
+import numpy as np
+from PIL import Image
+
+_BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+# The hash only captures low frequencies, so a tiny copy gives the same result
+_SAMPLE_SIZE = 32
+
+
+def _base83(value: int, length: int) -> str:
+    return "".join(
+        _BASE83[(value // 83 ** (length - i - 1)) % 83] for i in range(length)
+    )
+
+
+def _srgb_to_linear(values: np.ndarray) -> np.ndarray:
+    v = values / 255.0
+    return np.where(v <= 0.04045, v / 12.92, ((v + 0.055) / 1.055) ** 2.4)
+
+
+def _linear_to_srgb(value: float) -> int:
+    v = min(max(value, 0.0), 1.0)
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def encode(image: Image.Image, x_components: int = 4, y_components: int = 3) -> str:
+    """Compute the BlurHash of an image using x by y cosine components (1-9)."""
+    if not (1 <= x_components <= 9 and 1 <= y_components <= 9):
+        raise ValueError("BlurHash components must be between 1 and 9")
+
+    sample = image.convert("RGB")
+    sample.thumbnail((_SAMPLE_SIZE, _SAMPLE_SIZE), Image.BILINEAR)
+    pixels = _srgb_to_linear(np.asarray(sample, dtype=np.float64))
+    height, width = pixels.shape[:2]
+
+    # cos(pi * i * x / width) for every component i and column x (and rows)
+    basis_x = np.cos(np.pi * np.outer(np.arange(x_components), np.arange(width)) / width)
+    basis_y = np.cos(np.pi * np.outer(np.arange(y_components), np.arange(height)) / height)
+
+    # factors[j, i] = sum over pixels of basis_y[j, y] * basis_x[i, x] * pixel[y, x]
+    factors = np.einsum("jy,ix,yxc->jic", basis_y, basis_x, pixels) / (width * height)
+    factors[1:, :, :] *= 2
+    factors[0, 1:, :] *= 2
+    factors = factors.reshape(-1, 3)
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+
+    if len(ac):
+        actual_max = float(np.abs(ac).max())
+        quantised_max = int(max(0, min(82, np.floor(actual_max * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        max_value = 1.0
+        result += _base83(0, 1)
+
+    r, g, b = (_linear_to_srgb(float(c)) for c in dc)
+    result += _base83((r << 16) + (g << 8) + b, 4)
+
+    if len(ac):
+        scaled = ac / max_value
+        quantised = np.clip(
+            np.floor(np.sign(scaled) * np.sqrt(np.abs(scaled)) * 9 + 9.5), 0, 18
+        ).astype(int)
+        for qr, qg, qb in quantised:
+            result += _base83(int(qr) * 19 * 19 + int(qg) * 19 + int(qb), 2)
+    return result
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Script to point existing image samples at their resized grid thumbnail.
+
+Samples created before resized variants existed have thumbnail_url equal to
+the full-resolution media_url, so the gallery grid downloads originals. This
+rewrites thumbnail_url to the ``?w=`` variant URL (the variant itself is
+generated on first request). Only database-backend uploads are rewritten,
+and re-running the script is a no-op.
+
+Examples:
+    python scripts/backfill_thumbnails.py --dry-run
+    python scripts/backfill_thumbnails.py
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+# Add the parent directory to the path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from app.database import async_session, init_db
+from app.models.sample_post import SamplePost, MediaType
+from app.services.storage import get_storage_service, GRID_THUMBNAIL_WIDTH
+
+
+async def backfill(args: argparse.Namespace) -> None:
+    await init_db()
+    storage = get_storage_service()
+    if storage.storage_backend != "database":
+        print(f"Storage backend is {storage.storage_backend}; no resized variants to point at")
+        return
+
+    last_id = ""
+    scanned = updated = 0
+    while True:
+        async with async_session() as db:
+            result = await db.execute(
+                select(SamplePost)
+                .where(SamplePost.media_type == MediaType.IMAGE, SamplePost.id > last_id)
+                .order_by(SamplePost.id)
+                .limit(args.batch_size)
+            )
+            samples = result.scalars().all()
+            if not samples:
+                break
+            for sample in samples:
+                thumbnail_url = storage.variant_url(sample.media_url, GRID_THUMBNAIL_WIDTH)
+                if sample.thumbnail_url in (None, "", sample.media_url) and thumbnail_url != sample.media_url:
+                    sample.thumbnail_url = thumbnail_url
+                    updated += 1
+            scanned += len(samples)
+            last_id = samples[-1].id
+            if not args.dry_run:
+                await db.commit()
+        print(f"Scanned {scanned} image samples, {updated} thumbnails {'to update' if args.dry_run else 'updated'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Point image samples at their resized grid thumbnail")
+    parser.add_argument("--batch-size", type=int, default=500, help="Samples per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the samples that would change")
+    args = parser.parse_args()
+    asyncio.run(backfill(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Local fake of the external providers with fault injection.
+
+Serves just enough of the Seedream, Parrot/Pika, GMI video queue and
+OpenAI-compatible chat APIs for the app to run end to end, and injects
+failures so retries and circuit breakers can be exercised:
+
+    python scripts/fake_provider.py --port 9100 --fail-rate 0.3 --fail-statuses 502,503
+    python scripts/fake_provider.py --outage-every 120 --outage-seconds 40
+
+Point the app at it with:
+
+    SEEDREAM_SERVER_URL=http://localhost:9100
+    PARROT_API_URL=http://localhost:9100
+    PARROT_V2_AUDIO_API_URL=http://localhost:9100/image-to-video-v2-audio
+    PIKA_ADDITION_API_URL=http://localhost:9100
+    GMI_VIDEO_API_URL=http://localhost:9100
+    GMI_BASE_URL=http://localhost:9100/v1
+    XAI_BASE_URL=http://localhost:9100/v1
+
+Fault settings can be changed at runtime with
+``curl -X POST 'localhost:9100/_faults?fail_rate=0.8'``; breaker state is
+visible on the app's /api/v1/admin/providers/health endpoint.
+"""
+import argparse
+import asyncio
+import io
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from PIL import Image
+
+faults = {
+    "fail_rate": 0.0,
+    "fail_statuses": [502],
+    "latency_ms": 0,
+    "outage_every": 0,
+    "outage_seconds": 0,
+}
+started = time.monotonic()
+jobs: dict[str, float] = {}
+JOB_SECONDS = 20.0
+
+app = FastAPI(title="Fake provider")
+
+
+def _in_outage() -> bool:
+    every, length = faults["outage_every"], faults["outage_seconds"]
+    return bool(every and length) and (time.monotonic() - started) % every < length
+
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    if request.url.path.startswith(("/_faults", "/files/")):
+        return await call_next(request)
+    if faults["latency_ms"]:
+        await asyncio.sleep(faults["latency_ms"] / 1000 * random.uniform(0.5, 1.5))
+    if _in_outage():
+        return JSONResponse({"error": "injected outage"}, status_code=503)
+    if random.random() < faults["fail_rate"]:
+        status = random.choice(faults["fail_statuses"])
+        headers = {"Retry-After": "1"} if status in (429, 503) else None
+        return JSONResponse({"error": f"injected {status}"}, status_code=status, headers=headers)
+    return await call_next(request)
+
+
+@app.post("/_faults")
+async def set_faults(
+    fail_rate: float = None,
+    fail_statuses: str = None,
+    latency_ms: int = None,
+    outage_every: int = None,
+    outage_seconds: int = None,
+):
+    updates = {
+        "fail_rate": fail_rate,
+        "latency_ms": latency_ms,
+        "outage_every": outage_every,
+        "outage_seconds": outage_seconds,
+    }
+    faults.update({k: v for k, v in updates.items() if v is not None})
+    if fail_statuses:
+        faults["fail_statuses"] = [int(s) for s in fail_statuses.split(",")]
+    return faults
+
+
+@app.get("/files/{name}")
+async def serve_file(name: str):
+    color = tuple(random.randint(0, 255) for _ in range(3))
+    buffer = io.BytesIO()
+    Image.new("RGB", (512, 768), color).save(buffer, format="PNG")
+    return Response(buffer.getvalue(), media_type="image/png")
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+# Seedream (OpenAI-compatible image generation)
+@app.post("/images/generations")
+@app.post("/generate/controlnet")
+async def generate_image(request: Request):
+    url = f"{request.base_url}files/{uuid.uuid4().hex}.png"
+    return {"data": [{"url": url}], "image_url": url, "seed": random.randint(0, 2**31)}
+
+
+# Parrot / Pika job submission and polling
+@app.post("/image-to-video-v2")
+@app.post("/image-to-video-v2-audio")
+@app.post("/audio-to-video")
+@app.post("/generate/pikadditions")
+async def create_video():
+    job_id = uuid.uuid4().hex
+    jobs[job_id] = time.monotonic()
+    return {"id": job_id}
+
+
+def _job_progress(job_id: str) -> int:
+    created = jobs.setdefault(job_id, time.monotonic())
+    return min(100, int((time.monotonic() - created) / JOB_SECONDS * 100))
+
+
+@app.get("/videos/{job_id}")
+async def video_status(job_id: str, request: Request):
+    progress = _job_progress(job_id)
+    if progress < 100:
+        return {"id": job_id, "status": "processing", "progress": progress}
+    return {
+        "id": job_id,
+        "status": "finished",
+        "progress": 100,
+        "video_url": f"{request.base_url}files/{job_id}.mp4",
+    }
+
+
+# GMI video request queue
+@app.post("/requests")
+async def queue_request():
+    job_id = uuid.uuid4().hex
+    jobs[job_id] = time.monotonic()
+    return {"request_id": job_id, "status": "queued"}
+
+
+@app.get("/requests/{job_id}")
+async def queue_status(job_id: str, request: Request):
+    if _job_progress(job_id) < 100:
+        return {"request_id": job_id, "status": "processing", "outcome": {}}
+    return {
+        "request_id": job_id,
+        "status": "success",
+        "outcome": {"media_urls": [{"url": f"{request.base_url}files/{job_id}.mp4"}]},
+    }
+
+
+# OpenAI-compatible chat (GMI / xAI)
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": '{"intent": "general_chat", "message": "ok"}'},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake provider with fault injection")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--fail-statuses", default="502", help="Comma-separated statuses to inject")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Mean added latency")
+    parser.add_argument("--outage-every", type=int, default=0, help="Seconds between full outages")
+    parser.add_argument("--outage-seconds", type=int, default=0, help="Length of each outage")
+    parser.add_argument("--job-seconds", type=float, default=20.0, help="Time until video jobs finish")
+    args = parser.parse_args()
+
+    global JOB_SECONDS
+    JOB_SECONDS = args.job_seconds
+    faults.update({
+        "fail_rate": args.fail_rate,
+        "fail_statuses": [int(s) for s in args.fail_statuses.split(",")],
+        "latency_ms": args.latency_ms,
+        "outage_every": args.outage_every,
+        "outage_seconds": args.outage_seconds,
+    })
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
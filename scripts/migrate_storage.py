@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Script to move stored files between storage backends and rewrite their URLs.
+
+Walks images, videos and sample posts in id order, copies every referenced
+file that lives in the source backend to the target backend (streamed, with
+bounded concurrency) and rewrites the URL columns batch by batch. The last
+processed id of each table is checkpointed to a JSON file after each batch,
+so an interrupted run can simply be restarted with the same arguments.
+
+With --delete-source, copied files are logged to <checkpoint>.copied and
+deleted from the source in a final pass, skipping any file that is still
+referenced anywhere blob GC looks (metadata, character profiles, settings,
+reference packs, derivatives).
+
+Examples:
+    python scripts/migrate_storage.py --source database --target gcs
+    python scripts/migrate_storage.py --source database --target local --dry-run
+
+To test against a GCS emulator (e.g. fake-gcs-server), export
+STORAGE_EMULATOR_HOST=http://localhost:4443 before running; the GCS client
+picks it up. ``--target local`` writes to upload_dir instead.
+"""
+import argparse
+import asyncio
+import json
+import mimetypes
+import os
+import re
+import sys
+import time
+from typing import Optional
+
+# Add the parent directory to the path so we can import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, update
+from app.database import async_session, init_db
+from app.models.image import Image
+from app.models.video import Video
+from app.models.sample_post import SamplePost
+from app.services.blob_cache import BlobCache
+from app.services.blob_gc import referenced_file_ids
+from app.services.storage import StorageService
+
+BACKENDS = ("database", "gcs", "local")
+
+# (checkpoint key, model, URL columns to rewrite)
+TABLES = [
+    ("images", Image, ("image_url",)),
+    ("videos", Video, ("video_url", "thumbnail_url")),
+    ("sample_posts", SamplePost, ("media_url", "thumbnail_url")),
+]
+
+
+class Checkpoint:
+    """Resumable progress: last row id per table, plus a log of copied files."""
+
+    def __init__(self, path: str, source: str, target: str):
+        self.path = path
+        self.copied_path = f"{path}.copied"
+        self.data = {"source": source, "target": target, "tables": {}}
+        if os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if (saved.get("source"), saved.get("target")) != (source, target):
+                raise SystemExit(
+                    f"Checkpoint {path} is for {saved.get('source')} -> {saved.get('target')}"
+                )
+            self.data["tables"] = saved.get("tables", {})
+
+    def last_id(self, table: str) -> str:
+        return self.data["tables"].get(table, "")
+
+    def set_last_id(self, table: str, row_id: str) -> None:
+        self.data["tables"][table] = row_id
+
+    def log_copied(self, file_ids) -> None:
+        """Append source file ids that now have a copy in the target."""
+        with open(self.copied_path, "a") as f:
+            f.writelines(f"{file_id}\n" for file_id in file_ids)
+
+    def copied(self):
+        if not os.path.exists(self.copied_path):
+            return
+        with open(self.copied_path) as f:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
+
+
+class Stats:
+    """Copy counters for progress output."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.files = 0
+        self.bytes = 0
+        self.failed = 0
+        self.rows = 0
+        self.deleted = 0
+        self.kept = 0
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return (
+            f"{self.files} files, {self.bytes / 1e6:.1f} MB "
+            f"({self.bytes / 1e6 / elapsed:.2f} MB/s, {self.files / elapsed:.1f} files/s), "
+            f"{self.rows} rows updated, {self.failed} failed, {elapsed:.0f}s"
+        )
+
+
+def source_url_pattern(source: StorageService) -> re.Pattern:
+    """Captures the source file id from URLs stored anywhere (text or JSON)."""
+    if source.storage_backend == "gcs":
+        return re.compile(r"/" + re.escape(source.gcs_bucket_name or "") + r"/([^\s\"'?#\\]+)")
+    return re.compile(r"/uploads/([^\s\"'?#\\]+)")
+
+
+def rewrite_url(url: str, urls: dict) -> str:
+    """Target URL for ``url``, keeping its query string (e.g. ``?w=`` variants)."""
+    new_url = urls["full_url"] if url.startswith("http") else urls["url"]
+    if "?" in url:
+        new_url = f"{new_url.split('?', 1)[0]}?{url.split('?', 1)[1]}"
+    return new_url
+
+
+async def copy_file(
+    file_id: str,
+    source: StorageService,
+    target: StorageService,
+    stats: Stats,
+    dry_run: bool,
+) -> Optional[dict]:
+    """Stream one file from source to target. Returns the target URLs."""
+    info = await source.get_file_info(file_id, None)
+    if info is None:
+        return None
+    if dry_run:
+        stats.files += 1
+        stats.bytes += info.size
+        return None
+
+    ext = mimetypes.guess_extension(info.content_type.split(";")[0]) or ".bin"
+    async with async_session() as db:
+        if info.size == 0:
+            # Nothing to read, and no valid byte range to ask for
+            saved = await target.save_bytes(b"", f"migrated{ext}", info.content_type, db, derived=True)
+        else:
+            filename = target._generate_filename(f"migrated{ext}")
+            chunks = source.iter_file(file_id, start=0, end=info.size - 1, info=info)
+            saved = await target.save_stream(chunks, filename, info.content_type, db)
+        await db.commit()
+    stats.files += 1
+    stats.bytes += info.size
+    return {"url": saved["url"], "full_url": saved["full_url"]}
+
+
+async def migrate_table(
+    table: str,
+    model,
+    columns: tuple[str, ...],
+    source: StorageService,
+    target: StorageService,
+    checkpoint: Checkpoint,
+    stats: Stats,
+    batch_size: int,
+    concurrency: int,
+    dry_run: bool,
+):
+    """Copy the files referenced by one table and rewrite its URL columns."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def copy_bounded(file_id: str):
+        async with semaphore:
+            try:
+                return file_id, await copy_file(file_id, source, target, stats, dry_run)
+            except Exception as e:
+                stats.failed += 1
+                print(f"  ! {file_id}: {e}")
+                return file_id, None
+
+    while True:
+        last_id = checkpoint.last_id(table)
+        async with async_session() as db:
+            result = await db.execute(
+                select(model.id, *[getattr(model, c) for c in columns])
+                .where(model.id > last_id)
+                .order_by(model.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+        if not rows:
+            break
+
+        # Files in this batch that live in the source backend (rows already
+        # rewritten point at the target, so a resumed batch copies nothing twice)
+        pending = set()
+        for row in rows:
+            for column in columns:
+                file_id = source.file_id_from_url(getattr(row, column) or "")
+                if file_id:
+                    pending.add(file_id)
+
+        copied = {
+            file_id: urls
+            for file_id, urls in await asyncio.gather(*(copy_bounded(f) for f in pending))
+            if urls is not None
+        }
+
+        if not dry_run:
+            async with async_session() as db:
+                for row in rows:
+                    values = {}
+                    for column in columns:
+                        url = getattr(row, column) or ""
+                        urls = copied.get(source.file_id_from_url(url) or "")
+                        if urls is not None:
+                            values[column] = rewrite_url(url, urls)
+                    if values:
+                        await db.execute(update(model).where(model.id == row.id).values(**values))
+                        stats.rows += 1
+                await db.commit()
+            checkpoint.log_copied(copied)
+
+        checkpoint.set_last_id(table, rows[-1].id)
+        if not dry_run:
+            checkpoint.save()
+        print(f"[{table}] up to {rows[-1].id}: {stats.line()}")
+
+
+async def delete_copied_sources(source: StorageService, checkpoint: Checkpoint, stats: Stats, batch_size: int):
+    """Delete copied source files that nothing references any more."""
+    referenced = await referenced_file_ids(source_url_pattern(source))
+    print(f"Deleting copied source files ({len(referenced)} ids still referenced)")
+    pending = 0
+    async with async_session() as db:
+        for file_id in dict.fromkeys(checkpoint.copied()):
+            if file_id.lower() in referenced:
+                stats.kept += 1
+                continue
+            if await source.delete_file(file_id, db):
+                stats.deleted += 1
+            pending += 1
+            if pending >= batch_size:
+                await db.commit()
+                pending = 0
+        await db.commit()
+    os.remove(checkpoint.copied_path)
+    print(f"Deleted {stats.deleted} source files, kept {stats.kept} still referenced")
+
+
+async def migrate(args):
+    """Run the migration for all tables."""
+    await init_db()
+
+    source = StorageService(backend=args.source)
+    target = StorageService(backend=args.target)
+    # One-pass copy: caching payloads would only waste memory
+    source.blob_cache = BlobCache(0, 0)
+    target.blob_cache = BlobCache(0, 0)
+
+    checkpoint = Checkpoint(args.checkpoint, args.source, args.target)
+    stats = Stats()
+    print(f"Migrating {args.source} -> {args.target}{' (dry run)' if args.dry_run else ''}")
+    try:
+        for table, model, columns in TABLES:
+            await migrate_table(
+                table, model, columns, source, target, checkpoint, stats,
+                batch_size=args.batch_size,
+                concurrency=args.concurrency,
+                dry_run=args.dry_run,
+            )
+        if args.delete_source and not args.dry_run:
+            await delete_copied_sources(source, checkpoint, stats, args.batch_size)
+    finally:
+        source.close()
+        target.close()
+    print(f"Done: {stats.line()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move stored files between storage backends")
+    parser.add_argument("--source", choices=BACKENDS, required=True)
+    parser.add_argument("--target", choices=BACKENDS, required=True)
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows per batch")
+    parser.add_argument("--concurrency", type=int, default=8, help="Files copied in parallel")
+    parser.add_argument("--checkpoint", default="storage_migration.json", help="Progress file")
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would move")
+    parser.add_argument(
+        "--delete-source",
+        action="store_true",
+        help="Once all URLs are rewritten, delete copied files no longer referenced anywhere",
+    )
+    args = parser.parse_args()
+    if args.source == args.target:
+        parser.error("--source and --target must differ")
+
+    asyncio.run(migrate(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -492,7 +492,7 @@ export default function ContentGallery({
                   >
                     {/* eslint-disable-next-line @next/next/no-img-element */}
                     <img
-                      src={resolveApiUrl(item.data.image_url!)}
+                      src={resolveApiUrl(item.data.thumbnail_url || item.data.image_url!)}
                       alt="Generated"
                       className="h-full w-full object-cover"
                     />
@@ -674,7 +674,7 @@ export default function ContentGallery({
                 >
                   {/* eslint-disable-next-line @next/next/no-img-element */}
                   <img
-                    src={resolveApiUrl(img.image_url!)}
+                    src={resolveApiUrl(img.thumbnail_url || img.image_url!)}
                     alt="Base"
                     className="h-full w-full object-cover"
                   />
@@ -800,7 +800,7 @@ export default function ContentGallery({
                 >
                   {/* eslint-disable-next-line @next/next/no-img-element */}
                   <img
-                    src={resolveApiUrl(img.image_url!)}
+                    src={resolveApiUrl(img.thumbnail_url || img.image_url!)}
                     alt="Generated"
                     className="h-full w-full object-cover"
                   />
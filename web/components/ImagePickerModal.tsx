@@ -91,7 +91,7 @@ export default function ImagePickerModal({
                 >
                   {/* eslint-disable-next-line @next/next/no-img-element */}
                   <img
-                    src={resolveApiUrl(image.image_url || "")}
+                    src={resolveApiUrl(image.thumbnail_url || image.image_url || "")}
                     alt="Character"
                     className="w-full h-full object-cover"
                   />
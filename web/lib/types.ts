@@ -55,6 +55,7 @@ export interface Image {
   type: ImageType;
   status: ImageStatus;
   image_url?: string | null;  // Nullable for generating state
+  thumbnail_url?: string | null;  // Resized variant for grid tiles
   task_id?: string | null;
   pose?: string | null;
   expression?: string | null;